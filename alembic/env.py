@@ -9,6 +9,8 @@ from sqlalchemy import engine_from_config, pool
 from alembic import context
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+# Frozen helpers that migrations import instead of app code (see migration_helpers.py).
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
 from app import models  # noqa: F401
 from app.db import Base
@@ -0,0 +1,583 @@
+"""Helpers for the backfill (0006) and partitioning (0004, 0010) migrations, frozen.
+
+Migrations must keep doing what they did when they were written, whatever later
+happens to the application code, so they import nothing from `app`; the partition
+helpers are a copy of `app.partitions`. tests/test_backfill.py and tests/test_rewrite.py
+test this module directly. Do not change it to track the app; give a new migration its
+own helpers.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    delete,
+    exc,
+    select,
+    text,
+)
+
+# Logged keys replayed per transaction while catching up.
+REPLAY_BATCH_SIZE = 5000
+
+# `prepare(conn, where, params)` runs before rows matching `where` are copied, e.g. to
+# create the shadow partitions they need; `after_swap(conn)` runs inside the cutover.
+PrepareFn = Callable[..., None]
+AfterSwapFn = Callable[..., None]
+
+
+class Progress:
+    """Logs done/total, throughput and an ETA at most once per `interval` seconds."""
+
+    def __init__(self, label: str, total: int, interval: float = 10.0):
+        self.label = label
+        self.total = max(total, 0)
+        self.interval = interval
+        self.done = 0
+        self.rows = 0
+        self._started = time.monotonic()
+        self._logged = 0.0
+
+    def advance(self, done: int, rows: int = 0, force: bool = False) -> None:
+        self.done = done
+        self.rows += rows
+        now = time.monotonic()
+        if force or now - self._logged >= self.interval:
+            self._logged = now
+            logging.info("%s", self.describe(now))
+
+    def describe(self, now: float | None = None) -> str:
+        elapsed = max((now or time.monotonic()) - self._started, 1e-6)
+        fraction = min(self.done / self.total, 1.0) if self.total else 1.0
+        eta = elapsed * (1 - fraction) / fraction if fraction else float("inf")
+        return (
+            f"{self.label}: {fraction:.1%} ({self.done}/{self.total}) "
+            f"rows={self.rows} rows_per_sec={self.rows / elapsed:.1f} eta_sec={eta:.0f}"
+        )
+
+
+def year_partition_name(table: str, year: int) -> str:
+    return f"{table}_{year}"
+
+
+def is_partitioned(conn, table: str) -> bool:
+    return (
+        conn.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+            {"table": table},
+        ).scalar_one_or_none()
+        == "p"
+    )
+
+
+def existing_years(conn, table: str) -> set[int]:
+    names = conn.execute(
+        text("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(:table)
+            """),
+        {"table": table},
+    ).scalars()
+    prefix = f"{table}_"
+    return {
+        int(name[len(prefix) :])
+        for name in names
+        if name.startswith(prefix) and name[len(prefix) :].isdigit()
+    }
+
+
+def create_year_partition(conn, table: str, year: int, modulus: int) -> None:
+    name = year_partition_name(table, year)
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table}
+        FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')
+        PARTITION BY HASH (station_id)
+        """))
+    for remainder in range(modulus):
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {name}_p{remainder} PARTITION OF {name}
+            FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})
+            """))
+
+
+def ensure_year_partitions(
+    conn,
+    years: Iterable[int],
+    tables: Iterable[str],
+    modulus: int | None = None,
+) -> list[str]:
+    """Create any missing year partitions (Postgres only) and return their names.
+
+    The hash modulus is fixed when a year is created; changing it only affects new years.
+    """
+    if conn.dialect.name != "postgresql":
+        return []
+    modulus = modulus or int(os.getenv("PARTITION_HASH_MODULUS", "4"))
+    years = set(years)
+    created = []
+    for table in tables:
+        if not is_partitioned(conn, table):
+            continue
+        # Serialize concurrent ingestions creating the same partitions.
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"partitions:{table}"}
+        )
+        for year in sorted(years - existing_years(conn, table)):
+            create_year_partition(conn, table, year, modulus)
+            created.append(year_partition_name(table, year))
+    return created
+
+
+def rename_year_partitions(conn, table: str, old_name: str) -> None:
+    """Rename partitions created under `old_name` (e.g. a rebuilt shadow table) after `table`."""
+    names = conn.execute(
+        text(
+            "SELECT relid::regclass::text FROM pg_partition_tree(to_regclass(:table)) "
+            "WHERE level > 0"
+        ),
+        {"table": table},
+    ).scalars()
+    prefix = f"{old_name}_"
+    for name in list(names):
+        if name.startswith(prefix):
+            conn.execute(text(f"ALTER TABLE {name} RENAME TO {table}_{name[len(prefix) :]}"))
+
+
+class OnlineRewrite:
+    """Rebuild `table` into `shadow` in batches while `table` stays writable.
+
+    `shadow` must already exist with the target layout and indexes. A trigger logs the
+    key of every row inserted, updated or deleted in `table` to `<table>_rewrite_log`.
+    Rows are then copied in key order, `batch_size` rows per transaction with `pause`
+    seconds in between, and logged keys are replayed until fewer than `catch_up_rows`
+    are pending. The cutover locks `table`, replays the rest, drops `table` and renames
+    `shadow` to it, all in one short transaction. Each copy step deletes and re-inserts
+    its keys in `shadow`, so copying a key twice is harmless. TRUNCATE is not captured.
+
+    The connection must be in AUTOCOMMIT mode so each batch commits on its own; from a
+    migration, run it inside `op.get_context().autocommit_block()`. Works on Postgres
+    and SQLite.
+    """
+
+    def __init__(
+        self,
+        conn,
+        table: str,
+        shadow: str,
+        columns: Sequence[str],
+        key: Sequence[str] = ("id",),
+        batch_size: int = 10000,
+        pause: float = 0.0,
+        catch_up_rows: int = 1000,
+        cutover_attempts: int = 5,
+        lock_timeout_ms: int = 5000,
+        prepare: PrepareFn | None = None,
+        after_swap: AfterSwapFn | None = None,
+    ):
+        self.conn = conn
+        self.table = table
+        self.shadow = shadow
+        self.columns = ", ".join(columns)
+        self.key = tuple(key)
+        self.batch_size = batch_size
+        self.pause = pause
+        self.catch_up_rows = catch_up_rows
+        self.cutover_attempts = cutover_attempts
+        self.lock_timeout_ms = lock_timeout_ms
+        self.prepare = prepare
+        self.after_swap = after_swap
+        self.log = f"{table}_rewrite_log"
+        self.is_postgres = conn.dialect.name == "postgresql"
+        # SQLite tables carry an implicit, increasing rowid.
+        self.seq = "seq" if self.is_postgres else "rowid"
+
+    @contextmanager
+    def _transaction(self, snapshot: bool = False):
+        if self.is_postgres:
+            begin = "BEGIN ISOLATION LEVEL REPEATABLE READ" if snapshot else "BEGIN"
+        else:
+            # Takes the write lock up front, so nothing commits in between statements.
+            begin = "BEGIN IMMEDIATE"
+        self.conn.exec_driver_sql(begin)
+        try:
+            yield
+        except BaseException:
+            self.conn.exec_driver_sql("ROLLBACK")
+            raise
+        self.conn.exec_driver_sql("COMMIT")
+
+    def _execute(self, sql: str, params: dict | None = None):
+        return self.conn.execute(text(sql), params or {})
+
+    def _drop_capture(self) -> None:
+        if self.is_postgres:
+            self._execute(f"DROP TRIGGER IF EXISTS {self.log}_capture ON {self.table}")
+            self._execute(f"DROP FUNCTION IF EXISTS {self.log}_capture()")
+        else:
+            for event in ("insert", "update", "delete"):
+                self._execute(f"DROP TRIGGER IF EXISTS {self.log}_{event}")
+        self._execute(f"DROP TABLE IF EXISTS {self.log}")
+
+    def _log_insert(self, row: str) -> str:
+        values = ", ".join(f"{row}.{column}" for column in self.key)
+        return f"INSERT INTO {self.log} ({', '.join(self.key)}) VALUES ({values});"
+
+    def install(self) -> None:
+        """Create the change log and the trigger that fills it (replacing leftovers)."""
+        keys = ", ".join(self.key)
+        with self._transaction():
+            self._drop_capture()
+            if self.is_postgres:
+                self._execute(
+                    f"CREATE TABLE {self.log} AS SELECT {keys} FROM {self.table} WITH NO DATA"
+                )
+                self._execute(f"ALTER TABLE {self.log} ADD COLUMN seq BIGSERIAL PRIMARY KEY")
+                self.conn.exec_driver_sql(f"""
+                    CREATE FUNCTION {self.log}_capture() RETURNS trigger
+                    LANGUAGE plpgsql AS $$
+                    BEGIN
+                      IF TG_OP IN ('UPDATE', 'DELETE') THEN {self._log_insert("OLD")} END IF;
+                      IF TG_OP IN ('INSERT', 'UPDATE') THEN {self._log_insert("NEW")} END IF;
+                      RETURN NULL;
+                    END $$
+                    """)
+                self._execute(f"""
+                    CREATE TRIGGER {self.log}_capture
+                    AFTER INSERT OR UPDATE OR DELETE ON {self.table}
+                    FOR EACH ROW EXECUTE FUNCTION {self.log}_capture()
+                    """)
+            else:
+                self._execute(f"CREATE TABLE {self.log} AS SELECT {keys} FROM {self.table} WHERE 0")
+                for event, rows in (
+                    ("insert", ("NEW",)),
+                    ("update", ("OLD", "NEW")),
+                    ("delete", ("OLD",)),
+                ):
+                    body = " ".join(self._log_insert(row) for row in rows)
+                    self._execute(f"""
+                        CREATE TRIGGER {self.log}_{event}
+                        AFTER {event.upper()} ON {self.table}
+                        BEGIN {body} END
+                        """)
+
+    def _apply(self, where: str, params: dict) -> int:
+        """Make `shadow` match `table` for every key selected by `where`."""
+        if self.prepare is not None:
+            self.prepare(self.conn, where, params)
+        self._execute(f"DELETE FROM {self.shadow} WHERE {where}", params)
+        result = self._execute(
+            f"INSERT INTO {self.shadow} ({self.columns}) "
+            f"SELECT {self.columns} FROM {self.table} WHERE {where}",
+            params,
+        )
+        return max(result.rowcount or 0, 0)
+
+    def _key_bound(self, op: str, prefix: str, values: Sequence) -> tuple[str, dict]:
+        names = [f"{prefix}_{index}" for index in range(len(self.key))]
+        placeholders = ", ".join(f":{name}" for name in names)
+        return (
+            f"({', '.join(self.key)}) {op} ({placeholders})",
+            dict(zip(names, values, strict=True)),
+        )
+
+    def _estimate_rows(self) -> int:
+        if self.is_postgres:
+            estimate = self._execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)",
+                {"table": self.table},
+            ).scalar()
+            return max(estimate or 0, 0)
+        return self._execute(f"SELECT COUNT(*) FROM {self.table}").scalar_one()
+
+    def copy(self) -> int:
+        """Copy every row of `table` in key order; returns rows copied."""
+        keys = ", ".join(self.key)
+        progress = Progress(f"rewrite {self.table}", self._estimate_rows())
+        copied = 0
+        last = None
+        while True:
+            with self._transaction():
+                lower, params = ("1 = 1", {}) if last is None else self._key_bound(">", "lo", last)
+                upper_key = self._execute(
+                    f"SELECT {keys} FROM {self.table} WHERE {lower} "
+                    f"ORDER BY {keys} LIMIT 1 OFFSET {self.batch_size - 1}",
+                    params,
+                ).first()
+                where = lower
+                if upper_key is not None:
+                    upper, upper_params = self._key_bound("<=", "hi", tuple(upper_key))
+                    where = f"{lower} AND {upper}"
+                    params = {**params, **upper_params}
+                rows = self._apply(where, params)
+            copied += rows
+            progress.advance(copied, rows)
+            if upper_key is None:
+                break
+            last = tuple(upper_key)
+            if self.pause:
+                time.sleep(self.pause)
+        progress.advance(copied, force=True)
+        return copied
+
+    def backlog(self) -> int:
+        return self._execute(f"SELECT COUNT(*) FROM {self.log}").scalar_one()
+
+    def _replay_batch(self) -> int:
+        # Runs on one snapshot, so keys logged by transactions that commit meanwhile
+        # are neither replayed nor deleted here; the next batch picks them up.
+        low, high, pending = self._execute(
+            f"SELECT MIN({self.seq}), MAX({self.seq}), COUNT(*) FROM ("
+            f"SELECT {self.seq} FROM {self.log} ORDER BY {self.seq} LIMIT {REPLAY_BATCH_SIZE}"
+            ") AS batch"
+        ).one()
+        if not pending:
+            return 0
+        keys = ", ".join(self.key)
+        params = {"seq_lo": low, "seq_hi": high}
+        self._apply(
+            f"({keys}) IN (SELECT {keys} FROM {self.log} "
+            f"WHERE {self.seq} BETWEEN :seq_lo AND :seq_hi)",
+            params,
+        )
+        self._execute(
+            f"DELETE FROM {self.log} WHERE {self.seq} BETWEEN :seq_lo AND :seq_hi", params
+        )
+        return pending
+
+    def catch_up(self) -> int:
+        """Replay logged keys until fewer than `catch_up_rows` remain; returns keys replayed."""
+        replayed = 0
+        while self.backlog() >= self.catch_up_rows:
+            with self._transaction(snapshot=True):
+                replayed += self._replay_batch()
+            if self.pause:
+                time.sleep(self.pause)
+        logging.info("Rewrite %s: replayed %s logged changes", self.table, replayed)
+        return replayed
+
+    def cut_over(self) -> None:
+        """Swap `shadow` in for `table` in one transaction, retrying if the lock times out."""
+        for attempt in range(1, self.cutover_attempts + 1):
+            try:
+                with self._transaction():
+                    if self.is_postgres:
+                        self._execute(f"SET LOCAL lock_timeout = {int(self.lock_timeout_ms)}")
+                        self._execute(f"LOCK TABLE {self.table} IN ACCESS EXCLUSIVE MODE")
+                    while self._replay_batch():
+                        pass
+                    self._drop_capture()
+                    self._execute(f"DROP TABLE {self.table}")
+                    self._execute(f"ALTER TABLE {self.shadow} RENAME TO {self.table}")
+                    if self.after_swap is not None:
+                        self.after_swap(self.conn)
+                logging.info("Rewrite %s: cut over to %s", self.table, self.shadow)
+                return
+            except exc.OperationalError:
+                if attempt == self.cutover_attempts:
+                    raise
+                logging.warning(
+                    "Rewrite %s: cutover lock not acquired (attempt %s); catching up",
+                    self.table,
+                    attempt,
+                )
+                self.catch_up()
+
+    def run(self) -> int:
+        """Install capture, copy, catch up and cut over; returns rows copied."""
+        if self.conn.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+            raise RuntimeError(
+                "OnlineRewrite needs an AUTOCOMMIT connection, "
+                "e.g. inside op.get_context().autocommit_block()"
+            )
+        self.install()
+        copied = self.copy()
+        self.catch_up()
+        self.cut_over()
+        return copied
+
+
+ChunkFn = Callable[..., int]
+
+checkpoints = Table(
+    "backfill_checkpoints",
+    MetaData(),
+    Column("name", String, primary_key=True),
+    Column("last_id", Integer, nullable=False),
+    Column("max_id", Integer, nullable=False),
+    Column("rows", Integer, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+    Column("finished_at", DateTime, nullable=True),
+)
+
+
+def _commit(conn) -> None:
+    # Under AUTOCOMMIT (e.g. alembic's autocommit_block) every statement is already
+    # committed and the surrounding transaction object belongs to the caller.
+    if conn.get_execution_options().get("isolation_level") == "AUTOCOMMIT":
+        return
+    if conn.in_transaction():
+        conn.commit()
+
+
+def sql_chunk(update_sql: str) -> ChunkFn:
+    """Chunk step running one server-side UPDATE bound to `:lo` (exclusive) and `:hi`."""
+
+    def run(conn, lo: int, hi: int) -> int:
+        result = conn.execute(text(update_sql), {"lo": lo, "hi": hi})
+        return max(result.rowcount or 0, 0)
+
+    return run
+
+
+def python_chunk(select_sql: str, compute: Callable, update_sql: str) -> ChunkFn:
+    """Chunk step that selects rows in `(:lo, :hi]`, maps each through `compute` and
+    writes the returned parameter dicts back with one executemany UPDATE."""
+
+    def run(conn, lo: int, hi: int) -> int:
+        rows = conn.execute(text(select_sql), {"lo": lo, "hi": hi}).fetchall()
+        if not rows:
+            return 0
+        conn.execute(text(update_sql), [compute(row) for row in rows])
+        return len(rows)
+
+    return run
+
+
+def clear_checkpoint(conn, name: str) -> None:
+    conn.execute(delete(checkpoints).where(checkpoints.c.name == name))
+
+
+class Backfill:
+    """Resumable backfill over a table's integer key, one committed chunk at a time.
+
+    Progress is checkpointed in `backfill_checkpoints` (created by 0006) under `name`,
+    so a rerun after a crash continues from the last contiguous finished chunk; a
+    finished backfill is a no-op. Chunk steps must be idempotent (e.g.
+    `... WHERE derived IS NULL`), since the chunk in flight during a crash runs again.
+
+    Run it inside `op.get_context().autocommit_block()` from a migration so each chunk
+    commits on its own. With `workers > 1`, chunks run concurrently on separate
+    connections from the same engine (not useful on SQLite, whose writes serialize).
+    """
+
+    def __init__(
+        self,
+        conn,
+        name: str,
+        table: str,
+        key: str = "id",
+        chunk_size: int = 10000,
+        workers: int = 1,
+    ):
+        self.conn = conn
+        self.name = name
+        self.table = table
+        self.key = key
+        self.chunk_size = chunk_size
+        self.workers = workers
+
+    def _state(self):
+        return self.conn.execute(
+            select(checkpoints).where(checkpoints.c.name == self.name)
+        ).one_or_none()
+
+    def _save(self, last_id: int, max_id: int, rows: int, finished: bool = False) -> None:
+        now = datetime.now(timezone.utc)
+        values = {
+            "last_id": last_id,
+            "max_id": max_id,
+            "rows": rows,
+            "updated_at": now,
+            "finished_at": now if finished else None,
+        }
+        updated = self.conn.execute(
+            checkpoints.update().where(checkpoints.c.name == self.name).values(**values)
+        )
+        if updated.rowcount == 0:
+            self.conn.execute(checkpoints.insert().values(name=self.name, **values))
+        _commit(self.conn)
+
+    def _bounds(self) -> tuple[int, int] | None:
+        low, high = self.conn.execute(
+            text(f"SELECT MIN({self.key}), MAX({self.key}) FROM {self.table}")
+        ).one()
+        if low is None:
+            return None
+        return low - 1, high
+
+    def _run_chunk(self, step: ChunkFn, lo: int, hi: int) -> int:
+        if self.workers <= 1:
+            # Committed together with the checkpoint that records it.
+            return step(self.conn, lo, hi)
+        with self.conn.engine.begin() as worker_conn:
+            return step(worker_conn, lo, hi)
+
+    def run(self, step: ChunkFn) -> int:
+        """Apply `step(conn, lo, hi)` to every key range; returns rows processed this run."""
+        state = self._state()
+        if state is not None and state.finished_at is not None:
+            logging.info("Backfill %s already finished; skipping.", self.name)
+            return 0
+        if state is not None:
+            start, max_id, rows_before = state.last_id, state.max_id, state.rows
+        else:
+            bounds = self._bounds()
+            if bounds is None:
+                self._save(0, 0, 0, finished=True)
+                return 0
+            start, max_id = bounds
+            rows_before = 0
+            self._save(start, max_id, 0)
+
+        chunks = [
+            (lo, min(lo + self.chunk_size, max_id)) for lo in range(start, max_id, self.chunk_size)
+        ]
+        progress = Progress(f"backfill {self.name}", len(chunks))
+        rows = 0
+        watermark = start
+        finished: dict[int, int] = {}
+
+        def record(lo: int, hi: int, chunk_rows: int) -> None:
+            nonlocal rows, watermark
+            rows += chunk_rows
+            finished[lo] = hi
+            # Only advance past chunks whose predecessors are all done.
+            while watermark in finished:
+                watermark = finished.pop(watermark)
+            self._save(watermark, max_id, rows_before + rows)
+            progress.advance(progress.done + 1, chunk_rows)
+
+        if self.workers <= 1:
+            for lo, hi in chunks:
+                record(lo, hi, self._run_chunk(step, lo, hi))
+        else:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                pending = {}
+                for lo, hi in chunks:
+                    pending[pool.submit(self._run_chunk, step, lo, hi)] = (lo, hi)
+                    if len(pending) < self.workers * 2:
+                        continue
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record(*pending.pop(future), future.result())
+                for future in list(pending):
+                    record(*pending.pop(future), future.result())
+
+        self._save(max_id, max_id, rows_before + rows, finished=True)
+        progress.advance(progress.done, force=True)
+        return rows
@@ -8,7 +8,10 @@ Create Date: 2026-01-20
 
 from __future__ import annotations
 
+import sqlalchemy as sa
+
 from alembic import op
+from migration_helpers import OnlineRewrite, ensure_year_partitions, rename_year_partitions
 
 revision = "0004_postgres_partition_raw"
 down_revision = "0003_allow_raw_duplicates"
@@ -21,15 +24,67 @@ def _is_postgres() -> bool:
     return bind is not None and bind.dialect.name == "postgresql"
 
 
+SHADOW = "weather_records_raw_new"
+RAW_COLUMNS = (
+    "id",
+    "station_id",
+    "date",
+    "max_temp_tenths_c",
+    "min_temp_tenths_c",
+    "precip_tenths_mm",
+    "source_file",
+    "source_line",
+    "ingested_at",
+    "ingestion_run_id",
+)
+
+
+def _ensure_partitions(conn, where: str, params: dict) -> None:
+    # Year partitions are created on demand (see app.partitions), here for the years
+    # of the rows about to be copied.
+    years = conn.execute(
+        sa.text(
+            "SELECT DISTINCT CAST(EXTRACT(YEAR FROM date) AS INTEGER) "
+            f"FROM weather_records_raw WHERE {where}"
+        ),
+        params,
+    ).scalars()
+    ensure_year_partitions(conn, years, tables=[SHADOW])
+
+
+def _finish_swap(conn) -> None:
+    rename_year_partitions(conn, "weather_records_raw", SHADOW)
+    for old, new in (
+        ("ix_weather_raw_new_station_date", "ix_weather_raw_station_date"),
+        ("ix_weather_raw_new_run", "ix_weather_raw_run"),
+    ):
+        conn.execute(sa.text(f"ALTER INDEX {old} RENAME TO {new}"))
+    for suffix in ("pkey", "station_id_fkey", "ingestion_run_id_fkey"):
+        conn.execute(
+            sa.text(
+                f"ALTER TABLE weather_records_raw RENAME CONSTRAINT {SHADOW}_{suffix} "
+                f"TO weather_records_raw_{suffix}"
+            )
+        )
+    conn.execute(sa.text(f"ALTER SEQUENCE {SHADOW}_id_seq RENAME TO weather_records_raw_id_seq"))
+    conn.execute(
+        sa.text(
+            "SELECT setval('weather_records_raw_id_seq', "
+            "COALESCE((SELECT MAX(id) FROM weather_records_raw), 0) + 1, false)"
+        )
+    )
+
+
 def upgrade() -> None:
     if not _is_postgres():
         return
 
-    op.execute("ALTER TABLE weather_records_raw RENAME TO weather_records_raw_old")
-
-    op.execute("""
-        CREATE TABLE weather_records_raw (
-          id SERIAL PRIMARY KEY,
+    # The partitioned copy is built next to the live table and swapped in at the end;
+    # ingestion keeps writing to weather_records_raw meanwhile.
+    op.execute(f"DROP TABLE IF EXISTS {SHADOW}")
+    op.execute(f"""
+        CREATE TABLE {SHADOW} (
+          id SERIAL,
           station_id TEXT NOT NULL REFERENCES weather_stations(station_id),
           date DATE NOT NULL,
           max_temp_tenths_c INTEGER,
@@ -38,28 +93,25 @@ def upgrade() -> None:
           source_file TEXT NOT NULL,
           source_line INTEGER NOT NULL,
           ingested_at TIMESTAMP NOT NULL,
-          ingestion_run_id INTEGER NOT NULL REFERENCES ingestion_runs(id)
+          ingestion_run_id INTEGER NOT NULL REFERENCES ingestion_runs(id),
+          PRIMARY KEY (id, date)
         ) PARTITION BY RANGE (date);
         """)
-
-    for year in range(1985, 2016):
-        op.execute(f"""
-            CREATE TABLE weather_records_raw_{year} PARTITION OF weather_records_raw
-            FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')
-            PARTITION BY HASH (station_id);
-            """)
-        for remainder in range(4):
-            op.execute(f"""
-                CREATE TABLE weather_records_raw_{year}_p{remainder}
-                PARTITION OF weather_records_raw_{year}
-                FOR VALUES WITH (MODULUS 4, REMAINDER {remainder});
-                """)
-
-    op.execute("CREATE INDEX ix_weather_raw_station_date ON weather_records_raw (station_id, date)")
-    op.execute("CREATE INDEX ix_weather_raw_run ON weather_records_raw (ingestion_run_id)")
-
-    op.execute("INSERT INTO weather_records_raw SELECT * FROM weather_records_raw_old")
-    op.execute("DROP TABLE weather_records_raw_old")
+    op.execute(f"CREATE INDEX ix_weather_raw_new_station_date ON {SHADOW} (station_id, date)")
+    op.execute(f"CREATE INDEX ix_weather_raw_new_run ON {SHADOW} (ingestion_run_id)")
+
+    conn = op.get_bind()
+    with op.get_context().autocommit_block():
+        OnlineRewrite(
+            conn,
+            "weather_records_raw",
+            SHADOW,
+            RAW_COLUMNS,
+            key=("id",),
+            batch_size=50000,
+            prepare=_ensure_partitions,
+            after_swap=_finish_swap,
+        ).run()
 
 
 def downgrade() -> None:
@@ -67,6 +119,8 @@ def downgrade() -> None:
         return
 
     op.execute("ALTER TABLE weather_records_raw RENAME TO weather_records_raw_part")
+    op.execute("DROP INDEX ix_weather_raw_station_date")
+    op.execute("DROP INDEX ix_weather_raw_run")
     op.execute("""
         CREATE TABLE weather_records_raw (
           id SERIAL PRIMARY KEY,
@@ -84,4 +138,8 @@ def downgrade() -> None:
     op.execute("CREATE INDEX ix_weather_raw_station_date ON weather_records_raw (station_id, date)")
     op.execute("CREATE INDEX ix_weather_raw_run ON weather_records_raw (ingestion_run_id)")
     op.execute("INSERT INTO weather_records_raw SELECT * FROM weather_records_raw_part")
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('weather_records_raw', 'id'), "
+        "COALESCE((SELECT MAX(id) FROM weather_records_raw), 0) + 1, false)"
+    )
     op.execute("DROP TABLE weather_records_raw_part")
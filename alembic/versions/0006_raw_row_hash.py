@@ -13,6 +13,7 @@ import hashlib
 import sqlalchemy as sa
 
 from alembic import op
+from migration_helpers import Backfill, python_chunk, sql_chunk
 
 revision = "0006_raw_row_hash"
 down_revision = "0005_ingestion_events"
@@ -37,34 +38,47 @@ def _row_hash(row) -> str:
     return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
-def _backfill_hashes(conn) -> None:
-    batch_size = 10000
-    last_id = 0
+BACKFILL_NAME = "0006_raw_row_hash"
 
-    while True:
-        rows = conn.execute(
-            sa.text("""
-                SELECT id, station_id, date, max_temp_tenths_c, min_temp_tenths_c, precip_tenths_mm
-                FROM weather_records_raw
-                WHERE id > :last_id
-                ORDER BY id
-                LIMIT :limit
-                """),
-            {"last_id": last_id, "limit": batch_size},
-        ).fetchall()
-
-        if not rows:
-            break
-
-        updates = []
-        for row in rows:
-            updates.append({"id": row.id, "row_hash": _row_hash(row)})
-            last_id = row.id
-
-        conn.execute(
-            sa.text("UPDATE weather_records_raw SET row_hash = :row_hash WHERE id = :id"),
-            updates,
+# Same payload as app.ingest.weather._row_hash, hashed by Postgres itself (sha256() is
+# built in since Postgres 11, so pgcrypto is not needed).
+PG_HASH_UPDATE = """
+    UPDATE weather_records_raw
+    SET row_hash = encode(sha256(convert_to(
+      station_id || '|' || to_char(date, 'YYYY-MM-DD')
+      || '|' || COALESCE(max_temp_tenths_c::text, 'NA')
+      || '|' || COALESCE(min_temp_tenths_c::text, 'NA')
+      || '|' || COALESCE(precip_tenths_mm::text, 'NA'),
+      'UTF8')), 'hex')
+    WHERE id > :lo AND id <= :hi AND row_hash IS NULL
+    """
+
+
+def _hash_update(row) -> dict:
+    return {"id": row.id, "row_hash": _row_hash(row)}
+
+
+def _backfill_hashes(conn) -> None:
+    if conn.dialect.name == "postgresql":
+        step = sql_chunk(PG_HASH_UPDATE)
+        # Chunks cover disjoint id ranges, so they update in parallel on their own
+        # connections without contending for row locks.
+        backfill = Backfill(
+            conn, BACKFILL_NAME, "weather_records_raw", chunk_size=100000, workers=4
         )
+    else:
+        # SQLite serializes writers, so extra workers would only queue on its lock.
+        step = python_chunk(
+            """
+            SELECT id, station_id, date, max_temp_tenths_c, min_temp_tenths_c, precip_tenths_mm
+            FROM weather_records_raw
+            WHERE id > :lo AND id <= :hi AND row_hash IS NULL
+            """,
+            _hash_update,
+            "UPDATE weather_records_raw SET row_hash = :row_hash WHERE id = :id",
+        )
+        backfill = Backfill(conn, BACKFILL_NAME, "weather_records_raw")
+    backfill.run(step)
 
 
 def _dedupe_by_hash(conn) -> None:
@@ -83,19 +97,40 @@ def _dedupe_by_hash(conn) -> None:
 
 
 def upgrade() -> None:
-    with op.batch_alter_table("weather_records_raw") as batch:
-        batch.add_column(sa.Column("row_hash", sa.String(length=64), nullable=True))
-
     conn = op.get_bind()
-    _backfill_hashes(conn)
+    inspector = sa.inspect(conn)
+    # A previous attempt may have been interrupted after these were committed.
+    if "backfill_checkpoints" not in inspector.get_table_names():
+        op.create_table(
+            "backfill_checkpoints",
+            sa.Column("name", sa.String(), primary_key=True),
+            sa.Column("last_id", sa.Integer(), nullable=False),
+            sa.Column("max_id", sa.Integer(), nullable=False),
+            sa.Column("rows", sa.Integer(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+        )
+    columns = {column["name"] for column in inspector.get_columns("weather_records_raw")}
+    if "row_hash" not in columns:
+        with op.batch_alter_table("weather_records_raw") as batch:
+            batch.add_column(sa.Column("row_hash", sa.String(length=64), nullable=True))
+
+    # Each backfill chunk commits with its checkpoint, so a rerun resumes where it stopped.
+    with op.get_context().autocommit_block():
+        _backfill_hashes(conn)
+
     _dedupe_by_hash(conn)
 
+    # The partitioned Postgres table can only enforce uniqueness together with its
+    # partition key; the hash already covers the date, so this is equivalent.
+    unique_columns = ["row_hash", "date"] if conn.dialect.name == "postgresql" else ["row_hash"]
     with op.batch_alter_table("weather_records_raw") as batch:
         batch.alter_column("row_hash", nullable=False)
-        batch.create_unique_constraint("uq_weather_raw_row_hash", ["row_hash"])
+        batch.create_unique_constraint("uq_weather_raw_row_hash", unique_columns)
 
 
 def downgrade() -> None:
     with op.batch_alter_table("weather_records_raw") as batch:
         batch.drop_constraint("uq_weather_raw_row_hash", type_="unique")
         batch.drop_column("row_hash")
+    op.drop_table("backfill_checkpoints")
@@ -0,0 +1,32 @@
+"""index ingestion events for run cursors and time ordering
+
+Revision ID: 0007_ingestion_events_indexes
+Revises: 0006_raw_row_hash
+Create Date: 2026-10-19
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0007_ingestion_events_indexes"
+down_revision = "0006_raw_row_hash"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.drop_index("ix_ingestion_events_run", table_name="ingestion_events")
+    op.create_index(
+        "ix_ingestion_events_run_id",
+        "ingestion_events",
+        ["ingestion_run_id", "id"],
+    )
+    op.create_index("ix_ingestion_events_created_at", "ingestion_events", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ingestion_events_created_at", table_name="ingestion_events")
+    op.drop_index("ix_ingestion_events_run_id", table_name="ingestion_events")
+    op.create_index("ix_ingestion_events_run", "ingestion_events", ["ingestion_run_id"])
@@ -0,0 +1,31 @@
+"""add dataset versions for snapshot invalidation
+
+Revision ID: 0008_dataset_versions
+Revises: 0007_ingestion_events_indexes
+Create Date: 2026-10-19
+
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "0008_dataset_versions"
+down_revision = "0007_ingestion_events_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dataset_versions",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("dataset_versions")
@@ -0,0 +1,43 @@
+"""add packed per-station-year weather blocks
+
+Revision ID: 0009_weather_year_blocks
+Revises: 0008_dataset_versions
+Create Date: 2026-10-19
+
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "0009_weather_year_blocks"
+down_revision = "0008_dataset_versions"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "weather_year_blocks",
+        sa.Column(
+            "station_id",
+            sa.String(),
+            sa.ForeignKey("weather_stations.station_id"),
+            primary_key=True,
+        ),
+        sa.Column("year", sa.Integer(), primary_key=True),
+        sa.Column("day_count", sa.Integer(), nullable=False),
+        sa.Column("present", sa.LargeBinary(), nullable=False),
+        sa.Column("null_mask", sa.LargeBinary(), nullable=False),
+        sa.Column("max_temp_tenths_c", sa.LargeBinary(), nullable=False),
+        sa.Column("min_temp_tenths_c", sa.LargeBinary(), nullable=False),
+        sa.Column("precip_tenths_mm", sa.LargeBinary(), nullable=False),
+    )
+    # Left empty: reads fall back to weather_records for stations without blocks until
+    # `python -m app.packed` packs the existing curated rows.
+
+
+def downgrade() -> None:
+    op.drop_table("weather_year_blocks")
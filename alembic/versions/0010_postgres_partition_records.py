@@ -0,0 +1,118 @@
+"""partition curated weather records by year and station (postgres only)
+
+Revision ID: 0010_postgres_partition_records
+Revises: 0009_weather_year_blocks
+Create Date: 2026-10-19
+
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+from migration_helpers import OnlineRewrite, ensure_year_partitions, rename_year_partitions
+
+revision = "0010_postgres_partition_records"
+down_revision = "0009_weather_year_blocks"
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    "station_id, date, max_temp_tenths_c, min_temp_tenths_c, precip_tenths_mm, "
+    "max_temp_raw_id, min_temp_raw_id, precip_raw_id"
+)
+SHADOW = "weather_records_new"
+
+
+def _is_postgres() -> bool:
+    bind = op.get_bind()
+    return bind is not None and bind.dialect.name == "postgresql"
+
+
+def _create_records_table(name: str, partitioned: bool) -> None:
+    index_prefix = "ix_" + name
+    partition_clause = "PARTITION BY RANGE (date)" if partitioned else ""
+    op.execute(f"""
+        CREATE TABLE {name} (
+          station_id VARCHAR NOT NULL REFERENCES weather_stations(station_id),
+          date DATE NOT NULL,
+          max_temp_tenths_c INTEGER,
+          min_temp_tenths_c INTEGER,
+          precip_tenths_mm INTEGER,
+          max_temp_raw_id INTEGER,
+          min_temp_raw_id INTEGER,
+          precip_raw_id INTEGER,
+          PRIMARY KEY (station_id, date)
+        ) {partition_clause};
+        """)
+    op.execute(f"CREATE INDEX {index_prefix}_date ON {name} (date)")
+    op.execute(f"CREATE INDEX {index_prefix}_station_date ON {name} (station_id, date)")
+
+
+def _rename_old_table(new_name: str) -> None:
+    op.execute(f"ALTER TABLE weather_records RENAME TO {new_name}")
+    op.execute(f"ALTER TABLE {new_name} RENAME CONSTRAINT weather_records_pkey TO {new_name}_pkey")
+    op.execute("DROP INDEX ix_weather_records_date")
+    op.execute("DROP INDEX ix_weather_records_station_date")
+
+
+def _ensure_partitions(conn, where: str, params: dict) -> None:
+    years = conn.execute(
+        sa.text(
+            "SELECT DISTINCT CAST(EXTRACT(YEAR FROM date) AS INTEGER) "
+            f"FROM weather_records WHERE {where}"
+        ),
+        params,
+    ).scalars()
+    ensure_year_partitions(conn, years, tables=[SHADOW])
+
+
+def _finish_swap(conn) -> None:
+    rename_year_partitions(conn, "weather_records", SHADOW)
+    for suffix in ("date", "station_date"):
+        conn.execute(
+            sa.text(
+                f"ALTER INDEX ix_weather_records_new_{suffix} "
+                f"RENAME TO ix_weather_records_{suffix}"
+            )
+        )
+    for suffix in ("pkey", "station_id_fkey"):
+        conn.execute(
+            sa.text(
+                f"ALTER TABLE weather_records RENAME CONSTRAINT {SHADOW}_{suffix} "
+                f"TO weather_records_{suffix}"
+            )
+        )
+
+
+def upgrade() -> None:
+    if not _is_postgres():
+        return
+
+    op.execute(f"DROP TABLE IF EXISTS {SHADOW}")
+    _create_records_table(SHADOW, partitioned=True)
+    conn = op.get_bind()
+    with op.get_context().autocommit_block():
+        OnlineRewrite(
+            conn,
+            "weather_records",
+            SHADOW,
+            [column.strip() for column in COLUMNS.split(",")],
+            key=("station_id", "date"),
+            batch_size=50000,
+            prepare=_ensure_partitions,
+            after_swap=_finish_swap,
+        ).run()
+
+
+def downgrade() -> None:
+    if not _is_postgres():
+        return
+
+    _rename_old_table("weather_records_part")
+    _create_records_table("weather_records", partitioned=False)
+    op.execute(
+        f"INSERT INTO weather_records ({COLUMNS}) SELECT {COLUMNS} FROM weather_records_part"
+    )
+    op.execute("DROP TABLE weather_records_part")
@@ -0,0 +1,66 @@
+"""drop redundant indexes, add covering, BRIN and filter indexes
+
+Revision ID: 0011_index_audit
+Revises: 0010_postgres_partition_records
+Create Date: 2026-10-19
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0011_index_audit"
+down_revision = "0010_postgres_partition_records"
+branch_labels = None
+depends_on = None
+
+VALUE_COLUMNS = ["max_temp_tenths_c", "min_temp_tenths_c", "precip_tenths_mm"]
+
+
+def _is_postgres() -> bool:
+    bind = op.get_bind()
+    return bind is not None and bind.dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    # Both duplicate their table's primary key.
+    op.drop_index("ix_weather_records_station_date", table_name="weather_records")
+    op.drop_index("ix_weather_stats_station_year", table_name="weather_stats")
+
+    op.create_index("ix_weather_conflicts_run", "weather_conflicts", ["ingestion_run_id"])
+    op.create_index(
+        "ix_weather_conflicts_station_date", "weather_conflicts", ["station_id", "date"]
+    )
+    op.create_index(
+        "ix_ingestion_events_level_created_at", "ingestion_events", ["level", "created_at"]
+    )
+
+    if _is_postgres():
+        # Index-only scans for station + date range reads.
+        op.create_index(
+            "ix_weather_records_station_date_cover",
+            "weather_records",
+            ["station_id", "date"],
+            postgresql_include=VALUE_COLUMNS,
+        )
+        op.create_index(
+            "ix_weather_records_date_brin", "weather_records", ["date"], postgresql_using="brin"
+        )
+        op.create_index(
+            "ix_weather_raw_date_brin", "weather_records_raw", ["date"], postgresql_using="brin"
+        )
+
+
+def downgrade() -> None:
+    if _is_postgres():
+        op.drop_index("ix_weather_raw_date_brin", table_name="weather_records_raw")
+        op.drop_index("ix_weather_records_date_brin", table_name="weather_records")
+        op.drop_index("ix_weather_records_station_date_cover", table_name="weather_records")
+
+    op.drop_index("ix_ingestion_events_level_created_at", table_name="ingestion_events")
+    op.drop_index("ix_weather_conflicts_station_date", table_name="weather_conflicts")
+    op.drop_index("ix_weather_conflicts_run", table_name="weather_conflicts")
+
+    op.create_index("ix_weather_stats_station_year", "weather_stats", ["station_id", "year"])
+    op.create_index("ix_weather_records_station_date", "weather_records", ["station_id", "date"])
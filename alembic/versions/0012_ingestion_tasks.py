@@ -0,0 +1,48 @@
+"""add ingestion task queue
+
+Revision ID: 0012_ingestion_tasks
+Revises: 0011_index_audit
+Create Date: 2026-10-19
+
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "0012_ingestion_tasks"
+down_revision = "0011_index_audit"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ingestion_tasks",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("ingestion_run_id", sa.Integer(), nullable=False),
+        sa.Column("station_id", sa.String(), nullable=False),
+        sa.Column("source_file", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("worker", sa.String(), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("processed_count", sa.Integer(), nullable=False),
+        sa.Column("inserted_raw_count", sa.Integer(), nullable=False),
+        sa.Column("first_year", sa.Integer(), nullable=True),
+        sa.Column("last_year", sa.Integer(), nullable=True),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["ingestion_run_id"], ["ingestion_runs.id"]),
+        sa.UniqueConstraint(
+            "ingestion_run_id", "station_id", name="uq_ingestion_tasks_run_station"
+        ),
+    )
+    op.create_index("ix_ingestion_tasks_status_id", "ingestion_tasks", ["status", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ingestion_tasks_status_id", table_name="ingestion_tasks")
+    op.drop_table("ingestion_tasks")
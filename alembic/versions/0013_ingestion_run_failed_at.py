@@ -0,0 +1,28 @@
+"""record failed ingestion runs
+
+Revision ID: 0013_ingestion_run_failed_at
+Revises: 0012_ingestion_tasks
+Create Date: 2026-10-19
+
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "0013_ingestion_run_failed_at"
+down_revision = "0012_ingestion_tasks"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("ingestion_runs") as batch_op:
+        batch_op.add_column(sa.Column("failed_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("ingestion_runs") as batch_op:
+        batch_op.drop_column("failed_at")
@@ -0,0 +1,33 @@
+"""drop the B-tree date index of weather_records on postgres in favour of BRIN
+
+Revision ID: 0014_drop_records_date_btree
+Revises: 0013_ingestion_run_failed_at
+Create Date: 2026-10-19
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0014_drop_records_date_btree"
+down_revision = "0013_ingestion_run_failed_at"
+branch_labels = None
+depends_on = None
+
+
+def _is_postgres() -> bool:
+    bind = op.get_bind()
+    return bind is not None and bind.dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    # Year partitions already prune date-only windows, and ix_weather_records_date_brin
+    # narrows them further; the B-tree only added write cost and several times its size.
+    if _is_postgres():
+        op.drop_index("ix_weather_records_date", table_name="weather_records")
+
+
+def downgrade() -> None:
+    if _is_postgres():
+        op.create_index("ix_weather_records_date", "weather_records", ["date"])
@@ -0,0 +1,30 @@
+"""mark fully packed weather stations
+
+Revision ID: 0015_weather_stations_packed_at
+Revises: 0014_drop_records_date_btree
+Create Date: 2026-10-19
+
+"""
+
+from __future__ import annotations
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "0015_weather_stations_packed_at"
+down_revision = "0014_drop_records_date_btree"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Blocks written before this revision may cover only part of a station's history, so
+    # every station starts unmarked; the next ingestion or `python -m app.packed` packs it.
+    with op.batch_alter_table("weather_stations") as batch_op:
+        batch_op.add_column(sa.Column("packed_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("weather_stations") as batch_op:
+        batch_op.drop_column("packed_at")
@@ -0,0 +1,92 @@
+"""Time the weather query patterns the index set is designed for, with their plans.
+
+Run against a loaded database before and after `alembic upgrade`:
+
+    PYTHONPATH=src python scripts/bench_indexes.py --repeat 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from datetime import timedelta
+
+from sqlalchemy import func, select
+
+from app import db
+from app.models import IngestionEvent, WeatherConflict, WeatherRecord
+
+
+def _queries(conn):
+    station_id, last_date = conn.execute(
+        select(WeatherRecord.station_id, func.max(WeatherRecord.date))
+        .group_by(WeatherRecord.station_id)
+        .limit(1)
+    ).one()
+    week_start = last_date - timedelta(days=6)
+    year_start = last_date - timedelta(days=364)
+    values = (
+        WeatherRecord.max_temp_tenths_c,
+        WeatherRecord.min_temp_tenths_c,
+        WeatherRecord.precip_tenths_mm,
+    )
+    run_id = conn.execute(select(func.max(WeatherConflict.ingestion_run_id))).scalar()
+
+    return {
+        "station_year_range": select(WeatherRecord.date, *values)
+        .where(
+            WeatherRecord.station_id == station_id,
+            WeatherRecord.date.between(year_start, last_date),
+        )
+        .order_by(WeatherRecord.date),
+        "all_stations_one_week": select(WeatherRecord.station_id, WeatherRecord.date, *values)
+        .where(WeatherRecord.date.between(week_start, last_date))
+        .order_by(WeatherRecord.station_id, WeatherRecord.date)
+        .limit(1000),
+        "conflicts_for_run": select(WeatherConflict).where(
+            WeatherConflict.ingestion_run_id == run_id
+        ),
+        "conflicts_for_station": select(WeatherConflict)
+        .where(WeatherConflict.station_id == station_id)
+        .order_by(WeatherConflict.date),
+        "events_by_level": select(IngestionEvent)
+        .where(IngestionEvent.level == "ERROR")
+        .order_by(IngestionEvent.created_at.desc())
+        .limit(100),
+    }
+
+
+def _plan(conn, stmt) -> str:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+        return "\n".join(str(row[-1]) for row in rows)
+    rows = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS) {sql}").all()
+    return "\n".join(str(row[0]) for row in rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--no-plans", action="store_true", help="Only print timings")
+    args = parser.parse_args()
+
+    with db.engine.connect() as conn:
+        for name, stmt in _queries(conn).items():
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                rows = len(conn.execute(stmt).all())
+                timings.append((time.perf_counter() - start) * 1000)
+            print(
+                f"{name}: rows={rows} median_ms={statistics.median(timings):.2f} "
+                f"min_ms={min(timings):.2f}"
+            )
+            if not args.no_plans:
+                for line in _plan(conn, stmt).splitlines():
+                    print(f"    {line}")
+
+
+if __name__ == "__main__":
+    main()
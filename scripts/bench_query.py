@@ -0,0 +1,61 @@
+"""Compare ORM hydration with `app.query` column reads on the loaded database.
+
+PYTHONPATH=src python scripts/bench_query.py --stations 50 --kind numpy
+"""
+
+from __future__ import annotations
+
+import argparse
+import resource
+import time
+
+from sqlalchemy import select
+
+from app import db, query
+from app.models import WeatherRecord
+
+
+def _timed(label: str, fn) -> None:
+    start = time.perf_counter()
+    rows = fn()
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"{label}: rows={rows} seconds={elapsed:.2f} rows_per_sec={rows / elapsed:.0f} "
+        f"peak_rss_mb={peak_mb:.0f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stations", type=int, default=50)
+    parser.add_argument("--kind", default="lists", choices=["lists", "numpy", "pandas"])
+    parser.add_argument(
+        "--orm", action="store_true", help="Also time ORM hydration (peak RSS then covers both)"
+    )
+    args = parser.parse_args()
+
+    with db.ReadSessionLocal() as session:
+        stations = list(
+            session.execute(
+                select(WeatherRecord.station_id).distinct().limit(args.stations)
+            ).scalars()
+        )
+
+    # Run the column read first: ru_maxrss only ever grows.
+    _timed(
+        f"app.query kind={args.kind}",
+        lambda: len(query.weather_columns(station_ids=stations, kind=args.kind)["date"]),
+    )
+    if args.orm:
+
+        def orm_rows():
+            with db.ReadSessionLocal() as session:
+                stmt = select(WeatherRecord).where(WeatherRecord.station_id.in_(stations))
+                return len(session.execute(stmt).scalars().all())
+
+        _timed("orm scalars().all()", orm_rows)
+
+
+if __name__ == "__main__":
+    main()
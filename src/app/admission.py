@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Callable, Mapping
+from datetime import date
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+
+# Used when a request leaves the date range open (roughly the 1985-2014 dataset).
+DEFAULT_HISTORY_DAYS = 30 * 365
+
+
+def _parse_date(value: str | None) -> date | None:
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _parse_int(value: str | None, default: int) -> int:
+    try:
+        return int(value) if value is not None else default
+    except ValueError:
+        return default
+
+
+def estimate_weather_cost(params: Mapping[str, str]) -> int:
+    """Rough number of rows the database touches for a weather query."""
+    stations = 1 if params.get("station_id") else settings.admission_station_estimate
+
+    if params.get("date"):
+        days = 1
+    else:
+        start = _parse_date(params.get("start_date"))
+        end = _parse_date(params.get("end_date"))
+        if start and end:
+            days = max((end - start).days + 1, 1)
+        else:
+            days = DEFAULT_HISTORY_DAYS
+
+    page = max(_parse_int(params.get("page"), 1), 1)
+    page_size = max(_parse_int(params.get("page_size"), settings.page_size_default), 1)
+    return stations * days + (page - 1) * page_size
+
+
+def always_heavy(_params: Mapping[str, str]) -> int:
+    return settings.admission_heavy_cost
+
+
+class RouteLimiter:
+    """Concurrency limit with a bounded FIFO wait queue."""
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.CancelledError:
+            # A slot may have been handed over just before the client went away.
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        # Hand the slot straight to the next live waiter so `active` never dips
+        # and lets a newcomer jump the queue.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class AdmissionController:
+    """HTTP middleware that queues or sheds expensive requests per route."""
+
+    def __init__(self, costs: Mapping[str, Callable[[Mapping[str, str]], int]]):
+        self.costs = dict(costs)
+        self.limiters = {
+            path: RouteLimiter(
+                settings.admission_max_concurrent,
+                settings.admission_queue_size,
+                settings.admission_queue_timeout,
+            )
+            for path in costs
+        }
+
+    @classmethod
+    def default(cls) -> AdmissionController:
+        return cls(
+            {
+                "/api/weather": estimate_weather_cost,
+                "/api/weather/aggregate": estimate_weather_cost,
+                "/api/weather/batch": always_heavy,
+            }
+        )
+
+    async def __call__(self, request: Request, call_next):
+        estimate = self.costs.get(request.url.path)
+        if (
+            estimate is None
+            or settings.admission_max_concurrent <= 0
+            or estimate(request.query_params) < settings.admission_heavy_cost
+        ):
+            return await call_next(request)
+
+        limiter = self.limiters[request.url.path]
+        if not await limiter.acquire():
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "Too many expensive queries in flight; retry later."},
+                headers={"Retry-After": str(settings.admission_retry_after)},
+            )
+        try:
+            return await call_next(request)
+        finally:
+            limiter.release()
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db import get_session
+from app.metrics import TimedRoute
+from app.models import WeatherRecord
+from app.schemas import PaginatedAggregateResponse, WeatherAggregateOut
+from app.stats import bucket_start_expression
+from app.utils import clamp_page_size
+from app.versions import WEATHER_RECORDS, current_version
+
+router = APIRouter(route_class=TimedRoute)
+PAGE_SIZE_QUERY = Query(default=settings.page_size_default, ge=1)
+SESSION_DEP = Depends(get_session)
+
+
+@router.get("/weather/aggregate", response_model=PaginatedAggregateResponse)
+def aggregate_weather(
+    request: Request,
+    bucket: Literal["week", "month", "year"] = "month",
+    station_id: str | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    page: int = 1,
+    page_size: int = PAGE_SIZE_QUERY,
+    session: Session = SESSION_DEP,
+):
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date.")
+
+    page = max(page, 1)
+    page_size = clamp_page_size(page_size, settings.page_size_max)
+
+    cache = request.app.state.aggregate_cache
+    cache_key = (
+        # Bumped by every station merge, including those of runs still in progress.
+        current_version(session, WEATHER_RECORDS),
+        bucket,
+        station_id,
+        start_date,
+        end_date,
+        page,
+        page_size,
+    )
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    filters = []
+    if station_id:
+        filters.append(WeatherRecord.station_id == station_id)
+    if start_date:
+        filters.append(WeatherRecord.date >= start_date)
+    if end_date:
+        filters.append(WeatherRecord.date <= end_date)
+
+    bucket_expr = bucket_start_expression(bucket).label("bucket_start")
+    aggregate_stmt = select(
+        WeatherRecord.station_id.label("station_id"),
+        bucket_expr,
+        func.count().label("days"),
+        (func.avg(WeatherRecord.max_temp_tenths_c) / 10.0).label("avg_max_temp_c"),
+        (func.avg(WeatherRecord.min_temp_tenths_c) / 10.0).label("avg_min_temp_c"),
+        (func.sum(WeatherRecord.precip_tenths_mm) / 100.0).label("total_precip_cm"),
+    ).group_by(WeatherRecord.station_id, bucket_expr)
+    if filters:
+        aggregate_stmt = aggregate_stmt.where(*filters)
+
+    count_stmt = select(func.count()).select_from(aggregate_stmt.subquery())
+    total = session.execute(count_stmt).scalar_one()
+
+    stmt = (
+        aggregate_stmt.order_by(WeatherRecord.station_id, bucket_expr)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    )
+    data = [WeatherAggregateOut(**row._asdict()) for row in session.execute(stmt)]
+
+    response = PaginatedAggregateResponse(
+        data=data,
+        bucket=bucket,
+        page=page,
+        page_size=page_size,
+        total=total,
+    )
+    cache.set(cache_key, response)
+    return response
@@ -1,24 +1,46 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Query
+import asyncio
+import json
+import time
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
+from app import db
 from app.config import settings
 from app.db import get_session
-from app.models import IngestionEvent
+from app.metrics import TimedRoute
+from app.models import IngestionEvent, IngestionRun
 from app.schemas import IngestionEventOut, PaginatedIngestionEventsResponse
 from app.utils import clamp_page_size
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 PAGE_SIZE_QUERY = Query(default=settings.page_size_default, ge=1)
 SESSION_DEP = Depends(get_session)
+LAST_EVENT_ID_HEADER = Header(default=None)
+STREAM_BATCH_SIZE = 500
+PROGRESS_LEVEL = "PROGRESS"
+
+
+def _event_out(record: IngestionEvent) -> IngestionEventOut:
+    return IngestionEventOut(
+        id=record.id,
+        ingestion_run_id=record.ingestion_run_id,
+        level=record.level,
+        message=record.message,
+        created_at=record.created_at.isoformat(),
+    )
 
 
 @router.get("/ingestion/events", response_model=PaginatedIngestionEventsResponse)
 def list_ingestion_events(
     ingestion_run_id: int | None = None,
     level: str | None = None,
+    since_id: int | None = None,
     page: int = 1,
     page_size: int = PAGE_SIZE_QUERY,
     session: Session = SESSION_DEP,
@@ -31,31 +53,29 @@ def list_ingestion_events(
         filters.append(IngestionEvent.ingestion_run_id == ingestion_run_id)
     if level:
         filters.append(IngestionEvent.level == level)
+    if since_id is not None:
+        filters.append(IngestionEvent.id > since_id)
 
     count_stmt = select(func.count()).select_from(IngestionEvent)
     if filters:
         count_stmt = count_stmt.where(*filters)
     total = session.execute(count_stmt).scalar_one()
 
-    stmt = select(IngestionEvent).order_by(
-        IngestionEvent.created_at.desc(),
-        IngestionEvent.id.desc(),
-    )
-    if filters:
-        stmt = stmt.where(*filters)
-    stmt = stmt.offset((page - 1) * page_size).limit(page_size)
+    if since_id is not None:
+        # Cursor mode: oldest first after the last id the caller has seen.
+        stmt = select(IngestionEvent).order_by(IngestionEvent.id).where(*filters).limit(page_size)
+    else:
+        stmt = select(IngestionEvent).order_by(
+            IngestionEvent.created_at.desc(),
+            IngestionEvent.id.desc(),
+        )
+        if filters:
+            stmt = stmt.where(*filters)
+        stmt = stmt.offset((page - 1) * page_size).limit(page_size)
 
     records = session.execute(stmt).scalars().all()
 
-    data = [
-        IngestionEventOut(
-            ingestion_run_id=record.ingestion_run_id,
-            level=record.level,
-            message=record.message,
-            created_at=record.created_at.isoformat(),
-        )
-        for record in records
-    ]
+    data = [_event_out(record) for record in records]
 
     return PaginatedIngestionEventsResponse(
         data=data,
@@ -63,3 +83,110 @@ def list_ingestion_events(
         page_size=page_size,
         total=total,
     )
+
+
+def parse_progress(message: str) -> dict[str, int | float | str]:
+    """Parse a `key=value key=value` progress message into typed fields."""
+    fields: dict[str, int | float | str] = {}
+    for part in message.split():
+        key, _, value = part.partition("=")
+        for convert in (int, float):
+            try:
+                fields[key] = convert(value)
+                break
+            except ValueError:
+                continue
+        else:
+            fields[key] = value
+    return fields
+
+
+def _fetch_run_events(run_id: int, after_id: int) -> tuple[list[IngestionEventOut], str | None]:
+    """Events after `after_id`, and "finished" or "failed" once the run has stopped."""
+    with db.ReadSessionLocal() as session:
+        state = session.execute(
+            select(IngestionRun.finished_at, IngestionRun.failed_at).where(
+                IngestionRun.id == run_id
+            )
+        ).one_or_none()
+        records = (
+            session.execute(
+                select(IngestionEvent)
+                .where(IngestionEvent.ingestion_run_id == run_id, IngestionEvent.id > after_id)
+                .order_by(IngestionEvent.id)
+                .limit(STREAM_BATCH_SIZE)
+            )
+            .scalars()
+            .all()
+        )
+        events = [_event_out(record) for record in records]
+    # The run is done only once its final events have been drained too.
+    if state is None or len(events) == STREAM_BATCH_SIZE:
+        return events, None
+    finished_at, failed_at = state
+    if finished_at is not None:
+        return events, "finished"
+    if failed_at is not None:
+        return events, "failed"
+    return events, None
+
+
+def _sse_message(event: str, data: dict, event_id: int | None = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def _run_event_stream(run_id: int, after_id: int):
+    last_event_at = last_sent_at = time.monotonic()
+    while True:
+        events, status = await run_in_threadpool(_fetch_run_events, run_id, after_id)
+        for event in events:
+            data = event.model_dump()
+            if event.level == PROGRESS_LEVEL:
+                data["progress"] = parse_progress(event.message)
+                name = "progress"
+            else:
+                name = "log"
+            yield _sse_message(name, data, event.id)
+            after_id = event.id
+        now = time.monotonic()
+        if events:
+            last_event_at = last_sent_at = now
+        if status is None and now - last_event_at >= settings.ingestion_stream_idle_seconds:
+            status = "idle"
+        if status is not None:
+            yield _sse_message(
+                "end", {"ingestion_run_id": run_id, "last_event_id": after_id, "status": status}
+            )
+            return
+        if not events:
+            if now - last_sent_at >= settings.ingestion_stream_keepalive_seconds:
+                yield ": keep-alive\n\n"
+                last_sent_at = now
+            await asyncio.sleep(settings.ingestion_stream_poll_seconds)
+
+
+@router.get("/ingestion/runs/{run_id}/stream")
+def stream_ingestion_run(
+    run_id: int,
+    since_id: int | None = None,
+    last_event_id: str | None = LAST_EVENT_ID_HEADER,
+    session: Session = SESSION_DEP,
+):
+    if session.get(IngestionRun, run_id) is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion run {run_id} not found.")
+
+    after_id = since_id or 0
+    # Browsers resend the last received id when an EventSource reconnects.
+    if last_event_id and last_event_id.isdigit():
+        after_id = max(after_id, int(last_event_id))
+
+    return StreamingResponse(
+        _run_event_stream(run_id, after_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,29 +1,26 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Query, Request
 
 from app.config import settings
-from app.db import get_session
-from app.models import WeatherStats
-from app.schemas import PaginatedStatsResponse, WeatherStatsOut
+from app.metrics import TimedRoute
+from app.responses import FastJSONResponse
+from app.schemas import PaginatedStatsResponse
 from app.utils import clamp_page_size
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 PAGE_SIZE_QUERY = Query(default=settings.page_size_default, ge=1)
-SESSION_DEP = Depends(get_session)
 
 
 @router.get("/weather/stats", response_model=PaginatedStatsResponse)
 def list_weather_stats(
+    request: Request,
     station_id: str | None = None,
     year: int | None = None,
     year_start: int | None = None,
     year_end: int | None = None,
     page: int = 1,
     page_size: int = PAGE_SIZE_QUERY,
-    session: Session = SESSION_DEP,
 ):
     if year and (year_start or year_end):
         raise HTTPException(
@@ -34,37 +31,17 @@ def list_weather_stats(
     page = max(page, 1)
     page_size = clamp_page_size(page_size, settings.page_size_max)
 
-    filters = []
-    if station_id:
-        filters.append(WeatherStats.station_id == station_id)
     if year is not None:
-        filters.append(WeatherStats.year == year)
-    if year_start is not None:
-        filters.append(WeatherStats.year >= year_start)
-    if year_end is not None:
-        filters.append(WeatherStats.year <= year_end)
-
-    count_stmt = select(func.count()).select_from(WeatherStats)
-    if filters:
-        count_stmt = count_stmt.where(*filters)
-    total = session.execute(count_stmt).scalar_one()
-
-    stmt = select(WeatherStats).order_by(WeatherStats.station_id, WeatherStats.year)
-    if filters:
-        stmt = stmt.where(*filters)
-    stmt = stmt.offset((page - 1) * page_size).limit(page_size)
-
-    records = session.execute(stmt).scalars().all()
-
-    data = [
-        WeatherStatsOut(
-            station_id=record.station_id,
-            year=record.year,
-            avg_max_temp_c=record.avg_max_temp_c,
-            avg_min_temp_c=record.avg_min_temp_c,
-            total_precip_cm=record.total_precip_cm,
-        )
-        for record in records
-    ]
-
-    return PaginatedStatsResponse(data=data, page=page, page_size=page_size, total=total)
+        year_start = year_end = year
+
+    # Served from the in-memory snapshot; see app.stats_snapshot.
+    snapshot = request.app.state.stats_snapshot.get()
+    total, data = snapshot.query(
+        station_id=station_id or None,
+        year_start=year_start,
+        year_end=year_end,
+        offset=(page - 1) * page_size,
+        limit=page_size,
+    )
+
+    return FastJSONResponse({"data": data, "page": page, "page_size": page_size, "total": total})
@@ -3,19 +3,41 @@ from __future__ import annotations
 from datetime import date
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func, select
+from sqlalchemy import Float, and_, cast, func, or_, select
 from sqlalchemy.orm import Session
 
+from app import packed
 from app.config import settings
 from app.db import get_session
+from app.metrics import TimedRoute
 from app.models import WeatherRecord
-from app.schemas import PaginatedWeatherResponse, WeatherRecordOut
-from app.utils import clamp_page_size, ensure_date_range, to_celsius, to_cm_from_tenths_mm
+from app.responses import FastJSONResponse
+from app.schemas import PaginatedWeatherResponse, WeatherBatchRequest, WeatherBatchResponse
+from app.utils import clamp_page_size, ensure_date_range
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 DATE_QUERY = Query(default=None, alias="date")
 PAGE_SIZE_QUERY = Query(default=settings.page_size_default, ge=1)
 SESSION_DEP = Depends(get_session)
+BATCH_CHUNK_SIZE = 100
+
+# Unit conversion happens in SQL so rows come back ready to serialize as
+# `WeatherRecordOut` dicts.
+WEATHER_OUT_COLUMNS = (
+    WeatherRecord.station_id.label("station_id"),
+    WeatherRecord.date.label("date"),
+    (cast(WeatherRecord.max_temp_tenths_c, Float) / 10.0).label("max_temp_c"),
+    (cast(WeatherRecord.min_temp_tenths_c, Float) / 10.0).label("min_temp_c"),
+    (cast(WeatherRecord.precip_tenths_mm, Float) / 100.0).label("precip_cm"),
+)
+
+
+def _is_large_range(start_date: date | None, end_date: date | None) -> bool:
+    if settings.packed_read_min_days <= 0:
+        return False
+    if start_date is None or end_date is None:
+        return True
+    return (end_date - start_date).days + 1 >= settings.packed_read_min_days
 
 
 @router.get("/weather", response_model=PaginatedWeatherResponse)
@@ -36,6 +58,17 @@ def list_weather(
     page = max(page, 1)
     page_size = clamp_page_size(page_size, settings.page_size_max)
 
+    if station_id and not date_value and _is_large_range(start_date, end_date):
+        years = packed.load_years(session, station_id, start_date, end_date)
+        # Stations that aren't fully packed yet fall through to the row query.
+        if years:
+            total, data = packed.read_weather(
+                years, start_date, end_date, offset=(page - 1) * page_size, limit=page_size
+            )
+            return FastJSONResponse(
+                {"data": data, "page": page, "page_size": page_size, "total": total}
+            )
+
     filters = []
     if station_id:
         filters.append(WeatherRecord.station_id == station_id)
@@ -51,22 +84,84 @@ def list_weather(
         count_stmt = count_stmt.where(*filters)
     total = session.execute(count_stmt).scalar_one()
 
-    stmt = select(WeatherRecord).order_by(WeatherRecord.station_id, WeatherRecord.date)
+    stmt = select(*WEATHER_OUT_COLUMNS).order_by(WeatherRecord.station_id, WeatherRecord.date)
     if filters:
         stmt = stmt.where(*filters)
     stmt = stmt.offset((page - 1) * page_size).limit(page_size)
 
-    records = session.execute(stmt).scalars().all()
+    data = [row._asdict() for row in session.execute(stmt)]
+
+    return FastJSONResponse({"data": data, "page": page, "page_size": page_size, "total": total})
+
+
+def _batch_chunk_statement(station_ids, request: WeatherBatchRequest, page_size: int):
+    station_filters = []
+    uncursored = [station for station in station_ids if station not in request.cursors]
+    if uncursored:
+        station_filters.append(WeatherRecord.station_id.in_(uncursored))
+    for station in station_ids:
+        if station in request.cursors:
+            station_filters.append(
+                and_(
+                    WeatherRecord.station_id == station,
+                    WeatherRecord.date > request.cursors[station],
+                )
+            )
+
+    filters = [or_(*station_filters)]
+    if request.start_date:
+        filters.append(WeatherRecord.date >= request.start_date)
+    if request.end_date:
+        filters.append(WeatherRecord.date <= request.end_date)
 
-    data = [
-        WeatherRecordOut(
-            station_id=record.station_id,
-            date=record.date,
-            max_temp_c=to_celsius(record.max_temp_tenths_c),
-            min_temp_c=to_celsius(record.min_temp_tenths_c),
-            precip_cm=to_cm_from_tenths_mm(record.precip_tenths_mm),
+    row_number = (
+        func.row_number()
+        .over(partition_by=WeatherRecord.station_id, order_by=WeatherRecord.date)
+        .label("row_number")
+    )
+    ranked = select(*WEATHER_OUT_COLUMNS, row_number).where(*filters).subquery()
+    # Fetch one extra row per station to know whether another page exists.
+    return (
+        select(
+            ranked.c.station_id,
+            ranked.c.date,
+            ranked.c.max_temp_c,
+            ranked.c.min_temp_c,
+            ranked.c.precip_cm,
         )
-        for record in records
-    ]
+        .where(ranked.c.row_number <= page_size + 1)
+        .order_by(ranked.c.station_id, ranked.c.date)
+    )
+
+
+@router.post("/weather/batch", response_model=WeatherBatchResponse)
+def list_weather_batch(request: WeatherBatchRequest, session: Session = SESSION_DEP):
+    if request.start_date and request.end_date and request.start_date > request.end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date.")
+
+    station_ids = list(dict.fromkeys(request.station_ids))
+    if len(station_ids) > settings.batch_max_stations:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.batch_max_stations} stations per batch request.",
+        )
+
+    page_size = clamp_page_size(request.page_size, settings.page_size_max)
+    rows_by_station: dict[str, list[dict]] = {station: [] for station in station_ids}
+
+    for offset in range(0, len(station_ids), BATCH_CHUNK_SIZE):
+        chunk = station_ids[offset : offset + BATCH_CHUNK_SIZE]
+        stmt = _batch_chunk_statement(chunk, request, page_size)
+        for row in session.execute(stmt):
+            rows_by_station[row.station_id].append(row._asdict())
+
+    data = []
+    for station in station_ids:
+        rows = rows_by_station[station]
+        next_cursor = None
+        if len(rows) > page_size:
+            del rows[page_size:]
+            next_cursor = rows[-1]["date"]
+        data.append({"station_id": station, "data": rows, "next_cursor": next_cursor})
 
-    return PaginatedWeatherResponse(data=data, page=page, page_size=page_size, total=total)
+    return FastJSONResponse({"data": data, "page_size": page_size})
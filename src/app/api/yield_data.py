@@ -6,11 +6,12 @@ from sqlalchemy.orm import Session
 
 from app.config import settings
 from app.db import get_session
+from app.metrics import TimedRoute
 from app.models import CropYield
 from app.schemas import CropYieldOut, PaginatedYieldResponse
 from app.utils import clamp_page_size
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 PAGE_SIZE_QUERY = Query(default=settings.page_size_default, ge=1)
 SESSION_DEP = Depends(get_session)
 
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import gzip
+import logging
+import os
+import tempfile
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import and_, delete, exists, func, or_, select
+
+from app import db
+from app.config import settings
+from app.ingest.weather import insert_raw_rows
+from app.models import IngestionRun, WeatherConflict, WeatherRecord, WeatherRecordRaw
+from app.partitions import PartitionManager
+
+RAW_COLUMNS = [column.name for column in WeatherRecordRaw.__table__.columns]
+INT_COLUMNS = {
+    "id",
+    "max_temp_tenths_c",
+    "min_temp_tenths_c",
+    "precip_tenths_mm",
+    "source_line",
+    "ingestion_run_id",
+}
+FETCH_SIZE = 5000
+DELETE_BATCH_SIZE = db.sqlite_batch_rows(1, reserved=20)
+RESTORE_BATCH_SIZE = db.sqlite_batch_rows(len(RAW_COLUMNS))
+
+
+def retention_cutoff(session, keep_runs: int) -> int | None:
+    """Id of the oldest weather run whose raw rows are kept, or None if there are fewer runs."""
+    return session.execute(
+        select(IngestionRun.id)
+        .where(IngestionRun.dataset == "weather")
+        .order_by(IngestionRun.id.desc())
+        .offset(keep_runs - 1)
+        .limit(1)
+    ).scalar_one_or_none()
+
+
+def archivable_filter(cutoff_run_id: int):
+    """Raw rows from older runs that no curated value or conflict points at.
+
+    A raw row can only be referenced from its own station/date, so both checks
+    are primary-key / index lookups rather than scans of the `*_raw_id` columns.
+    """
+    raw = WeatherRecordRaw
+    curated_reference = exists().where(
+        WeatherRecord.station_id == raw.station_id,
+        WeatherRecord.date == raw.date,
+        or_(
+            WeatherRecord.max_temp_raw_id == raw.id,
+            WeatherRecord.min_temp_raw_id == raw.id,
+            WeatherRecord.precip_raw_id == raw.id,
+        ),
+    )
+    conflict_reference = exists().where(
+        WeatherConflict.station_id == raw.station_id,
+        WeatherConflict.date == raw.date,
+        or_(WeatherConflict.existing_raw_id == raw.id, WeatherConflict.incoming_raw_id == raw.id),
+    )
+    return and_(raw.ingestion_run_id < cutoff_run_id, ~curated_reference, ~conflict_reference)
+
+
+def _format(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _parse(name: str, value: str):
+    if value == "":
+        return None
+    if name in INT_COLUMNS:
+        return int(value)
+    if name == "date":
+        return date.fromisoformat(value)
+    if name == "ingested_at":
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _archive_year(session, year: int, where, archive_dir: Path, stamp: str) -> int:
+    window = and_(
+        where,
+        WeatherRecordRaw.date >= date(year, 1, 1),
+        WeatherRecordRaw.date <= date(year, 12, 31),
+    )
+    rows = session.execute(
+        select(*WeatherRecordRaw.__table__.columns)
+        .where(window)
+        .order_by(WeatherRecordRaw.id)
+        .execution_options(yield_per=FETCH_SIZE)
+    )
+
+    path = archive_dir / f"weather_records_raw_{year}_{stamp}.csv.gz"
+    fd, tmp_name = tempfile.mkstemp(dir=archive_dir, prefix=f".{path.name}.")
+    archived_ids: list[int] = []
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            with gzip.open(handle, "wt", encoding="utf-8", newline="") as stream:
+                writer = csv.writer(stream)
+                writer.writerow(RAW_COLUMNS)
+                for row in rows:
+                    writer.writerow([_format(value) for value in row])
+                    archived_ids.append(row.id)
+            handle.flush()
+            os.fsync(handle.fileno())
+        if archived_ids:
+            os.replace(tmp_name, path)
+        else:
+            os.unlink(tmp_name)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+    # Delete only rows that were written, and only while they are still unreferenced: a
+    # merge since the SELECT may have dropped or added references. Rows that became
+    # referenced stay in the table as well as the file, which `restore_raw` tolerates.
+    for start in range(0, len(archived_ids), DELETE_BATCH_SIZE):
+        chunk = archived_ids[start : start + DELETE_BATCH_SIZE]
+        session.execute(delete(WeatherRecordRaw).where(window, WeatherRecordRaw.id.in_(chunk)))
+    session.commit()
+    if archived_ids:
+        logging.info("Archived %s raw rows for %s to %s", len(archived_ids), year, path)
+    return len(archived_ids)
+
+
+def archive_raw(keep_runs: int | None = None, archive_dir: Path | None = None) -> dict[int, int]:
+    """Move unreferenced raw rows older than the last `keep_runs` weather runs to files.
+
+    Each year is written to `weather_records_raw_<year>_<timestamp>.csv.gz`, fsynced, and
+    only then deleted from the table. A crash in between leaves rows in both places,
+    which `restore_raw` tolerates. Returns archived row counts per year.
+    """
+    keep_runs = keep_runs or settings.raw_retention_runs
+    archive_dir = archive_dir or Path(settings.raw_archive_dir)
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+
+    with db.SessionLocal() as session:
+        cutoff = retention_cutoff(session, keep_runs)
+        if cutoff is None:
+            logging.info("Fewer than %s weather runs; nothing to archive.", keep_runs)
+            return {}
+
+        first_date, last_date = session.execute(
+            select(func.min(WeatherRecordRaw.date), func.max(WeatherRecordRaw.date)).where(
+                WeatherRecordRaw.ingestion_run_id < cutoff
+            )
+        ).one()
+        if first_date is None:
+            return {}
+
+        where = archivable_filter(cutoff)
+        archived = {}
+        for year in range(first_date.year, last_date.year + 1):
+            count = _archive_year(session, year, where, archive_dir, stamp)
+            if count:
+                archived[year] = count
+        return archived
+
+
+def restore_raw(archive_dir: Path | None = None, year: int | None = None) -> int:
+    """Load archived raw rows back into `weather_records_raw`; already present rows are skipped."""
+    archive_dir = archive_dir or Path(settings.raw_archive_dir)
+    pattern = f"weather_records_raw_{year if year is not None else '*'}_*.csv.gz"
+    partitions = PartitionManager()
+
+    restored = 0
+    with db.SessionLocal() as session:
+        for path in sorted(archive_dir.glob(pattern)):
+            with gzip.open(path, "rt", encoding="utf-8", newline="") as stream:
+                reader = csv.reader(stream)
+                header = next(reader)
+                batch = []
+                for values in reader:
+                    batch.append(
+                        {
+                            name: _parse(name, value)
+                            for name, value in zip(header, values, strict=True)
+                        }
+                    )
+                    if len(batch) >= RESTORE_BATCH_SIZE:
+                        restored += insert_raw_rows(session, partitions, batch)
+                        batch = []
+                if batch:
+                    restored += insert_raw_rows(session, partitions, batch)
+            session.commit()
+            logging.info("Restored %s", path)
+    return restored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive or restore superseded raw weather rows.")
+    parser.add_argument(
+        "--dir",
+        default=settings.raw_archive_dir,
+        help="Archive directory (defaults to RAW_ARCHIVE_DIR)",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive_parser = commands.add_parser("archive", help="Move old unreferenced raw rows to files")
+    archive_parser.add_argument(
+        "--keep-runs",
+        type=int,
+        default=settings.raw_retention_runs,
+        help="Keep raw rows from this many most recent weather runs",
+    )
+    restore_parser = commands.add_parser("restore", help="Load archived rows back")
+    restore_parser.add_argument("--year", type=int, help="Only restore this year")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.command == "archive":
+        archived = archive_raw(keep_runs=args.keep_runs, archive_dir=Path(args.dir))
+        logging.info("Raw rows archived: %s", sum(archived.values()))
+    else:
+        restored = restore_raw(archive_dir=Path(args.dir), year=args.year)
+        logging.info("Raw rows restored: %s", restored)
+
+
+if __name__ == "__main__":
+    main()
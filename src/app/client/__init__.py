@@ -0,0 +1,6 @@
+"""Python client for the weather and yield API."""
+
+from app.client.api import WeatherClient
+from app.client.columns import to_columns
+
+__all__ = ["WeatherClient", "to_columns"]
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any
+
+import httpx
+
+from app.client.columns import to_columns
+
+# Below the server's default BATCH_MAX_STATIONS (500), so groups are never rejected.
+STATIONS_PER_BATCH = 100
+
+
+def _params(**values: Any) -> dict[str, Any]:
+    return {
+        key: value.isoformat() if isinstance(value, date) else value
+        for key, value in values.items()
+        if value is not None
+    }
+
+
+class WeatherClient:
+    """Client for `/api/weather`, `/api/weather/stats` and `/api/yield`.
+
+    One pooled keep-alive `httpx.Client` is shared by every call, including the worker
+    threads that fetch up to `max_workers` pages or station batches at a time. The
+    `iter_*` methods page through all results and yield rows in server order; the
+    `*_columns` variants collect them into columns (`kind="numpy"` / `"pandas"` need
+    those packages installed).
+
+        with WeatherClient("http://localhost:8000") as client:
+            for row in client.iter_weather(station_id="USC00110072"):
+                ...
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        page_size: int = 1000,
+        max_workers: int = 4,
+        timeout: float = 30.0,
+        http: httpx.Client | None = None,
+    ):
+        self.page_size = page_size
+        self.max_workers = max(max_workers, 1)
+        self._owns_http = http is None
+        self.http = http or httpx.Client(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_workers,
+                max_keepalive_connections=self.max_workers,
+            ),
+        )
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+        if self._owns_http:
+            self.http.close()
+
+    def __enter__(self) -> WeatherClient:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _get(self, path: str, params: dict[str, Any]) -> dict:
+        response = self.http.get(path, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    def _post(self, path: str, payload: dict[str, Any]) -> dict:
+        response = self.http.post(path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def _ordered(self, calls: Iterable) -> Iterator:
+        """Run `calls` on the pool, at most `max_workers` ahead, yielding results in order."""
+        pending = deque()
+        for call in calls:
+            pending.append(self._pool.submit(call))
+            if len(pending) >= self.max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def iter_pages(self, path: str, params: dict[str, Any]) -> Iterator[dict]:
+        """Yield every page of a paginated endpoint, fetching pages after the first in parallel.
+
+        The page count comes from the first page's `total` and `page_size` (the server
+        may cap the requested size).
+        """
+        params = {**params, "page_size": self.page_size}
+        first = self._get(path, {**params, "page": 1})
+        yield first
+        page_size = first["page_size"]
+        last_page = -(-first["total"] // page_size)
+
+        def fetch(page: int):
+            return lambda: self._get(path, {**params, "page": page})
+
+        yield from self._ordered(fetch(page) for page in range(2, last_page + 1))
+
+    def _iter_rows(self, path: str, params: dict[str, Any]) -> Iterator[dict]:
+        for page in self.iter_pages(path, params):
+            yield from page["data"]
+
+    def iter_weather(
+        self,
+        station_id: str | None = None,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        on_date: date | None = None,
+    ) -> Iterator[dict]:
+        return self._iter_rows(
+            "/api/weather",
+            _params(station_id=station_id, start_date=start_date, end_date=end_date, date=on_date),
+        )
+
+    def iter_stats(
+        self,
+        station_id: str | None = None,
+        year: int | None = None,
+        year_start: int | None = None,
+        year_end: int | None = None,
+    ) -> Iterator[dict]:
+        return self._iter_rows(
+            "/api/weather/stats",
+            _params(station_id=station_id, year=year, year_start=year_start, year_end=year_end),
+        )
+
+    def iter_yield(
+        self,
+        year: int | None = None,
+        year_start: int | None = None,
+        year_end: int | None = None,
+    ) -> Iterator[dict]:
+        return self._iter_rows(
+            "/api/yield", _params(year=year, year_start=year_start, year_end=year_end)
+        )
+
+    def _station_batch(
+        self, station_ids: list[str], start_date: date | None, end_date: date | None
+    ) -> dict[str, list[dict]]:
+        rows: dict[str, list[dict]] = {station: [] for station in station_ids}
+        cursors: dict[str, str] = {}
+        remaining = list(station_ids)
+        while remaining:
+            payload = self._post(
+                "/api/weather/batch",
+                {
+                    "station_ids": remaining,
+                    "page_size": self.page_size,
+                    "cursors": {
+                        station: cursors[station] for station in remaining if station in cursors
+                    },
+                    **_params(start_date=start_date, end_date=end_date),
+                },
+            )
+            remaining = []
+            for page in payload["data"]:
+                rows[page["station_id"]].extend(page["data"])
+                if page["next_cursor"] is not None:
+                    cursors[page["station_id"]] = page["next_cursor"]
+                    remaining.append(page["station_id"])
+        return rows
+
+    def weather_by_station(
+        self,
+        station_ids: Iterable[str],
+        start_date: date | None = None,
+        end_date: date | None = None,
+    ) -> dict[str, list[dict]]:
+        """All weather rows for each station, via `/api/weather/batch`.
+
+        Stations go out in groups of `STATIONS_PER_BATCH`, up to `max_workers` groups at a
+        time; each group follows its per-station cursors until every station is done.
+        """
+        station_ids = list(dict.fromkeys(station_ids))
+        groups = [
+            station_ids[offset : offset + STATIONS_PER_BATCH]
+            for offset in range(0, len(station_ids), STATIONS_PER_BATCH)
+        ]
+
+        def fetch(group: list[str]):
+            return lambda: self._station_batch(group, start_date, end_date)
+
+        result: dict[str, list[dict]] = {}
+        for rows in self._ordered(fetch(group) for group in groups):
+            result.update(rows)
+        return result
+
+    def weather_columns(self, kind: str = "lists", **filters):
+        return to_columns(self.iter_weather(**filters), kind)
+
+    def stats_columns(self, kind: str = "lists", **filters):
+        return to_columns(self.iter_stats(**filters), kind)
+
+    def yield_columns(self, kind: str = "lists", **filters):
+        return to_columns(self.iter_yield(**filters), kind)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable
+from datetime import date
+
+from app.utils import check_column_kind, optional_import
+
+
+def _is_iso_date(value) -> bool:
+    if not isinstance(value, str) or len(value) != 10:
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _numpy_column(np, values: list):
+    present = [value for value in values if value is not None]
+    if present and all(_is_iso_date(value) for value in present):
+        # None becomes NaT.
+        return np.array(values, dtype="datetime64[D]")
+    if present and all(
+        isinstance(value, (int, float)) and not isinstance(value, bool) for value in present
+    ):
+        if len(present) == len(values) and all(isinstance(value, int) for value in present):
+            return np.array(values, dtype=np.int64)
+        return np.array([math.nan if value is None else value for value in values], dtype=float)
+    return np.array(values, dtype=object)
+
+
+def to_columns(rows: Iterable[dict], kind: str = "lists"):
+    """Turn API rows into columns: a dict of lists, of NumPy arrays, or a pandas DataFrame.
+
+    NumPy columns are typed from their values: ISO dates become `datetime64[D]`, numbers
+    with gaps become float64 with NaN, and whole numbers without gaps stay int64.
+    """
+    check_column_kind(kind)
+
+    columns: dict[str, list] = {}
+    for row in rows:
+        if not columns:
+            columns = {name: [] for name in row}
+        for name, values in columns.items():
+            values.append(row.get(name))
+    if kind == "lists":
+        return columns
+
+    np = optional_import("numpy")
+    arrays = {name: _numpy_column(np, values) for name, values in columns.items()}
+    if kind == "numpy":
+        return arrays
+    return optional_import("pandas").DataFrame(arrays)
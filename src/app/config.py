@@ -7,8 +7,61 @@ from dataclasses import dataclass
 @dataclass(frozen=True)
 class Settings:
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./weather_yield.db")
+    # API reads go through this URL (a replica, or a `mode=ro` SQLite URI); defaults to
+    # DATABASE_URL with its own connection pool.
+    read_database_url: str | None = os.getenv("READ_DATABASE_URL") or None
+    db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    db_max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    db_pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    db_pool_recycle: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    db_connect_timeout: int = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+    read_statement_timeout_ms: int = int(os.getenv("READ_STATEMENT_TIMEOUT_MS", "0"))
     page_size_default: int = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
     page_size_max: int = int(os.getenv("PAGE_SIZE_MAX", "1000"))
+    # /api/weather station queries spanning at least this many days read packed
+    # per-station-year blocks instead of rows; 0 disables.
+    packed_read_min_days: int = int(os.getenv("PACKED_READ_MIN_DAYS", "366"))
+    # Hash sub-partitions per year for the partitioned Postgres weather tables.
+    partition_hash_modulus: int = int(os.getenv("PARTITION_HASH_MODULUS", "4"))
+    batch_max_stations: int = int(os.getenv("BATCH_MAX_STATIONS", "500"))
+    # Statements slower than this (ms) are logged with their plan; 0 disables.
+    slow_query_ms: float = float(os.getenv("SLOW_QUERY_MS", "0"))
+    slow_query_log: str = os.getenv("SLOW_QUERY_LOG", "slow_queries.jsonl")
+    slow_query_explain_analyze: bool = os.getenv("SLOW_QUERY_EXPLAIN_ANALYZE", "0") == "1"
+    # Admission control for expensive weather queries; max concurrent <= 0 disables it.
+    admission_max_concurrent: int = int(os.getenv("ADMISSION_MAX_CONCURRENT", "4"))
+    admission_queue_size: int = int(os.getenv("ADMISSION_QUEUE_SIZE", "8"))
+    admission_queue_timeout: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+    admission_heavy_cost: int = int(os.getenv("ADMISSION_HEAVY_COST", "100000"))
+    admission_station_estimate: int = int(os.getenv("ADMISSION_STATION_ESTIMATE", "200"))
+    admission_retry_after: int = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+    event_buffer_size: int = int(os.getenv("EVENT_BUFFER_SIZE", "100"))
+    event_flush_seconds: float = float(os.getenv("EVENT_FLUSH_SECONDS", "2.0"))
+    ingestion_stream_poll_seconds: float = float(os.getenv("INGESTION_STREAM_POLL_SECONDS", "1.0"))
+    # Quiet streams get an SSE comment this often so proxies keep the connection open,
+    # and are closed after the idle limit; clients resume with Last-Event-ID.
+    ingestion_stream_keepalive_seconds: float = float(
+        os.getenv("INGESTION_STREAM_KEEPALIVE_SECONDS", "15.0")
+    )
+    ingestion_stream_idle_seconds: float = float(os.getenv("INGESTION_STREAM_IDLE_SECONDS", "600"))
+    stats_snapshot_refresh_seconds: float = float(
+        os.getenv("STATS_SNAPSHOT_REFRESH_SECONDS", "5.0")
+    )
+    # When set, stats are served from this memory-mapped file instead of the database.
+    stats_snapshot_path: str | None = os.getenv("STATS_SNAPSHOT_PATH") or None
+    aggregate_cache_size: int = int(os.getenv("AGGREGATE_CACHE_SIZE", "256"))
+    # `python -m app.archive` keeps raw rows from this many recent weather runs.
+    raw_retention_runs: int = int(os.getenv("RAW_RETENTION_RUNS", "3"))
+    raw_archive_dir: str = os.getenv("RAW_ARCHIVE_DIR", "archive/raw")
+    # Per-station ingestion lock files when not on Postgres; defaults to a directory
+    # next to the SQLite database.
+    ingest_lock_dir: str | None = os.getenv("INGEST_LOCK_DIR") or None
+    # Queued ingestion tasks whose worker has not sent a heartbeat for this long are
+    # handed to another worker, up to the attempt limit.
+    ingest_task_stale_seconds: float = float(os.getenv("INGEST_TASK_STALE_SECONDS", "300"))
+    ingest_task_max_attempts: int = int(os.getenv("INGEST_TASK_MAX_ATTEMPTS", "3"))
+    # A failed task goes back to pending and waits this long before it is claimed again.
+    ingest_task_retry_seconds: float = float(os.getenv("INGEST_TASK_RETRY_SECONDS", "30"))
     data_dir: str = os.getenv("DATA_DIR", "wx_data")
     yield_file: str = os.getenv("YIELD_FILE", "yld_data/US_corn_grain_yield.txt")
 
@@ -1,17 +1,30 @@
 from __future__ import annotations
 
+import time
 from contextlib import contextmanager
 
 from sqlalchemy import create_engine, event
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
+from app import metrics, slow_queries
 from app.config import settings
 
+# Older SQLite builds refuse statements with more bound parameters than this.
+SQLITE_MAX_VARIABLES = 999
+
 
 class Base(DeclarativeBase):
     pass
 
 
+def sqlite_batch_rows(params_per_row: int, reserved: int = 0) -> int:
+    """How many rows of `params_per_row` parameters fit in one SQLite statement.
+
+    `reserved` parameters are left for the rest of the statement, such as its WHERE clause.
+    """
+    return max((SQLITE_MAX_VARIABLES - reserved) // params_per_row, 1)
+
+
 def enable_sqlite_foreign_keys(engine) -> None:
     if engine.dialect.name != "sqlite":
         return
@@ -27,20 +40,111 @@ def enable_sqlite_foreign_keys(engine) -> None:
     engine._foreign_keys_enabled = True
 
 
-def _create_engine():
-    if settings.database_url.startswith("sqlite"):
+class _RowCountingCursor:
+    """DBAPI cursor proxy that reports rows as they are fetched.
+
+    Used for result sets whose driver reports `rowcount` -1 (SQLite SELECTs), so the
+    request metrics count the rows actually read rather than none at all.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            metrics.record_rows(1)
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        metrics.record_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        metrics.record_rows(len(rows))
+        return rows
+
+
+def instrument_engine(engine) -> None:
+    if getattr(engine, "_instrumented", False):
+        return
+
+    # The start time lives on the statement's execution context, so a statement that
+    # fails (and never reaches `after_cursor_execute`) leaves nothing behind.
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, _cursor, _statement, _parameters, context, _executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+        else:
+            conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _record_query(conn, cursor, statement, parameters, context, executemany):
+        started = context._query_started if context is not None else conn.info.pop("query_started")
+        elapsed = time.perf_counter() - started
+        metrics.record_query(elapsed, cursor.rowcount)
+        if context is not None and cursor.rowcount < 0 and cursor.description is not None:
+            # The result is built from `context.cursor` right after this hook.
+            context.cursor = _RowCountingCursor(cursor)
+        slow_queries.maybe_record(
+            conn.connection.dbapi_connection,
+            conn.dialect.name,
+            statement,
+            parameters,
+            executemany,
+            elapsed,
+            cursor.rowcount,
+        )
+
+    engine._instrumented = True
+
+
+def _create_engine(url: str, statement_timeout_ms: int = 0):
+    if url.startswith("sqlite"):
+        # SQLite has no statement timeout; `timeout` is how long to wait on a locked database.
         engine = create_engine(
-            settings.database_url,
-            connect_args={"check_same_thread": False},
+            url,
+            connect_args={"check_same_thread": False, "timeout": settings.db_connect_timeout},
             future=True,
         )
         enable_sqlite_foreign_keys(engine)
+        instrument_engine(engine)
         return engine
-    return create_engine(settings.database_url, pool_pre_ping=True, future=True)
 
-
-engine = _create_engine()
+    connect_args = {"connect_timeout": settings.db_connect_timeout}
+    if statement_timeout_ms > 0:
+        connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+    engine = create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        connect_args=connect_args,
+        future=True,
+    )
+    instrument_engine(engine)
+    return engine
+
+
+# Writes (ingestion, stats computation) use `engine`; API requests read through
+# `read_engine`, which has its own pool so long ingestion transactions don't starve it.
+engine = _create_engine(settings.database_url)
+read_engine = _create_engine(
+    settings.read_database_url or settings.database_url,
+    statement_timeout_ms=settings.read_statement_timeout_ms,
+)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False, future=True)
 
 
 @contextmanager
@@ -57,7 +161,7 @@ def session_scope():
 
 
 def get_session():
-    session = SessionLocal()
+    session = ReadSessionLocal()
     try:
         yield session
     finally:
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import update
+
+from app import db
+from app.config import settings
+from app.models import IngestionEvent, IngestionRun
+
+
+class EventSink:
+    """Buffers ingestion events and writes them in bulk on a dedicated connection.
+
+    Events are flushed when `max_events` are buffered, every `max_interval` seconds
+    from a background thread (so a long quiet phase still shows up), and on `close`.
+    Each flush commits on its own, so a crash loses at most the unflushed tail. Rows
+    leave the buffer only once their insert has committed; a failed flush keeps them
+    for the next attempt. On SQLite a flush waits while the ingestion session holds a
+    write transaction, so commit before logging where the wait would matter.
+    """
+
+    def __init__(
+        self,
+        run_id: int,
+        max_events: int | None = None,
+        max_interval: float | None = None,
+    ):
+        self.run_id = run_id
+        self.max_events = max_events if max_events is not None else settings.event_buffer_size
+        self.max_interval = (
+            max_interval if max_interval is not None else settings.event_flush_seconds
+        )
+        self._engine = db.engine
+        self._buffer: list[dict] = []
+        self._buffer_lock = threading.Lock()
+        # Held for a whole flush, so concurrent flushes never write the same rows twice.
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher: threading.Thread | None = None
+
+    def log(self, level: str, message: str, created_at: datetime | None = None) -> None:
+        with self._buffer_lock:
+            self._buffer.append(
+                {
+                    "ingestion_run_id": self.run_id,
+                    "level": level,
+                    "message": message,
+                    "created_at": created_at or datetime.now(timezone.utc),
+                }
+            )
+            pending = len(self._buffer)
+            if self._flusher is None and self.max_interval > 0:
+                self._flusher = threading.Thread(
+                    target=self._flush_periodically,
+                    name=f"event-sink-{self.run_id}",
+                    daemon=True,
+                )
+                self._flusher.start()
+        if pending >= self.max_events:
+            self.flush()
+
+    def _flush_periodically(self) -> None:
+        while not self._stop.wait(self.max_interval):
+            try:
+                self.flush()
+            except Exception:
+                logging.exception("Flushing ingestion events for run %s failed", self.run_id)
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._buffer_lock:
+                rows = list(self._buffer)
+            if not rows:
+                return
+            with self._engine.begin() as conn:
+                conn.execute(IngestionEvent.__table__.insert(), rows)
+            with self._buffer_lock:
+                # Events logged during the insert stay queued behind the written ones.
+                del self._buffer[: len(rows)]
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    def __enter__(self) -> EventSink:
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._buffer_lock:
+            return len(self._buffer)
+
+
+def mark_run_failed(session, events: EventSink, message: str) -> None:
+    """Log `message` as the run's last event and record that the run stopped on an error.
+
+    Event streams end once `failed_at` is set, so the event is flushed first.
+    """
+    events.log("ERROR", message)
+    events.flush()
+    session.execute(
+        update(IngestionRun)
+        .where(IngestionRun.id == events.run_id)
+        .values(failed_at=datetime.now(timezone.utc))
+    )
+    session.commit()
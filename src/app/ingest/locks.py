@@ -0,0 +1,92 @@
+"""Per-station locks that let several weather ingestions run at the same time.
+
+A station's raw insert, curated merge, packed refresh and conflict logging run under
+its lock, so two runs touching the same station take turns while runs over disjoint
+stations proceed in parallel. Postgres uses session advisory locks held on a dedicated
+connection; other databases use `fcntl` locks on files in `INGEST_LOCK_DIR` (next to
+the SQLite database by default), which covers processes on one host.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import logging
+import re
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from sqlalchemy import text
+
+from app import db
+from app.config import settings
+
+
+def default_lock_dir(engine=None) -> Path:
+    if settings.ingest_lock_dir:
+        return Path(settings.ingest_lock_dir)
+    url = (engine or db.engine).url
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        return Path(url.database).resolve().parent / ".ingest-locks"
+    return Path(tempfile.gettempdir()) / "weather-ingest-locks"
+
+
+class StationLocks:
+    """Exclusive per-station locks for the lifetime of one ingestion run.
+
+    Use as a context manager; `hold(station_id)` blocks until the station is free.
+    """
+
+    def __init__(self, engine=None, lock_dir: Path | None = None):
+        self.engine = engine or db.engine
+        self.lock_dir = lock_dir
+        self._conn = None
+
+    def __enter__(self) -> StationLocks:
+        if self.engine.dialect.name == "postgresql":
+            # Session-level advisory locks outlive transactions, so the ingestion
+            # session can commit per batch while the station stays locked.
+            self._conn = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        else:
+            self.lock_dir = self.lock_dir or default_lock_dir(self.engine)
+            self.lock_dir.mkdir(parents=True, exist_ok=True)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._conn is not None:
+            # Closing the connection would only return it to the pool; release explicitly.
+            self._conn.execute(text("SELECT pg_advisory_unlock_all()"))
+            self._conn.close()
+            self._conn = None
+
+    def _lock_file(self, station_id: str) -> Path:
+        return self.lock_dir / (re.sub(r"[^A-Za-z0-9_.-]", "_", station_id) + ".lock")
+
+    @contextmanager
+    def hold(self, station_id: str) -> Iterator[None]:
+        started = time.monotonic()
+        if self._conn is not None:
+            params = {"key": f"weather-station:{station_id}"}
+            self._conn.execute(text("SELECT pg_advisory_lock(hashtext(:key))"), params)
+            self._log_wait(station_id, started)
+            try:
+                yield
+            finally:
+                self._conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), params)
+            return
+
+        with self._lock_file(station_id).open("a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            self._log_wait(station_id, started)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _log_wait(station_id: str, started: float) -> None:
+        waited = time.monotonic() - started
+        if waited >= 1.0:
+            logging.info("Waited %.1fs for the ingestion lock on %s", waited, station_id)
@@ -0,0 +1,407 @@
+"""Database-backed task queue that spreads one weather ingestion over several workers.
+
+    python -m app.ingest.queue enqueue --data-dir /mnt/wx_data   # prints the run id
+    python -m app.ingest.queue worker --exit-when-idle           # on each node
+    python -m app.ingest.queue finalize 42
+
+`enqueue` creates an `IngestionRun` and one `ingestion_tasks` row per station file.
+Workers claim tasks with `SELECT ... FOR UPDATE SKIP LOCKED` (on SQLite the database
+write lock makes the claim atomic instead), load the file into `weather_records_raw` and
+send a heartbeat with every batch. A running task without a heartbeat for
+`INGEST_TASK_STALE_SECONDS` is handed to the next worker, up to
+`INGEST_TASK_MAX_ATTEMPTS`, and the worker that lost it stops at its next heartbeat. A
+failed task is retried after `INGEST_TASK_RETRY_SECONDS`. Once every task is done,
+`finalize` merges each station into `weather_records`, logs conflicts, records the run's
+counts and recomputes stats. The data directory must be mounted at the same path on every node.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import socket
+import time
+from collections.abc import Iterable
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import func, select, update
+
+from app import db
+from app.config import settings
+from app.ingest.events import EventSink, mark_run_failed
+from app.ingest.locks import StationLocks
+from app.ingest.weather import (
+    clamp_batch_size,
+    ingest_station_file,
+    merge_station,
+    station_files,
+)
+from app.models import IngestionRun, IngestionTask, WeatherConflict, WeatherRecordRaw
+from app.partitions import PartitionManager
+from app.snapshot_file import refresh_snapshot_file
+from app.stats import compute_weather_stats
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+MERGED = "merged"
+FAILED = "failed"
+
+
+def enqueue_weather(data_dir: Path, stations: Iterable[str] | None = None) -> int:
+    """Create a weather run with one pending task per station file; returns the run id."""
+    files = station_files(data_dir, stations)
+    with db.SessionLocal() as session:
+        run = IngestionRun(dataset="weather", started_at=datetime.now(timezone.utc))
+        session.add(run)
+        session.flush()
+        session.add_all(
+            IngestionTask(
+                ingestion_run_id=run.id,
+                station_id=path.stem,
+                source_file=str(path.resolve()),
+                status=PENDING,
+                attempts=0,
+            )
+            for path in files
+        )
+        session.commit()
+        logging.info("Run %s queued with %s station tasks", run.id, len(files))
+        return run.id
+
+
+def claim_task(session, worker: str) -> IngestionTask | None:
+    """Claim the oldest pending (or abandoned) task for `worker`, or None if there is none.
+
+    A task that failed and went back to pending waits `INGEST_TASK_RETRY_SECONDS` before
+    it can be claimed again.
+    """
+    now = datetime.now(timezone.utc)
+    stale_before = now - timedelta(seconds=settings.ingest_task_stale_seconds)
+    retry_before = now - timedelta(seconds=settings.ingest_task_retry_seconds)
+    abandoned = (IngestionTask.status == RUNNING) & (IngestionTask.heartbeat_at < stale_before)
+    ready = (IngestionTask.status == PENDING) & (
+        (IngestionTask.attempts == 0) | (IngestionTask.heartbeat_at < retry_before)
+    )
+    # The claim commits and reloads, so skip syncing loaded tasks in Python.
+    session.execute(
+        update(IngestionTask)
+        .where(abandoned, IngestionTask.attempts >= settings.ingest_task_max_attempts)
+        .values(status=FAILED, error="worker stopped sending heartbeats")
+        .execution_options(synchronize_session=False)
+    )
+    claimable = (
+        select(IngestionTask.id)
+        .where(ready | abandoned)
+        .order_by(IngestionTask.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    task_id = session.execute(
+        update(IngestionTask)
+        .where(IngestionTask.id == claimable)
+        .values(
+            status=RUNNING,
+            worker=worker,
+            heartbeat_at=now,
+            attempts=IngestionTask.attempts + 1,
+            error=None,
+        )
+        .returning(IngestionTask.id)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+    session.commit()
+    return session.get(IngestionTask, task_id) if task_id is not None else None
+
+
+class _TaskLost(Exception):
+    pass
+
+
+def _run_task(
+    session, task: IngestionTask, locks: StationLocks, partitions, batch_size: int
+) -> str | None:
+    """Run a claimed task; returns its new status, or None if another worker took it over."""
+    task_id, run_id, station_id = task.id, task.ingestion_run_id, task.station_id
+    worker, attempts = task.worker, task.attempts
+    events = EventSink(run_id)
+
+    def update_own_task(**values) -> None:
+        # A task that went stale may have been claimed again; its new worker owns it.
+        result = session.execute(
+            update(IngestionTask)
+            .where(
+                IngestionTask.id == task_id,
+                IngestionTask.worker == worker,
+                IngestionTask.status == RUNNING,
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            raise _TaskLost
+
+    def heartbeat() -> None:
+        update_own_task(heartbeat_at=datetime.now(timezone.utc))
+
+    try:
+        ingested_at = session.get(IngestionRun, run_id).started_at
+        with locks.hold(station_id):
+            processed, _, years = ingest_station_file(
+                session,
+                partitions,
+                Path(task.source_file),
+                run_id,
+                ingested_at,
+                batch_size,
+                on_batch=heartbeat,
+            )
+        # Counted rather than summed, so rows kept from an interrupted attempt count too.
+        inserted = session.execute(
+            select(func.count())
+            .select_from(WeatherRecordRaw)
+            .where(
+                WeatherRecordRaw.ingestion_run_id == run_id,
+                WeatherRecordRaw.station_id == station_id,
+            )
+        ).scalar_one()
+        update_own_task(
+            status=DONE,
+            finished_at=datetime.now(timezone.utc),
+            processed_count=processed,
+            inserted_raw_count=inserted,
+            first_year=min(years, default=None),
+            last_year=max(years, default=None),
+        )
+        session.commit()
+        events.log(
+            "INFO",
+            f"task {task_id} ({station_id}) done by {worker}: "
+            f"processed={processed} raw_inserted={inserted}",
+        )
+        return DONE
+    except _TaskLost:
+        session.rollback()
+        logging.warning("Task %s (%s) was claimed by another worker; stopping", task_id, station_id)
+        return None
+    except Exception as exc:
+        session.rollback()
+        logging.exception("Task %s (%s) failed", task_id, station_id)
+        status = FAILED if attempts >= settings.ingest_task_max_attempts else PENDING
+        try:
+            # heartbeat_at starts the retry delay.
+            update_own_task(status=status, error=str(exc), heartbeat_at=datetime.now(timezone.utc))
+        except _TaskLost:
+            session.rollback()
+            return None
+        session.commit()
+        events.log("ERROR", f"task {task_id} ({station_id}) failed: {exc}")
+        return status
+    finally:
+        events.close()
+
+
+def _has_pending_tasks(session) -> bool:
+    return (
+        session.execute(
+            select(IngestionTask.id).where(IngestionTask.status == PENDING).limit(1)
+        ).first()
+        is not None
+    )
+
+
+def run_worker(
+    worker: str | None = None,
+    batch_size: int = 10000,
+    poll_seconds: float = 5.0,
+    exit_when_idle: bool = False,
+) -> int:
+    """Claim and run tasks until the queue is empty (with `exit_when_idle`) or forever.
+
+    Tasks waiting out their retry delay keep an idle worker polling. Returns the number
+    of tasks this worker ran.
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    batch_size = clamp_batch_size(batch_size)
+    partitions = PartitionManager()
+    ran = 0
+    with StationLocks() as locks:
+        while True:
+            with db.SessionLocal() as session:
+                task = claim_task(session, worker)
+                if task is not None:
+                    logging.info("Worker %s claimed task %s (%s)", worker, task.id, task.station_id)
+                    _run_task(session, task, locks, partitions, batch_size)
+                    ran += 1
+                    continue
+                retrying = _has_pending_tasks(session)
+            if exit_when_idle and not retrying:
+                return ran
+            time.sleep(poll_seconds)
+
+
+def requeue_failed(run_id: int) -> int:
+    """Put a run's failed tasks back in the queue with fresh attempts."""
+    with db.SessionLocal() as session:
+        result = session.execute(
+            update(IngestionTask)
+            .where(IngestionTask.ingestion_run_id == run_id, IngestionTask.status == FAILED)
+            .values(status=PENDING, attempts=0)
+        )
+        session.commit()
+        return result.rowcount
+
+
+def finalize_run(run_id: int, stats: bool = True) -> dict[str, int]:
+    """Merge a queued run into the curated tables once all of its tasks are done.
+
+    Stations are marked merged in the same transaction as their merge, so a finalize
+    that stops part-way can simply be run again.
+    """
+    session = db.SessionLocal()
+    events = None
+    try:
+        run = session.get(IngestionRun, run_id)
+        if run is None:
+            raise ValueError(f"Ingestion run {run_id} not found")
+        if run.finished_at is not None:
+            raise RuntimeError(f"Ingestion run {run_id} is already finalized")
+        statuses = dict(
+            session.execute(
+                select(IngestionTask.status, func.count())
+                .where(IngestionTask.ingestion_run_id == run_id)
+                .group_by(IngestionTask.status)
+            ).all()
+        )
+        unfinished = statuses.get(PENDING, 0) + statuses.get(RUNNING, 0)
+        if unfinished:
+            raise RuntimeError(f"Ingestion run {run_id} has {unfinished} unfinished tasks")
+        if statuses.get(FAILED):
+            raise RuntimeError(
+                f"Ingestion run {run_id} has {statuses[FAILED]} failed tasks; requeue them first"
+            )
+
+        events = EventSink(run_id)
+        pending_merges = session.execute(
+            select(
+                IngestionTask.id,
+                IngestionTask.station_id,
+                IngestionTask.first_year,
+                IngestionTask.last_year,
+            )
+            .where(IngestionTask.ingestion_run_id == run_id, IngestionTask.status == DONE)
+            .order_by(IngestionTask.station_id)
+        ).all()
+        session.commit()
+
+        packed_blocks = 0
+        with StationLocks() as locks:
+            for task_id, station_id, first_year, last_year in pending_merges:
+                years = {year for year in (first_year, last_year) if year is not None}
+                with locks.hold(station_id):
+                    session.execute(
+                        update(IngestionTask)
+                        .where(IngestionTask.id == task_id)
+                        .values(status=MERGED)
+                    )
+                    _, blocks, _ = merge_station(session, run_id, station_id, years)
+                packed_blocks += blocks
+
+        processed, inserted = session.execute(
+            select(
+                func.coalesce(func.sum(IngestionTask.processed_count), 0),
+                func.coalesce(func.sum(IngestionTask.inserted_raw_count), 0),
+            ).where(IngestionTask.ingestion_run_id == run_id)
+        ).one()
+        conflicts = session.execute(
+            select(func.count())
+            .select_from(WeatherConflict)
+            .where(WeatherConflict.ingestion_run_id == run_id)
+        ).scalar_one()
+        pairs = (
+            select(WeatherRecordRaw.station_id, WeatherRecordRaw.date)
+            .where(WeatherRecordRaw.ingestion_run_id == run_id)
+            .distinct()
+            .subquery()
+        )
+        upserted = session.execute(select(func.count()).select_from(pairs)).scalar_one()
+        session.commit()
+
+        end = datetime.now(timezone.utc)
+        events.log("INFO", f"packed blocks refreshed: {packed_blocks}")
+        events.log("INFO", f"conflicts logged: {conflicts}")
+        events.log(
+            "INFO",
+            f"processed={processed} raw_inserted={inserted} curated_upserted={upserted}",
+            end,
+        )
+        # Events must be visible before the run is marked finished (see the SSE stream).
+        events.flush()
+
+        run = session.get(IngestionRun, run_id)
+        run.finished_at = end
+        # A finalize that failed earlier and was run again is no longer failed.
+        run.failed_at = None
+        run.processed_count = processed
+        run.inserted_raw_count = inserted
+        run.conflicts_count = conflicts
+        run.upserted_curated_count = upserted
+        session.commit()
+        logging.info("Run %s finalized: %s stations merged", run_id, len(pending_merges))
+    except Exception as exc:
+        session.rollback()
+        if events is not None:
+            mark_run_failed(session, events, f"weather finalize failed: {exc}")
+        raise
+    finally:
+        if events is not None:
+            events.close()
+        session.close()
+
+    if stats:
+        compute_weather_stats()
+    else:
+        refresh_snapshot_file()
+    return {
+        "processed": processed,
+        "inserted": inserted,
+        "conflicts": conflicts,
+        "curated_upserted": upserted,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queued weather ingestion across workers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    enqueue_parser = commands.add_parser("enqueue", help="Queue one task per station file")
+    enqueue_parser.add_argument("--data-dir", default=settings.data_dir)
+    enqueue_parser.add_argument("--stations", nargs="+", help="Only queue these stations")
+    worker_parser = commands.add_parser("worker", help="Claim and run queued tasks")
+    worker_parser.add_argument("--worker-id", help="Defaults to host:pid")
+    worker_parser.add_argument("--batch-size", type=int, default=10000)
+    worker_parser.add_argument("--poll-seconds", type=float, default=5.0)
+    worker_parser.add_argument("--exit-when-idle", action="store_true")
+    requeue_parser = commands.add_parser("requeue", help="Retry a run's failed tasks")
+    requeue_parser.add_argument("run_id", type=int)
+    finalize_parser = commands.add_parser("finalize", help="Merge a run once its tasks are done")
+    finalize_parser.add_argument("run_id", type=int)
+    finalize_parser.add_argument("--no-stats", action="store_true", help="Skip recomputing stats")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.command == "enqueue":
+        print(enqueue_weather(Path(args.data_dir), args.stations))
+    elif args.command == "worker":
+        ran = run_worker(args.worker_id, args.batch_size, args.poll_seconds, args.exit_when_idle)
+        logging.info("Tasks run: %s", ran)
+    elif args.command == "requeue":
+        logging.info("Tasks requeued: %s", requeue_failed(args.run_id))
+    else:
+        logging.info("Run finalized: %s", finalize_run(args.run_id, stats=not args.no_stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Watch the weather data directory and the yield file, and ingest whatever changes.
+
+    python -m app.ingest.watch [--debounce 2] [--poll]
+
+Changed files are collected until nothing has changed for `--debounce` seconds (or for
+at most `--max-wait` seconds while files keep changing). Then only the changed station
+files are ingested, and only those stations' `weather_stats` rows are recomputed. A
+changed yield file is ingested again. Changes use inotify/FSEvents through `watchfiles`
+(installed with `uvicorn[standard]`) when available, and otherwise modification times
+are polled, which is also the only option on most network mounts. Start the watcher
+after a full ingest: files that changed while it was not running are not picked up.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import logging
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from app.config import settings
+from app.ingest.weather import ingest_weather
+from app.stats import compute_weather_stats
+from app.utils import optional_import
+
+# `app.ingest.yield` cannot be imported with an import statement.
+ingest_yield = importlib.import_module("app.ingest.yield").ingest_yield
+
+
+def _is_relevant(path: Path, data_dir: Path, yield_file: Path) -> bool:
+    return path == yield_file or (path.parent == data_dir and path.suffix == ".txt")
+
+
+def _snapshot(data_dir: Path, yield_file: Path) -> dict[Path, tuple[int, int]]:
+    paths = list(data_dir.glob("*.txt")) + [yield_file]
+    state = {}
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        state[path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+def poll_changes(
+    data_dir: Path,
+    yield_file: Path,
+    debounce: float,
+    max_wait: float,
+    interval: float = 1.0,
+    stop: threading.Event | None = None,
+) -> Iterator[set[Path]]:
+    """Yield debounced sets of changed paths by comparing modification times and sizes."""
+    stop = stop or threading.Event()
+    previous = _snapshot(data_dir, yield_file)
+    pending: set[Path] = set()
+    first_change = last_change = 0.0
+    while not stop.wait(interval):
+        current = _snapshot(data_dir, yield_file)
+        changed = {path for path, state in current.items() if previous.get(path) != state}
+        previous = current
+        now = time.monotonic()
+        if changed:
+            if not pending:
+                first_change = now
+            pending |= changed
+            last_change = now
+        if pending and (now - last_change >= debounce or now - first_change >= max_wait):
+            yield pending
+            pending = set()
+
+
+def _notified_changes(
+    data_dir: Path,
+    yield_file: Path,
+    debounce: float,
+    max_wait: float,
+    stop: threading.Event | None = None,
+) -> Iterator[set[Path]]:
+    watchfiles = optional_import("watchfiles")
+
+    def keep(change, path: str) -> bool:
+        return change != watchfiles.Change.deleted and _is_relevant(
+            Path(path), data_dir, yield_file
+        )
+
+    for changes in watchfiles.watch(
+        data_dir,
+        yield_file.parent,
+        watch_filter=keep,
+        # watchfiles yields once nothing changed for `step` ms, or after `debounce` ms.
+        step=int(debounce * 1000),
+        debounce=int(max_wait * 1000),
+        stop_event=stop,
+        recursive=False,
+    ):
+        yield {Path(path) for _, path in changes}
+
+
+def apply_changes(paths: Iterable[Path], data_dir: Path, yield_file: Path) -> dict[str, int]:
+    """Ingest the changed files and refresh the stats of the stations they belong to."""
+    stations = sorted(
+        path.stem
+        for path in paths
+        if path != yield_file and _is_relevant(path, data_dir, yield_file) and path.exists()
+    )
+    summary = {"stations": len(stations), "yield": 0}
+    if stations:
+        result = ingest_weather(data_dir, stations=stations)
+        summary["raw_inserted"] = result["inserted"]
+        if result["curated_upserted"]:
+            summary["stats_upserted"] = compute_weather_stats(station_ids=stations)["upserted"]
+    if yield_file in paths and yield_file.exists():
+        summary["yield"] = ingest_yield(yield_file)["inserted"]
+    return summary
+
+
+def watch(
+    data_dir: Path,
+    yield_file: Path,
+    debounce: float = 2.0,
+    max_wait: float = 30.0,
+    poll: bool = False,
+    stop: threading.Event | None = None,
+) -> None:
+    """Ingest changes until `stop` is set; a failed batch is logged and the watch goes on."""
+    data_dir, yield_file = data_dir.resolve(), yield_file.resolve()
+    if not poll:
+        try:
+            optional_import("watchfiles")
+        except ImportError as exc:
+            logging.warning("%s; polling for changes instead.", exc)
+            poll = True
+    batches = (
+        poll_changes(data_dir, yield_file, debounce, max_wait, stop=stop)
+        if poll
+        else _notified_changes(data_dir, yield_file, debounce, max_wait, stop=stop)
+    )
+    logging.info("Watching %s and %s", data_dir, yield_file)
+    for paths in batches:
+        logging.info("Changed files: %s", ", ".join(sorted(path.name for path in paths)))
+        try:
+            logging.info("Changes applied: %s", apply_changes(paths, data_dir, yield_file))
+        except Exception:
+            logging.exception("Applying changes failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest weather and yield files as they change.")
+    parser.add_argument("--data-dir", default=settings.data_dir)
+    parser.add_argument("--yield-file", default=settings.yield_file)
+    parser.add_argument(
+        "--debounce", type=float, default=2.0, help="Seconds without changes before ingesting"
+    )
+    parser.add_argument(
+        "--max-wait", type=float, default=30.0, help="Ingest after this long even if busy"
+    )
+    parser.add_argument("--poll", action="store_true", help="Poll modification times")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        watch(Path(args.data_dir), Path(args.yield_file), args.debounce, args.max_wait, args.poll)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -3,22 +3,28 @@ from __future__ import annotations
 import argparse
 import hashlib
 import logging
+from collections.abc import Callable, Iterable
 from datetime import datetime, timezone
 from pathlib import Path
 
-from sqlalchemy import case, func, literal, select
+from sqlalchemy import case, func, literal, select, true, union_all
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from app import db
+from app.ingest.events import EventSink, mark_run_failed
+from app.ingest.locks import StationLocks
 from app.models import (
-    IngestionEvent,
     IngestionRun,
     WeatherConflict,
     WeatherRecord,
     WeatherRecordRaw,
     WeatherStation,
 )
+from app.packed import refresh_blocks
+from app.partitions import PartitionManager
+from app.snapshot_file import refresh_snapshot_file
+from app.versions import WEATHER_RECORDS, publish_version
 
 MISSING_VALUE = -9999
 HASH_MISSING_VALUE = "NA"
@@ -54,6 +60,14 @@ def _insert_ignore(session, table, rows, conflict_cols=None) -> int:
     return _rowcount(result)
 
 
+def insert_raw_rows(session, partitions: PartitionManager, rows) -> int:
+    """Insert raw rows, skipping any whose `row_hash` is already stored."""
+    partitions.ensure({row["date"].year for row in rows})
+    # Must match uq_weather_raw_row_hash, which includes the partition key on Postgres.
+    conflict_cols = ["row_hash", "date"] if db.engine.dialect.name == "postgresql" else ["row_hash"]
+    return _insert_ignore(session, WeatherRecordRaw.__table__, rows, conflict_cols)
+
+
 def _parse_value(raw: str) -> int | None:
     value = int(raw)
     if value == MISSING_VALUE:
@@ -93,330 +107,336 @@ def _parse_line(line: str):
     }
 
 
-def _log_conflicts(session, run_id: int, created_at: datetime) -> int:
-    fields = [
-        ("max_temp_tenths_c", WeatherRecord.max_temp_tenths_c, WeatherRecord.max_temp_raw_id),
-        ("min_temp_tenths_c", WeatherRecord.min_temp_tenths_c, WeatherRecord.min_temp_raw_id),
-        ("precip_tenths_mm", WeatherRecord.precip_tenths_mm, WeatherRecord.precip_raw_id),
-    ]
+def _run_filters(run_id: int, years: set[int], station_id: str | None = None) -> list:
+    """Select a run's raw rows; the date window lets Postgres prune year partitions."""
+    filters = [WeatherRecordRaw.ingestion_run_id == run_id]
+    if station_id is not None:
+        filters.append(WeatherRecordRaw.station_id == station_id)
+    if years:
+        filters.append(WeatherRecordRaw.date >= datetime(min(years), 1, 1).date())
+        filters.append(WeatherRecordRaw.date <= datetime(max(years), 12, 31).date())
+    return filters
+
+
+CONFLICT_FIELDS = ("max_temp_tenths_c", "min_temp_tenths_c", "precip_tenths_mm")
+# The raw row each curated value came from, per field.
+RAW_ID_FIELDS = {
+    "max_temp_tenths_c": "max_temp_raw_id",
+    "min_temp_tenths_c": "min_temp_raw_id",
+    "precip_tenths_mm": "precip_raw_id",
+}
+
+
+def _curated_upsert(run_id: int, years: set[int], station_id: str):
+    """Merge a station's raw rows from one run into `weather_records`.
+
+    Per field, an incoming non-null value replaces the stored one when nothing is
+    stored or it comes from a newer raw row.
+    """
+    raw_select = select(
+        WeatherRecordRaw.station_id,
+        WeatherRecordRaw.date,
+        *(getattr(WeatherRecordRaw, field) for field in CONFLICT_FIELDS),
+        *(
+            case(
+                (getattr(WeatherRecordRaw, field).is_not(None), WeatherRecordRaw.id),
+                else_=None,
+            ).label(raw_id)
+            for field, raw_id in RAW_ID_FIELDS.items()
+        ),
+    ).where(*_run_filters(run_id, years, station_id))
+
+    insert = sqlite_insert if db.engine.dialect.name == "sqlite" else pg_insert
+    insert_stmt = insert(WeatherRecord.__table__).from_select(
+        ["station_id", "date", *CONFLICT_FIELDS, *RAW_ID_FIELDS.values()], raw_select
+    )
 
-    total_conflicts = 0
-    for field_name, curated_value_col, curated_raw_id_col in fields:
-        raw_value_col = getattr(WeatherRecordRaw, field_name)
-
-        conflict_select = (
-            select(
-                literal(run_id),
-                WeatherRecordRaw.station_id,
-                WeatherRecordRaw.date,
-                literal(field_name),
-                curated_value_col,
-                raw_value_col,
-                curated_raw_id_col,
-                WeatherRecordRaw.id,
-                WeatherRecordRaw.source_file,
-                WeatherRecordRaw.source_line,
-                literal(created_at),
-            )
-            .select_from(WeatherRecordRaw)
-            .join(
-                WeatherRecord,
-                (WeatherRecord.station_id == WeatherRecordRaw.station_id)
-                & (WeatherRecord.date == WeatherRecordRaw.date),
-            )
-            .where(
-                WeatherRecordRaw.ingestion_run_id == run_id,
-                raw_value_col.is_not(None),
-                curated_value_col.is_not(None),
-                raw_value_col != curated_value_col,
+    excluded = insert_stmt.excluded
+    set_ = {}
+    for field, raw_id in RAW_ID_FIELDS.items():
+        newer = excluded[field].is_not(None) & (
+            getattr(WeatherRecord, field).is_(None)
+            | (excluded[raw_id] > func.coalesce(getattr(WeatherRecord, raw_id), 0))
+        )
+        set_[field] = case((newer, excluded[field]), else_=getattr(WeatherRecord, field))
+        set_[raw_id] = case((newer, excluded[raw_id]), else_=getattr(WeatherRecord, raw_id))
+    return insert_stmt.on_conflict_do_update(index_elements=["station_id", "date"], set_=set_)
+
+
+def _log_conflicts(
+    session, run_id: int, created_at: datetime, years: set[int], station_id: str | None = None
+) -> int:
+    """Log this run's raw values that disagree with the merged curated values.
+
+    The run's raw rows are joined to `weather_records` once and fanned out over a
+    three-row field list, instead of one join per field.
+    """
+    fields = union_all(
+        *(
+            select(literal(ordinal).label("ordinal"), literal(name).label("field"))
+            for ordinal, name in enumerate(CONFLICT_FIELDS)
+        )
+    ).subquery("conflict_fields")
+
+    def by_field(model, columns=CONFLICT_FIELDS):
+        """`model`'s column for the current field, `columns` given in field order."""
+        return case(
+            *(
+                (fields.c.ordinal == ordinal, getattr(model, column))
+                for ordinal, column in enumerate(columns)
             )
         )
 
-        insert_stmt = WeatherConflict.__table__.insert().from_select(
-            [
-                "ingestion_run_id",
-                "station_id",
-                "date",
-                "field",
-                "existing_value",
-                "incoming_value",
-                "existing_raw_id",
-                "incoming_raw_id",
-                "source_file",
-                "source_line",
-                "created_at",
-            ],
-            conflict_select,
+    raw_value = by_field(WeatherRecordRaw)
+    curated_value = by_field(WeatherRecord)
+    curated_raw_id = by_field(WeatherRecord, [RAW_ID_FIELDS[name] for name in CONFLICT_FIELDS])
+
+    conflict_select = (
+        select(
+            literal(run_id),
+            WeatherRecordRaw.station_id,
+            WeatherRecordRaw.date,
+            fields.c.field,
+            curated_value,
+            raw_value,
+            curated_raw_id,
+            WeatherRecordRaw.id,
+            WeatherRecordRaw.source_file,
+            WeatherRecordRaw.source_line,
+            literal(created_at),
+        )
+        .select_from(WeatherRecordRaw)
+        .join(
+            WeatherRecord,
+            (WeatherRecord.station_id == WeatherRecordRaw.station_id)
+            & (WeatherRecord.date == WeatherRecordRaw.date),
         )
-        result = session.execute(insert_stmt)
-        total_conflicts += _rowcount(result)
+        .join(fields, true())
+        .where(
+            *_run_filters(run_id, years, station_id),
+            raw_value.is_not(None),
+            curated_value.is_not(None),
+            raw_value != curated_value,
+        )
+        # Same row order as logging the fields one after another.
+        .order_by(fields.c.ordinal, WeatherRecordRaw.id)
+    )
 
-    return total_conflicts
+    insert_stmt = WeatherConflict.__table__.insert().from_select(
+        [
+            "ingestion_run_id",
+            "station_id",
+            "date",
+            "field",
+            "existing_value",
+            "incoming_value",
+            "existing_raw_id",
+            "incoming_raw_id",
+            "source_file",
+            "source_line",
+            "created_at",
+        ],
+        conflict_select,
+    )
+    return _rowcount(session.execute(insert_stmt))
+
+
+def _log_progress(
+    events: EventSink,
+    phase: str,
+    started_at: datetime,
+    files_done: int,
+    files_total: int,
+    rows: int,
+) -> None:
+    now = datetime.now(timezone.utc)
+    elapsed = max((now - started_at).total_seconds(), 1e-6)
+    events.log(
+        "PROGRESS",
+        (
+            f"phase={phase} files_done={files_done} files_total={files_total} "
+            f"rows={rows} rows_per_sec={rows / elapsed:.1f}"
+        ),
+        now,
+    )
 
 
-def _log_event(session, run_id: int, level: str, message: str, created_at: datetime) -> None:
-    session.add(
-        IngestionEvent(
-            ingestion_run_id=run_id,
-            level=level,
-            message=message,
-            created_at=created_at,
-        )
+def clamp_batch_size(batch_size: int) -> int:
+    """Keep raw insert batches under SQLite's limit on bound parameters."""
+    if db.engine.dialect.name == "sqlite":
+        batch_size = min(batch_size, db.sqlite_batch_rows(10))
+    return batch_size
+
+
+def ingest_station_file(
+    session,
+    partitions: PartitionManager,
+    file_path: Path,
+    run_id: int,
+    ingested_at: datetime,
+    batch_size: int,
+    on_batch: Callable[[], None] | None = None,
+) -> tuple[int, int, set[int]]:
+    """Parse one station file into `weather_records_raw`, committing every `batch_size` rows.
+
+    `on_batch` runs in each batch's transaction, just before it commits.
+    Returns (rows processed, raw rows inserted, years seen).
+    """
+    station_id = file_path.stem
+    _insert_ignore(session, WeatherStation.__table__, [{"station_id": station_id}], ["station_id"])
+
+    processed = 0
+    inserted = 0
+    years: set[int] = set()
+    batch = []
+    with file_path.open("r", encoding="utf-8") as handle:
+        for line_number, line in enumerate(handle, start=1):
+            parsed = _parse_line(line)
+            if not parsed:
+                continue
+            batch.append(
+                {
+                    "station_id": station_id,
+                    "date": parsed["date"],
+                    "max_temp_tenths_c": parsed["max_temp_tenths_c"],
+                    "min_temp_tenths_c": parsed["min_temp_tenths_c"],
+                    "precip_tenths_mm": parsed["precip_tenths_mm"],
+                    "source_file": str(file_path),
+                    "source_line": line_number,
+                    "ingested_at": ingested_at,
+                    "ingestion_run_id": run_id,
+                    "row_hash": _row_hash(
+                        station_id,
+                        parsed["date"],
+                        parsed["max_temp_tenths_c"],
+                        parsed["min_temp_tenths_c"],
+                        parsed["precip_tenths_mm"],
+                    ),
+                }
+            )
+            processed += 1
+            years.add(parsed["date"].year)
+
+            if len(batch) >= batch_size:
+                inserted += insert_raw_rows(session, partitions, batch)
+                if on_batch is not None:
+                    on_batch()
+                session.commit()
+                batch.clear()
+
+    if batch:
+        inserted += insert_raw_rows(session, partitions, batch)
+    if on_batch is not None:
+        on_batch()
+    session.commit()
+    return processed, inserted, years
+
+
+def merge_station(session, run_id: int, station_id: str, years: set[int]) -> tuple[int, int, int]:
+    """Merge, re-pack and check one station's rows from this run, in one transaction.
+
+    Publishes a new `weather_records` version, so cached aggregates are recomputed.
+    Returns (curated rows upserted, packed blocks written, conflicts logged).
+    """
+    session.execute(_curated_upsert(run_id, years, station_id))
+    packed_blocks = refresh_blocks(session, run_id, station_id=station_id)
+    conflicts = _log_conflicts(session, run_id, datetime.now(timezone.utc), years, station_id)
+    dates = (
+        select(WeatherRecordRaw.date)
+        .where(*_run_filters(run_id, years, station_id))
+        .distinct()
+        .subquery()
     )
+    upserted = session.execute(select(func.count()).select_from(dates)).scalar_one()
+    # Last, so concurrent merges hold the version row only until they commit.
+    publish_version(session, WEATHER_RECORDS)
+    session.commit()
+    return upserted, packed_blocks, conflicts
 
 
-def ingest_weather(data_dir: Path, batch_size: int = 10000) -> dict[str, int]:
+def station_files(data_dir: Path, stations: Iterable[str] | None = None) -> list[Path]:
+    """The station files in `data_dir`, sorted, limited to `stations` if given."""
     if not data_dir.exists():
         raise FileNotFoundError(f"Data directory not found: {data_dir}")
 
+    files = sorted(data_dir.glob("*.txt"))
+    if stations is not None:
+        wanted = set(stations)
+        files = [path for path in files if path.stem in wanted]
+        missing = wanted - {path.stem for path in files}
+        if missing:
+            logging.warning("No data files for stations: %s", ", ".join(sorted(missing)))
+    return files
+
+
+def ingest_weather(
+    data_dir: Path, batch_size: int = 10000, stations: Iterable[str] | None = None
+) -> dict[str, int]:
+    """Ingest the station files in `data_dir` (only `stations`, if given).
+
+    Each station is ingested and merged under its lock (see `app.ingest.locks`), so
+    runs over disjoint stations can proceed in parallel.
+    """
+    files = station_files(data_dir, stations)
     session = db.SessionLocal()
+    events = None
     try:
         run_started_at = datetime.now(timezone.utc)
         run = IngestionRun(dataset="weather", started_at=run_started_at)
         session.add(run)
         session.commit()
         session.refresh(run)
+        events = EventSink(run.id)
 
-        if db.engine.dialect.name == "sqlite":
-            max_sqlite_vars = 999
-            columns_per_row = 10
-            max_rows = max_sqlite_vars // columns_per_row
-            batch_size = min(batch_size, max_rows if max_rows > 0 else 1)
+        batch_size = clamp_batch_size(batch_size)
 
         start = datetime.now(timezone.utc)
         logging.info("Weather ingestion started at %s", start.isoformat())
-        _log_event(session, run.id, "INFO", "weather ingestion started", start)
-        session.commit()
+        events.log("INFO", "weather ingestion started", start)
 
         total_processed = 0
         total_inserted = 0
-        batch = []
-
-        for file_path in sorted(data_dir.glob("*.txt")):
-            station_id = file_path.stem
-            _insert_ignore(
-                session,
-                WeatherStation.__table__,
-                [{"station_id": station_id}],
-                ["station_id"],
-            )
-
-            with file_path.open("r", encoding="utf-8") as handle:
-                for line_number, line in enumerate(handle, start=1):
-                    parsed = _parse_line(line)
-                    if not parsed:
-                        continue
-                    batch.append(
-                        {
-                            "station_id": station_id,
-                            "date": parsed["date"],
-                            "max_temp_tenths_c": parsed["max_temp_tenths_c"],
-                            "min_temp_tenths_c": parsed["min_temp_tenths_c"],
-                            "precip_tenths_mm": parsed["precip_tenths_mm"],
-                            "source_file": str(file_path),
-                            "source_line": line_number,
-                            "ingested_at": run_started_at,
-                            "ingestion_run_id": run.id,
-                            "row_hash": _row_hash(
-                                station_id,
-                                parsed["date"],
-                                parsed["max_temp_tenths_c"],
-                                parsed["min_temp_tenths_c"],
-                                parsed["precip_tenths_mm"],
-                            ),
-                        }
+        upserted_curated = 0
+        packed_blocks = 0
+        conflicts_logged = 0
+        partitions = PartitionManager()
+
+        with StationLocks() as locks:
+            for files_done, file_path in enumerate(files, start=1):
+                station_id = file_path.stem
+                with locks.hold(station_id):
+                    processed, inserted, station_years = ingest_station_file(
+                        session, partitions, file_path, run.id, run_started_at, batch_size
+                    )
+                    total_processed += processed
+                    total_inserted += inserted
+                    _log_progress(
+                        events,
+                        "raw",
+                        start,
+                        files_done=files_done,
+                        files_total=len(files),
+                        rows=total_processed,
                     )
-                    total_processed += 1
-
-                    if len(batch) >= batch_size:
-                        total_inserted += _insert_ignore(
-                            session,
-                            WeatherRecordRaw.__table__,
-                            batch,
-                            ["row_hash"],
-                        )
-                        session.commit()
-                        batch.clear()
-
-        if batch:
-            total_inserted += _insert_ignore(
-                session,
-                WeatherRecordRaw.__table__,
-                batch,
-                ["row_hash"],
-            )
-            session.commit()
-
-        raw_select = select(
-            WeatherRecordRaw.station_id,
-            WeatherRecordRaw.date,
-            WeatherRecordRaw.max_temp_tenths_c,
-            WeatherRecordRaw.min_temp_tenths_c,
-            WeatherRecordRaw.precip_tenths_mm,
-            case(
-                (WeatherRecordRaw.max_temp_tenths_c.is_not(None), WeatherRecordRaw.id),
-                else_=None,
-            ).label("max_temp_raw_id"),
-            case(
-                (WeatherRecordRaw.min_temp_tenths_c.is_not(None), WeatherRecordRaw.id),
-                else_=None,
-            ).label("min_temp_raw_id"),
-            case(
-                (WeatherRecordRaw.precip_tenths_mm.is_not(None), WeatherRecordRaw.id),
-                else_=None,
-            ).label("precip_raw_id"),
-        ).where(WeatherRecordRaw.ingestion_run_id == run.id)
-
-        if db.engine.dialect.name == "sqlite":
-            insert_stmt = sqlite_insert(WeatherRecord.__table__).from_select(
-                [
-                    "station_id",
-                    "date",
-                    "max_temp_tenths_c",
-                    "min_temp_tenths_c",
-                    "precip_tenths_mm",
-                    "max_temp_raw_id",
-                    "min_temp_raw_id",
-                    "precip_raw_id",
-                ],
-                raw_select,
-            )
-        else:
-            insert_stmt = pg_insert(WeatherRecord.__table__).from_select(
-                [
-                    "station_id",
-                    "date",
-                    "max_temp_tenths_c",
-                    "min_temp_tenths_c",
-                    "precip_tenths_mm",
-                    "max_temp_raw_id",
-                    "min_temp_raw_id",
-                    "precip_raw_id",
-                ],
-                raw_select,
-            )
-
-        excluded = insert_stmt.excluded
-        update_stmt = insert_stmt.on_conflict_do_update(
-            index_elements=["station_id", "date"],
-            set_={
-                "max_temp_tenths_c": case(
-                    (
-                        excluded.max_temp_tenths_c.is_not(None)
-                        & (
-                            WeatherRecord.max_temp_tenths_c.is_(None)
-                            | (
-                                excluded.max_temp_raw_id
-                                > func.coalesce(WeatherRecord.max_temp_raw_id, 0)
-                            )
-                        ),
-                        excluded.max_temp_tenths_c,
-                    ),
-                    else_=WeatherRecord.max_temp_tenths_c,
-                ),
-                "max_temp_raw_id": case(
-                    (
-                        excluded.max_temp_tenths_c.is_not(None)
-                        & (
-                            WeatherRecord.max_temp_tenths_c.is_(None)
-                            | (
-                                excluded.max_temp_raw_id
-                                > func.coalesce(WeatherRecord.max_temp_raw_id, 0)
-                            )
-                        ),
-                        excluded.max_temp_raw_id,
-                    ),
-                    else_=WeatherRecord.max_temp_raw_id,
-                ),
-                "min_temp_tenths_c": case(
-                    (
-                        excluded.min_temp_tenths_c.is_not(None)
-                        & (
-                            WeatherRecord.min_temp_tenths_c.is_(None)
-                            | (
-                                excluded.min_temp_raw_id
-                                > func.coalesce(WeatherRecord.min_temp_raw_id, 0)
-                            )
-                        ),
-                        excluded.min_temp_tenths_c,
-                    ),
-                    else_=WeatherRecord.min_temp_tenths_c,
-                ),
-                "min_temp_raw_id": case(
-                    (
-                        excluded.min_temp_tenths_c.is_not(None)
-                        & (
-                            WeatherRecord.min_temp_tenths_c.is_(None)
-                            | (
-                                excluded.min_temp_raw_id
-                                > func.coalesce(WeatherRecord.min_temp_raw_id, 0)
-                            )
-                        ),
-                        excluded.min_temp_raw_id,
-                    ),
-                    else_=WeatherRecord.min_temp_raw_id,
-                ),
-                "precip_tenths_mm": case(
-                    (
-                        excluded.precip_tenths_mm.is_not(None)
-                        & (
-                            WeatherRecord.precip_tenths_mm.is_(None)
-                            | (
-                                excluded.precip_raw_id
-                                > func.coalesce(WeatherRecord.precip_raw_id, 0)
-                            )
-                        ),
-                        excluded.precip_tenths_mm,
-                    ),
-                    else_=WeatherRecord.precip_tenths_mm,
-                ),
-                "precip_raw_id": case(
-                    (
-                        excluded.precip_tenths_mm.is_not(None)
-                        & (
-                            WeatherRecord.precip_tenths_mm.is_(None)
-                            | (
-                                excluded.precip_raw_id
-                                > func.coalesce(WeatherRecord.precip_raw_id, 0)
-                            )
-                        ),
-                        excluded.precip_raw_id,
-                    ),
-                    else_=WeatherRecord.precip_raw_id,
-                ),
-            },
-        )
-        session.execute(update_stmt)
-        session.commit()
-        _log_event(
-            session,
-            run.id,
-            "INFO",
-            f"curated upsert completed for run {run.id}",
-            datetime.now(timezone.utc),
-        )
-        session.commit()
-
-        conflict_created_at = datetime.now(timezone.utc)
-        conflicts_logged = _log_conflicts(session, run.id, conflict_created_at)
-        _log_event(
-            session,
-            run.id,
-            "INFO",
-            f"conflicts logged: {conflicts_logged}",
-            conflict_created_at,
-        )
-        session.commit()
 
-        distinct_pairs = (
-            select(WeatherRecordRaw.station_id, WeatherRecordRaw.date)
-            .where(WeatherRecordRaw.ingestion_run_id == run.id)
-            .distinct()
-            .subquery()
-        )
-        upserted_curated = session.execute(
-            select(func.count()).select_from(distinct_pairs)
-        ).scalar_one()
+                    upserted, blocks, conflicts = merge_station(
+                        session, run.id, station_id, station_years
+                    )
+                upserted_curated += upserted
+                packed_blocks += blocks
+                conflicts_logged += conflicts
+                _log_progress(
+                    events,
+                    "curated",
+                    start,
+                    files_done=files_done,
+                    files_total=len(files),
+                    rows=total_processed,
+                )
+
+        events.log("INFO", f"curated upsert completed for run {run.id}")
+        events.log("INFO", f"packed blocks refreshed: {packed_blocks}")
+        events.log("INFO", f"conflicts logged: {conflicts_logged}")
 
         end = datetime.now(timezone.utc)
         logging.info("Weather ingestion finished at %s", end.isoformat())
@@ -425,9 +445,7 @@ def ingest_weather(data_dir: Path, batch_size: int = 10000) -> dict[str, int]:
         logging.info("Weather conflicts logged: %s", conflicts_logged)
         logging.info("Weather curated rows upserted: %s", upserted_curated)
 
-        _log_event(
-            session,
-            run.id,
+        events.log(
             "INFO",
             (
                 f"processed={total_processed} raw_inserted={total_inserted} "
@@ -435,6 +453,16 @@ def ingest_weather(data_dir: Path, batch_size: int = 10000) -> dict[str, int]:
             ),
             end,
         )
+        _log_progress(
+            events,
+            "done",
+            start,
+            files_done=len(files),
+            files_total=len(files),
+            rows=total_processed,
+        )
+        # Events must be visible before the run is marked finished (see the SSE stream).
+        events.flush()
 
         run.finished_at = end
         run.processed_count = total_processed
@@ -449,7 +477,14 @@ def ingest_weather(data_dir: Path, batch_size: int = 10000) -> dict[str, int]:
             "conflicts": conflicts_logged,
             "curated_upserted": upserted_curated,
         }
+    except Exception as exc:
+        session.rollback()
+        if events is not None:
+            mark_run_failed(session, events, f"weather ingestion failed: {exc}")
+        raise
     finally:
+        if events is not None:
+            events.close()
         session.close()
 
 
@@ -457,10 +492,15 @@ def main():
     parser = argparse.ArgumentParser(description="Ingest weather data files.")
     parser.add_argument("--data-dir", default="wx_data", help="Directory with weather data files")
     parser.add_argument("--batch-size", type=int, default=10000, help="Batch size for inserts")
+    parser.add_argument(
+        "--stations", nargs="+", help="Only ingest these stations (data file names without .txt)"
+    )
     args = parser.parse_args()
 
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
-    ingest_weather(Path(args.data_dir), batch_size=args.batch_size)
+    ingest_weather(Path(args.data_dir), batch_size=args.batch_size, stations=args.stations)
+    # New stations belong in the snapshot's station list before the next stats run.
+    refresh_snapshot_file()
 
 
 if __name__ == "__main__":
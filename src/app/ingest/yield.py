@@ -9,18 +9,8 @@ from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from app import db
-from app.models import CropYield, IngestionEvent, IngestionRun
-
-
-def _log_event(session, run_id: int, level: str, message: str, created_at: datetime) -> None:
-    session.add(
-        IngestionEvent(
-            ingestion_run_id=run_id,
-            level=level,
-            message=message,
-            created_at=created_at,
-        )
-    )
+from app.ingest.events import EventSink, mark_run_failed
+from app.models import CropYield, IngestionRun
 
 
 def _rowcount(result) -> int:
@@ -55,17 +45,18 @@ def ingest_yield(file_path: Path) -> dict[str, int]:
         raise FileNotFoundError(f"Yield data file not found: {file_path}")
 
     session = db.SessionLocal()
+    events = None
     try:
         run_started_at = datetime.now(timezone.utc)
         run = IngestionRun(dataset="yield", started_at=run_started_at)
         session.add(run)
         session.commit()
         session.refresh(run)
+        events = EventSink(run.id)
 
         start = run_started_at
         logging.info("Yield ingestion started at %s", start.isoformat())
-        _log_event(session, run.id, "INFO", "yield ingestion started", start)
-        session.commit()
+        events.log("INFO", "yield ingestion started", start)
 
         total_processed = 0
         total_inserted = 0
@@ -88,13 +79,8 @@ def ingest_yield(file_path: Path) -> dict[str, int]:
         logging.info("Yield records processed: %s", total_processed)
         logging.info("Yield records inserted: %s", total_inserted)
 
-        _log_event(
-            session,
-            run.id,
-            "INFO",
-            f"processed={total_processed} inserted={total_inserted}",
-            end,
-        )
+        events.log("INFO", f"processed={total_processed} inserted={total_inserted}", end)
+        events.flush()
 
         run.finished_at = end
         run.processed_count = total_processed
@@ -103,7 +89,14 @@ def ingest_yield(file_path: Path) -> dict[str, int]:
         session.commit()
 
         return {"processed": total_processed, "inserted": total_inserted}
+    except Exception as exc:
+        session.rollback()
+        if events is not None:
+            mark_run_failed(session, events, f"yield ingestion failed: {exc}")
+        raise
     finally:
+        if events is not None:
+            events.close()
         session.close()
 
 
@@ -0,0 +1,290 @@
+"""Replay a mix of API requests at a fixed concurrency and report latency percentiles.
+
+    python -m app.loadtest --base-url http://127.0.0.1:3767 --concurrency 32 --duration 30
+    python -m app.loadtest --mix weather=6,stats=2,yield=1,events=1,wide=1 --output load.json
+
+Stations, years and ingestion runs are sampled from the API itself (every page of the
+yearly stats), so start it on a loaded database (SQLite or Postgres) first. `wide` and
+`aggregate` requests cover all stations over a date window, the heavy queries that
+admission control queues. Each of `--concurrency` workers sends its
+next request as soon as the previous one returns. The JSON report has overall
+throughput and, per route, the request count, errors, status codes and p50/p95/p99
+latency in milliseconds. Keep it next to the deploy to compare runs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+
+import httpx
+
+DEFAULT_MIX = {"weather": 6, "stats": 2, "yield": 1, "events": 1, "wide": 1, "aggregate": 1}
+ROUTES = {
+    "weather": "/api/weather",
+    "stats": "/api/weather/stats",
+    "yield": "/api/yield",
+    "events": "/api/ingestion/events",
+    "wide": "/api/weather",
+    "aggregate": "/api/weather/aggregate",
+}
+# Report names for scenarios that share a route with another one.
+REPORT_NAMES = {"wide": "/api/weather (all stations)"}
+# Date ranges from a single day (`date=`) up to a decade, and mostly shallow pages.
+WEATHER_SPANS_DAYS = (0, 7, 31, 365, 3650)
+# All-station windows stay shorter: a day across every station is already a wide query.
+WIDE_SPANS_DAYS = (0, 0, 7, 31, 365)
+PAGE_DEPTHS = (1, 1, 1, 2, 5, 20)
+PAGE_SIZES = (20, 100, 1000)
+DISCOVERY_PAGE_SIZE = 1000
+# Stats rows sampled at most, so discovery stays quick on a very large database.
+DISCOVERY_MAX_ROWS = 200_000
+
+
+@dataclass
+class Sample:
+    """What the workload draws from: station-years, yield years and ingestion run ids."""
+
+    station_years: list[tuple[str, int]]
+    yield_years: list[int] = field(default_factory=list)
+    run_ids: list[int] = field(default_factory=list)
+
+
+def parse_mix(value: str) -> dict[str, int]:
+    """`weather=6,stats=2` -> {"weather": 6, "stats": 2}."""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise ValueError(f"Unknown route {name!r}; choose from {', '.join(ROUTES)}")
+        mix[name] = int(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("The mix needs at least one positive weight")
+    return mix
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct * len(sorted_values) / 100), 1)
+    return sorted_values[rank - 1]
+
+
+async def _first_page(client: httpx.AsyncClient, route: str) -> list[dict]:
+    response = await client.get(ROUTES[route], params={"page_size": DISCOVERY_PAGE_SIZE})
+    response.raise_for_status()
+    return response.json()["data"]
+
+
+async def _all_pages(client: httpx.AsyncClient, route: str, max_rows: int) -> list[dict]:
+    rows: list[dict] = []
+    page = 1
+    while len(rows) < max_rows:
+        response = await client.get(
+            ROUTES[route], params={"page": page, "page_size": DISCOVERY_PAGE_SIZE}
+        )
+        response.raise_for_status()
+        body = response.json()
+        rows.extend(body["data"])
+        if not body["data"] or len(rows) >= body["total"]:
+            break
+        page += 1
+    return rows[:max_rows]
+
+
+async def discover(client: httpx.AsyncClient) -> Sample:
+    stats = await _all_pages(client, "stats", DISCOVERY_MAX_ROWS)
+    if not stats:
+        raise RuntimeError("No weather stats to sample from; run `python -m app.stats` first.")
+    yields = await _first_page(client, "yield")
+    events = await _first_page(client, "events")
+    return Sample(
+        station_years=[(row["station_id"], row["year"]) for row in stats],
+        yield_years=[row["year"] for row in yields],
+        run_ids=sorted({row["ingestion_run_id"] for row in events}),
+    )
+
+
+def build_request(route: str, sample: Sample, rng: random.Random) -> dict:
+    """Query parameters for one request of `route`, drawn from `sample`."""
+    station_id, year = rng.choice(sample.station_years)
+    if route in ("wide", "aggregate"):
+        start = date(year, 1, 1) + timedelta(days=rng.randrange(365))
+        span = rng.choice(WIDE_SPANS_DAYS)
+        if route == "aggregate":
+            return {
+                "bucket": rng.choice(("week", "month", "year")),
+                "start_date": start.isoformat(),
+                "end_date": (start + timedelta(days=max(span, 31))).isoformat(),
+                "page": rng.choice(PAGE_DEPTHS),
+            }
+        params = {"page": rng.choice(PAGE_DEPTHS), "page_size": rng.choice(PAGE_SIZES)}
+        if span == 0:
+            params["date"] = start.isoformat()
+        else:
+            params["start_date"] = start.isoformat()
+            params["end_date"] = (start + timedelta(days=span)).isoformat()
+        return params
+    if route == "weather":
+        start = date(year, 1, 1) + timedelta(days=rng.randrange(365))
+        span = rng.choice(WEATHER_SPANS_DAYS)
+        params = {"station_id": station_id, "page": rng.choice(PAGE_DEPTHS)}
+        if span == 0:
+            params["date"] = start.isoformat()
+        else:
+            params["start_date"] = start.isoformat()
+            params["end_date"] = (start + timedelta(days=span)).isoformat()
+        params["page_size"] = rng.choice(PAGE_SIZES)
+        return params
+    if route == "stats":
+        if rng.random() < 0.5:
+            return {"station_id": station_id, "page_size": rng.choice(PAGE_SIZES)}
+        return {"year_start": year, "year_end": year + rng.randrange(5), "page": rng.randint(1, 3)}
+    if route == "yield":
+        if sample.yield_years and rng.random() < 0.5:
+            return {"year": rng.choice(sample.yield_years)}
+        return {"page_size": rng.choice(PAGE_SIZES)}
+    params = {"page": rng.choice(PAGE_DEPTHS), "page_size": rng.choice(PAGE_SIZES)}
+    if sample.run_ids and rng.random() < 0.8:
+        params["ingestion_run_id"] = rng.choice(sample.run_ids)
+    return params
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, route: str, seconds: float, status: str) -> None:
+        self.latencies[route].append(seconds * 1000)
+        self.statuses[route][status] += 1
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for name, latencies in sorted(self.latencies.items()):
+            latencies.sort()
+            statuses = self.statuses[name]
+            routes[REPORT_NAMES.get(name, ROUTES[name])] = {
+                "requests": len(latencies),
+                "errors": sum(n for status, n in statuses.items() if not status.startswith("2")),
+                "throughput_rps": round(len(latencies) / elapsed, 2),
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p95_ms": round(percentile(latencies, 95), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                "max_ms": round(latencies[-1], 2),
+                "status": dict(sorted(statuses.items())),
+            }
+        total = sum(route["requests"] for route in routes.values())
+        return {
+            "requests": total,
+            "errors": sum(route["errors"] for route in routes.values()),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "routes": routes,
+        }
+
+
+async def run_load(
+    base_url: str,
+    mix: dict[str, int] | None = None,
+    concurrency: int = 16,
+    duration: float | None = 30.0,
+    requests: int | None = None,
+    seed: int = 0,
+    timeout: float = 30.0,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> dict:
+    """Run the workload until `duration` seconds pass or `requests` are sent; returns the report.
+
+    `transport` lets tests drive an in-process app through `httpx.ASGITransport`.
+    """
+    if duration is None and requests is None:
+        raise ValueError("Set a duration, a request count, or both")
+    mix = mix or DEFAULT_MIX
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    recorder = Recorder()
+
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=timeout, limits=limits, transport=transport
+    ) as client:
+        sample = await discover(client)
+        remaining = requests
+        started = time.perf_counter()
+        deadline = started + duration if duration is not None else None
+
+        def take() -> bool:
+            nonlocal remaining
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            if remaining is not None:
+                if remaining <= 0:
+                    return False
+                remaining -= 1
+            return True
+
+        async def worker(worker_id: int) -> None:
+            rng = random.Random(seed * 1_000_003 + worker_id)
+            while take():
+                route = rng.choices(names, weights)[0]
+                params = build_request(route, sample, rng)
+                sent = time.perf_counter()
+                try:
+                    response = await client.get(ROUTES[route], params=params)
+                    status = str(response.status_code)
+                except httpx.HTTPError as exc:
+                    status = type(exc).__name__
+                recorder.record(route, time.perf_counter() - sent, status)
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    report = recorder.report(elapsed)
+    report.update(base_url=base_url, concurrency=concurrency, mix=mix, seed=seed)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API with a mix of requests.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:3767")
+    parser.add_argument(
+        "--mix", type=parse_mix, default=DEFAULT_MIX, help="e.g. weather=6,stats=2,wide=1"
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    report = asyncio.run(
+        run_load(
+            args.base_url,
+            mix=args.mix,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            requests=args.requests,
+            seed=args.seed,
+        )
+    )
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,35 @@
 from __future__ import annotations
 
+from pathlib import Path
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
-from app.api import ingestion, stats, weather, yield_data
+from app.admission import AdmissionController
+from app.api import aggregate, ingestion, stats, weather, yield_data
+from app.cache import ResultCache
+from app.config import settings
+from app.metrics import MetricsMiddleware, MetricsRegistry
+from app.snapshot_file import MappedSnapshotStore
+from app.stats_snapshot import StatsSnapshotStore
 
 
 def create_app() -> FastAPI:
     app = FastAPI(title="Weather Data API", version="1.0.0")
+    app.state.aggregate_cache = ResultCache(settings.aggregate_cache_size)
+    if settings.stats_snapshot_path:
+        app.state.stats_snapshot = MappedSnapshotStore(Path(settings.stats_snapshot_path))
+    else:
+        app.state.stats_snapshot = StatsSnapshotStore()
+    app.state.admission = AdmissionController.default()
+    app.middleware("http")(app.state.admission)
+    # Registered last so it wraps admission control and also times shed requests.
+    app.state.metrics = MetricsRegistry()
+    app.middleware("http")(MetricsMiddleware(app.state.metrics))
 
     app.include_router(weather.router, prefix="/api")
     app.include_router(stats.router, prefix="/api")
+    app.include_router(aggregate.router, prefix="/api")
     app.include_router(yield_data.router, prefix="/api")
     app.include_router(ingestion.router, prefix="/api")
 
@@ -17,6 +37,13 @@ def create_app() -> FastAPI:
     def root():
         return {"status": "ok"}
 
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        return PlainTextResponse(
+            app.state.metrics.render(),
+            media_type="text/plain; version=0.0.4",
+        )
+
     return app
 
 
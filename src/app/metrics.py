@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class RequestMetrics:
+    query_count: int = 0
+    sql_seconds: float = 0.0
+    rows: int = 0
+    serialization_seconds: float = 0.0
+    endpoint_returned_at: float | None = None
+
+
+_current: ContextVar[RequestMetrics | None] = ContextVar("request_metrics", default=None)
+
+
+def record_query(seconds: float, rowcount: int | None) -> None:
+    metrics = _current.get()
+    if metrics is None:
+        return
+    metrics.query_count += 1
+    metrics.sql_seconds += seconds
+    # Drivers report -1 when they don't know (e.g. SQLite SELECTs); those rows are
+    # counted as they are fetched instead (see `record_rows`).
+    if rowcount is not None and rowcount > 0:
+        metrics.rows += rowcount
+
+
+def record_rows(count: int) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.rows += count
+
+
+def record_serialization(seconds: float) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.serialization_seconds += seconds
+
+
+def server_timing(metrics: RequestMetrics, total_seconds: float) -> str:
+    return ", ".join(
+        [
+            f'sql;dur={metrics.sql_seconds * 1000:.2f};desc="{metrics.query_count} queries"',
+            f'rows;desc="{metrics.rows}"',
+            f"serialize;dur={metrics.serialization_seconds * 1000:.2f}",
+            f"total;dur={total_seconds * 1000:.2f}",
+        ]
+    )
+
+
+def _mark_returned(endpoint):
+    """Wrap a plain endpoint so the request records when it handed back its result."""
+
+    def returned(result):
+        metrics = _current.get()
+        if metrics is not None and not isinstance(result, Response):
+            metrics.endpoint_returned_at = time.perf_counter()
+        return result
+
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            return returned(await endpoint(*args, **kwargs))
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        return returned(endpoint(*args, **kwargs))
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """Route that counts FastAPI's `response_model` validation and encoding as serialization.
+
+    That work happens after the endpoint returns, so it is timed from there until the
+    response object exists. Endpoints returning a `FastJSONResponse` time their own
+    encoding instead, and streaming endpoints are left alone.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not (inspect.isgeneratorfunction(endpoint) or inspect.isasyncgenfunction(endpoint)):
+            endpoint = _mark_returned(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            response = await handler(request)
+            metrics = _current.get()
+            if metrics is not None and metrics.endpoint_returned_at is not None:
+                record_serialization(time.perf_counter() - metrics.endpoint_returned_at)
+                metrics.endpoint_returned_at = None
+            return response
+
+        return timed_handler
+
+
+def route_template(scope) -> str:
+    # Newer FastAPI keeps included routes un-prefixed on `scope["route"]` and records
+    # the full path template on the effective route context instead.
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    if context is not None:
+        return context.path
+    return getattr(scope.get("route"), "path", "unmatched")
+
+
+class _RouteStats:
+    def __init__(self):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.duration_sum = 0.0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.serialization_seconds = 0.0
+        self.statuses: dict[int, int] = {}
+
+
+class MetricsRegistry:
+    """Per-route request metrics rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._routes: dict[tuple[str, str], _RouteStats] = {}
+        self._lock = threading.Lock()
+
+    def observe(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        seconds: float,
+        metrics: RequestMetrics,
+    ) -> None:
+        with self._lock:
+            stats = self._routes.setdefault((method, route), _RouteStats())
+            index = bisect_left(LATENCY_BUCKETS, seconds)
+            if index < len(LATENCY_BUCKETS):
+                stats.bucket_counts[index] += 1
+            stats.count += 1
+            stats.duration_sum += seconds
+            stats.queries += metrics.query_count
+            stats.sql_seconds += metrics.sql_seconds
+            stats.rows += metrics.rows
+            stats.serialization_seconds += metrics.serialization_seconds
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_requests_total Requests handled, by route and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        with self._lock:
+            routes = sorted(self._routes.items())
+            for (method, route), stats in routes:
+                for status, count in sorted(stats.statuses.items()):
+                    labels = f'method="{method}",route="{route}",status="{status}"'
+                    lines.append(f"http_requests_total{{{labels}}} {count}")
+
+            lines += [
+                "# HELP http_request_duration_seconds Request latency, by route.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), stats in routes:
+                labels = f'method="{method}",route="{route}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, stats.bucket_counts, strict=True):
+                    cumulative += count
+                    lines.append(
+                        f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} '
+                        f"{cumulative}"
+                    )
+                lines.append(
+                    f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}'
+                )
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {stats.duration_sum}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {stats.count}")
+
+            counters = [
+                ("db_queries_total", "SQL statements executed.", "queries"),
+                ("db_query_seconds_total", "Time spent in SQL statements.", "sql_seconds"),
+                ("db_rows_total", "Rows returned or changed by SQL statements.", "rows"),
+                (
+                    "response_serialization_seconds_total",
+                    "Time spent encoding response bodies.",
+                    "serialization_seconds",
+                ),
+            ]
+            for name, help_text, attribute in counters:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (method, route), stats in routes:
+                    labels = f'method="{method}",route="{route}"'
+                    lines.append(f"{name}{{{labels}}} {getattr(stats, attribute)}")
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Collects per-request SQL/serialization timings and adds a Server-Timing header."""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+
+    async def __call__(self, request: Request, call_next):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            _current.reset(token)
+        elapsed = time.perf_counter() - start
+
+        self.registry.observe(
+            request.method,
+            route_template(request.scope),
+            response.status_code,
+            elapsed,
+            metrics,
+        )
+        response.headers["Server-Timing"] = server_timing(metrics, elapsed)
+        return response
@@ -8,6 +8,7 @@ from sqlalchemy import (
     ForeignKey,
     Index,
     Integer,
+    LargeBinary,
     String,
     UniqueConstraint,
 )
@@ -16,10 +17,16 @@ from sqlalchemy.orm import relationship
 from app.db import Base
 
 
+def _not_postgres(_ddl, _target, _bind, **kw) -> bool:
+    return kw["dialect"].name != "postgresql"
+
+
 class WeatherStation(Base):
     __tablename__ = "weather_stations"
 
     station_id = Column(String, primary_key=True)
+    # Set once every year of the station is in `weather_year_blocks` (see `app.packed`).
+    packed_at = Column(DateTime, nullable=True)
 
     records = relationship("WeatherRecord", back_populates="station")
     stats = relationship("WeatherStats", back_populates="station")
@@ -39,9 +46,19 @@ class WeatherRecord(Base):
 
     station = relationship("WeatherStation", back_populates="records")
 
+    # The primary key already serves (station_id, date) lookups; see migration 0011.
+    # Date-only windows use the B-tree on SQLite and the BRIN index on Postgres (0014).
     __table_args__ = (
-        Index("ix_weather_records_date", "date"),
-        Index("ix_weather_records_station_date", "station_id", "date"),
+        Index("ix_weather_records_date", "date").ddl_if(callable_=_not_postgres),
+        Index(
+            "ix_weather_records_station_date_cover",
+            "station_id",
+            "date",
+            postgresql_include=["max_temp_tenths_c", "min_temp_tenths_c", "precip_tenths_mm"],
+        ).ddl_if(dialect="postgresql"),
+        Index("ix_weather_records_date_brin", "date", postgresql_using="brin").ddl_if(
+            dialect="postgresql"
+        ),
     )
 
 
@@ -56,7 +73,20 @@ class WeatherStats(Base):
 
     station = relationship("WeatherStation", back_populates="stats")
 
-    __table_args__ = (Index("ix_weather_stats_station_year", "station_id", "year"),)
+
+class WeatherYearBlock(Base):
+    """One station-year of curated weather values, packed by `app.packed`."""
+
+    __tablename__ = "weather_year_blocks"
+
+    station_id = Column(String, ForeignKey("weather_stations.station_id"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    day_count = Column(Integer, nullable=False)
+    present = Column(LargeBinary, nullable=False)
+    null_mask = Column(LargeBinary, nullable=False)
+    max_temp_tenths_c = Column(LargeBinary, nullable=False)
+    min_temp_tenths_c = Column(LargeBinary, nullable=False)
+    precip_tenths_mm = Column(LargeBinary, nullable=False)
 
 
 class CropYield(Base):
@@ -73,6 +103,8 @@ class IngestionRun(Base):
     dataset = Column(String, nullable=False)
     started_at = Column(DateTime, nullable=False)
     finished_at = Column(DateTime, nullable=True)
+    # Set when a run stops on an error, so event streams know it will not finish.
+    failed_at = Column(DateTime, nullable=True)
     processed_count = Column(Integer, nullable=False, default=0)
     inserted_raw_count = Column(Integer, nullable=False, default=0)
     upserted_curated_count = Column(Integer, nullable=False, default=0)
@@ -88,6 +120,59 @@ class IngestionEvent(Base):
     message = Column(String, nullable=False)
     created_at = Column(DateTime, nullable=False)
 
+    __table_args__ = (
+        Index("ix_ingestion_events_run_id", "ingestion_run_id", "id"),
+        Index("ix_ingestion_events_created_at", "created_at"),
+        Index("ix_ingestion_events_level_created_at", "level", "created_at"),
+    )
+
+
+class IngestionTask(Base):
+    """One station file of a queued ingestion run, claimed by a worker (see `app.ingest.queue`)."""
+
+    __tablename__ = "ingestion_tasks"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    ingestion_run_id = Column(Integer, ForeignKey("ingestion_runs.id"), nullable=False)
+    station_id = Column(String, nullable=False)
+    source_file = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    worker = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    processed_count = Column(Integer, nullable=False, default=0)
+    inserted_raw_count = Column(Integer, nullable=False, default=0)
+    first_year = Column(Integer, nullable=True)
+    last_year = Column(Integer, nullable=True)
+    error = Column(String, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("ingestion_run_id", "station_id", name="uq_ingestion_tasks_run_station"),
+        Index("ix_ingestion_tasks_status_id", "status", "id"),
+    )
+
+
+class DatasetVersion(Base):
+    __tablename__ = "dataset_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+
+class BackfillCheckpoint(Base):
+    """Progress of a resumable data backfill (see `alembic/migration_helpers.py`)."""
+
+    __tablename__ = "backfill_checkpoints"
+
+    name = Column(String, primary_key=True)
+    last_id = Column(Integer, nullable=False)
+    max_id = Column(Integer, nullable=False)
+    rows = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+
 
 class WeatherRecordRaw(Base):
     __tablename__ = "weather_records_raw"
@@ -107,6 +192,9 @@ class WeatherRecordRaw(Base):
     __table_args__ = (
         Index("ix_weather_raw_station_date", "station_id", "date"),
         Index("ix_weather_raw_run", "ingestion_run_id"),
+        Index("ix_weather_raw_date_brin", "date", postgresql_using="brin").ddl_if(
+            dialect="postgresql"
+        ),
         UniqueConstraint("row_hash", name="uq_weather_raw_row_hash"),
     )
 
@@ -126,3 +214,8 @@ class WeatherConflict(Base):
     source_file = Column(String, nullable=False)
     source_line = Column(Integer, nullable=False)
     created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_weather_conflicts_run", "ingestion_run_id"),
+        Index("ix_weather_conflicts_station_date", "station_id", "date"),
+    )
@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+from array import array
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app import db
+from app.models import WeatherRecord, WeatherRecordRaw, WeatherStation, WeatherYearBlock
+
+# Every block has a slot per day of a leap year; day 0 is January 1st.
+DAYS = 366
+BITMAP_BYTES = (DAYS + 7) // 8
+VALUE_FIELDS = ("max_temp_tenths_c", "min_temp_tenths_c", "precip_tenths_mm")
+UPSERT_BATCH_SIZE = db.sqlite_batch_rows(8)
+
+
+def _int16(data: bytes) -> array:
+    values = array("h")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _int16_bytes(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array("h", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _day_range_mask(lo: int, hi: int) -> int:
+    """Bit mask selecting days `[lo, hi)` of a little-endian bitmap."""
+    return ((1 << hi) - 1) ^ ((1 << lo) - 1)
+
+
+def encode_block(station_id: str, year: int, rows: Iterable) -> dict | None:
+    """Pack `(date, max_temp, min_temp, precip)` rows of one station-year.
+
+    Values are little-endian int16 in tenths with 0 in unused slots. `present` has a
+    bit per day with a curated record; `null_mask` holds one bitmap per value field
+    with a bit for each present day whose value is null. Returns None if a value does
+    not fit in int16; such station-years are only read from rows.
+    """
+    first = date(year, 1, 1).toordinal()
+    present = bytearray(BITMAP_BYTES)
+    null_mask = bytearray(BITMAP_BYTES * len(VALUE_FIELDS))
+    columns = [array("h", bytes(DAYS * 2)) for _field in VALUE_FIELDS]
+    day_count = 0
+    for record_date, *values in rows:
+        day = record_date.toordinal() - first
+        byte, bit = day >> 3, 1 << (day & 7)
+        present[byte] |= bit
+        day_count += 1
+        for index, value in enumerate(values):
+            if value is None:
+                null_mask[index * BITMAP_BYTES + byte] |= bit
+            else:
+                try:
+                    columns[index][day] = value
+                except OverflowError:
+                    return None
+
+    block = {
+        "station_id": station_id,
+        "year": year,
+        "day_count": day_count,
+        "present": bytes(present),
+        "null_mask": bytes(null_mask),
+    }
+    for name, values in zip(VALUE_FIELDS, columns, strict=True):
+        block[name] = _int16_bytes(values)
+    return block
+
+
+@dataclass(frozen=True)
+class PackedYear:
+    """Decoded view of a `weather_year_blocks` row."""
+
+    station_id: str
+    year: int
+    day_count: int
+    present: int
+    nulls: tuple[int, ...]
+    columns: tuple[array, ...]
+
+    @classmethod
+    def from_row(cls, row) -> PackedYear:
+        null_mask = row.null_mask
+        return cls(
+            row.station_id,
+            row.year,
+            row.day_count,
+            int.from_bytes(row.present, "little"),
+            tuple(
+                int.from_bytes(null_mask[i * BITMAP_BYTES : (i + 1) * BITMAP_BYTES], "little")
+                for i in range(len(VALUE_FIELDS))
+            ),
+            tuple(_int16(getattr(row, name)) for name in VALUE_FIELDS),
+        )
+
+    def count(self, lo: int = 0, hi: int = DAYS) -> int:
+        if lo == 0 and hi >= DAYS:
+            return self.day_count
+        return (self.present & _day_range_mask(lo, hi)).bit_count()
+
+    def days(self, lo: int = 0, hi: int = DAYS) -> Iterator[int]:
+        present = self.present & _day_range_mask(lo, hi)
+        while present:
+            low_bit = present & -present
+            yield low_bit.bit_length() - 1
+            present ^= low_bit
+
+    def value(self, field: int, day: int) -> int | None:
+        if self.nulls[field] >> day & 1:
+            return None
+        return self.columns[field][day]
+
+    def totals(self, field: int) -> tuple[int, int]:
+        """`(sum, non-null count)` of a field over the whole year."""
+        # Null and absent days are stored as 0, so they don't disturb the sum.
+        return sum(self.columns[field]), self.day_count - self.nulls[field].bit_count()
+
+
+def _year_bounds(year: int, start_date: date | None, end_date: date | None) -> tuple[int, int]:
+    first = date(year, 1, 1)
+    lo = (start_date - first).days if start_date and start_date > first else 0
+    hi = (end_date - first).days + 1 if end_date and end_date.year == year else DAYS
+    return lo, hi
+
+
+def load_years(
+    session,
+    station_id: str,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> list[PackedYear]:
+    """The station's blocks in the window, or none if the station is not fully packed."""
+    stmt = (
+        select(WeatherYearBlock)
+        .join(WeatherStation)
+        .where(WeatherYearBlock.station_id == station_id, WeatherStation.packed_at.is_not(None))
+        .order_by(WeatherYearBlock.year)
+    )
+    if start_date:
+        stmt = stmt.where(WeatherYearBlock.year >= start_date.year)
+    if end_date:
+        stmt = stmt.where(WeatherYearBlock.year <= end_date.year)
+    return [PackedYear.from_row(row) for row in session.execute(stmt).scalars()]
+
+
+def read_weather(
+    years: list[PackedYear],
+    start_date: date | None = None,
+    end_date: date | None = None,
+    offset: int = 0,
+    limit: int | None = None,
+) -> tuple[int, list[dict]]:
+    """`(total, rows)` for a date window, shaped like `WeatherRecordOut` dicts."""
+    bounds = [_year_bounds(year.year, start_date, end_date) for year in years]
+    total = sum(year.count(lo, hi) for year, (lo, hi) in zip(years, bounds, strict=True))
+
+    data: list[dict] = []
+    remaining = total if limit is None else limit
+    for year, (lo, hi) in zip(years, bounds, strict=True):
+        if remaining <= 0:
+            break
+        count = year.count(lo, hi)
+        if offset >= count:
+            offset -= count
+            continue
+        first = date(year.year, 1, 1)
+        for day in year.days(lo, hi):
+            if offset:
+                offset -= 1
+                continue
+            max_temp, min_temp, precip = (year.value(field, day) for field in range(3))
+            data.append(
+                {
+                    "station_id": year.station_id,
+                    "date": first + timedelta(days=day),
+                    "max_temp_c": None if max_temp is None else max_temp / 10.0,
+                    "min_temp_c": None if min_temp is None else min_temp / 10.0,
+                    "precip_cm": None if precip is None else precip / 100.0,
+                }
+            )
+            remaining -= 1
+            if remaining <= 0:
+                break
+    return total, data
+
+
+def _upsert_blocks(session, blocks: list[dict], dialect_name: str) -> None:
+    if not blocks:
+        return
+    insert = pg_insert if dialect_name == "postgresql" else sqlite_insert
+    stmt = insert(WeatherYearBlock.__table__).values(blocks)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["station_id", "year"],
+        set_={
+            name: getattr(stmt.excluded, name)
+            for name in ("day_count", "present", "null_mask", *VALUE_FIELDS)
+        },
+    )
+    session.execute(stmt)
+
+
+def _station_blocks(
+    session, station_id: str, first_year: int, last_year: int
+) -> Iterator[tuple[int, dict | None]]:
+    rows = session.execute(
+        select(
+            WeatherRecord.date,
+            WeatherRecord.max_temp_tenths_c,
+            WeatherRecord.min_temp_tenths_c,
+            WeatherRecord.precip_tenths_mm,
+        )
+        .where(
+            WeatherRecord.station_id == station_id,
+            WeatherRecord.date >= date(first_year, 1, 1),
+            WeatherRecord.date <= date(last_year, 12, 31),
+        )
+        .order_by(WeatherRecord.date)
+    ).all()
+
+    year_rows: list = []
+    for row in rows:
+        if year_rows and row.date.year != year_rows[0].date.year:
+            year = year_rows[0].date.year
+            yield year, encode_block(station_id, year, year_rows)
+            year_rows = []
+        year_rows.append(row)
+    if year_rows:
+        year = year_rows[0].date.year
+        yield year, encode_block(station_id, year, year_rows)
+
+
+def _is_packed(session, station_id: str) -> bool:
+    return (
+        session.execute(
+            select(WeatherStation.packed_at).where(WeatherStation.station_id == station_id)
+        ).scalar_one_or_none()
+        is not None
+    )
+
+
+def refresh_blocks(
+    session,
+    run_id: int | None = None,
+    dialect_name: str | None = None,
+    station_id: str | None = None,
+) -> int:
+    """Re-pack the station-years touched by an ingestion run (every station-year if None).
+
+    A station that is not fully packed yet has its whole history packed, and is then
+    marked with `weather_stations.packed_at`; reads only use blocks of marked stations.
+    A station-year with a value that does not fit in a block loses its block and the
+    mark. `station_id` limits the refresh to one station. `session` may be a Session or
+    Connection; writes join the caller's transaction. Returns the number of blocks written.
+    """
+    dialect_name = dialect_name or db.engine.dialect.name
+    if run_id is None:
+        source = WeatherRecord
+        ranges_stmt = select(source.station_id, func.min(source.date), func.max(source.date))
+    else:
+        source = WeatherRecordRaw
+        ranges_stmt = select(source.station_id, func.min(source.date), func.max(source.date)).where(
+            source.ingestion_run_id == run_id
+        )
+    if station_id is not None:
+        ranges_stmt = ranges_stmt.where(source.station_id == station_id)
+    ranges = session.execute(
+        ranges_stmt.group_by(source.station_id).order_by(source.station_id)
+    ).all()
+
+    now = datetime.now(timezone.utc)
+    written = 0
+    pending: list[dict] = []
+    for station, first_date, last_date in ranges:
+        if run_id is not None and not _is_packed(session, station):
+            first_date, last_date = session.execute(
+                select(func.min(WeatherRecord.date), func.max(WeatherRecord.date)).where(
+                    WeatherRecord.station_id == station
+                )
+            ).one()
+            if first_date is None:
+                continue
+        complete = True
+        for year, block in _station_blocks(session, station, first_date.year, last_date.year):
+            if block is None:
+                logging.warning("%s %s has values out of int16 range; not packed", station, year)
+                session.execute(
+                    delete(WeatherYearBlock).where(
+                        WeatherYearBlock.station_id == station, WeatherYearBlock.year == year
+                    )
+                )
+                complete = False
+                continue
+            pending.append(block)
+            if len(pending) >= UPSERT_BATCH_SIZE:
+                _upsert_blocks(session, pending, dialect_name)
+                written += len(pending)
+                pending = []
+        session.execute(
+            update(WeatherStation)
+            .where(WeatherStation.station_id == station)
+            .values(packed_at=now if complete else None)
+        )
+    _upsert_blocks(session, pending, dialect_name)
+    return written + len(pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild the packed per-station-year copy of weather_records."
+    )
+    parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    with db.SessionLocal() as session:
+        written = refresh_blocks(session)
+        session.commit()
+    logging.info("Packed weather blocks written: %s", written)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import argparse
+import logging
+from collections.abc import Iterable
+
+from sqlalchemy import text
+
+from app import db
+from app.config import settings
+
+# Both tables are range-partitioned by `date` into calendar years, and each year is
+# hash-partitioned by `station_id` into `partition_hash_modulus` sub-partitions.
+PARTITIONED_TABLES = ("weather_records_raw", "weather_records")
+
+
+def year_partition_name(table: str, year: int) -> str:
+    return f"{table}_{year}"
+
+
+def is_partitioned(conn, table: str) -> bool:
+    return (
+        conn.execute(
+            text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+            {"table": table},
+        ).scalar_one_or_none()
+        == "p"
+    )
+
+
+def existing_years(conn, table: str) -> set[int]:
+    names = conn.execute(
+        text("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(:table)
+            """),
+        {"table": table},
+    ).scalars()
+    prefix = f"{table}_"
+    return {
+        int(name[len(prefix) :])
+        for name in names
+        if name.startswith(prefix) and name[len(prefix) :].isdigit()
+    }
+
+
+def create_year_partition(conn, table: str, year: int, modulus: int) -> None:
+    name = year_partition_name(table, year)
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table}
+        FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')
+        PARTITION BY HASH (station_id)
+        """))
+    for remainder in range(modulus):
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {name}_p{remainder} PARTITION OF {name}
+            FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})
+            """))
+
+
+def ensure_year_partitions(
+    conn,
+    years: Iterable[int],
+    tables: Iterable[str] = PARTITIONED_TABLES,
+    modulus: int | None = None,
+) -> list[str]:
+    """Create any missing year partitions (Postgres only) and return their names.
+
+    The hash modulus is fixed when a year is created; changing it only affects new years.
+    """
+    if conn.dialect.name != "postgresql":
+        return []
+    modulus = modulus or settings.partition_hash_modulus
+    years = set(years)
+    created = []
+    for table in tables:
+        if not is_partitioned(conn, table):
+            continue
+        # Serialize concurrent ingestions creating the same partitions.
+        conn.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"partitions:{table}"}
+        )
+        for year in sorted(years - existing_years(conn, table)):
+            create_year_partition(conn, table, year, modulus)
+            created.append(year_partition_name(table, year))
+    return created
+
+
+def rename_year_partitions(conn, table: str, old_name: str) -> None:
+    """Rename partitions created under `old_name` (e.g. a rebuilt shadow table) after `table`."""
+    names = conn.execute(
+        text(
+            "SELECT relid::regclass::text FROM pg_partition_tree(to_regclass(:table)) "
+            "WHERE level > 0"
+        ),
+        {"table": table},
+    ).scalars()
+    prefix = f"{old_name}_"
+    for name in list(names):
+        if name.startswith(prefix):
+            conn.execute(text(f"ALTER TABLE {name} RENAME TO {table}_{name[len(prefix) :]}"))
+
+
+class PartitionManager:
+    """Creates year partitions on demand before rows for those years are written.
+
+    Years already checked are remembered, so steady-state calls cost a set difference.
+    Partitions are created in their own transaction, committed before the caller inserts.
+    """
+
+    def __init__(self, engine=None, tables: Iterable[str] = PARTITIONED_TABLES):
+        self.engine = engine or db.engine
+        self.tables = tuple(tables)
+        self._known_years: set[int] = set()
+
+    def ensure(self, years: Iterable[int]) -> list[str]:
+        missing = set(years) - self._known_years
+        if not missing:
+            return []
+        created = []
+        if self.engine.dialect.name == "postgresql":
+            with self.engine.begin() as conn:
+                created = ensure_year_partitions(conn, missing, self.tables)
+            for name in created:
+                logging.info("Created partition %s", name)
+        self._known_years |= missing
+        return created
+
+
+def _year_range(value: str) -> range:
+    first, _, last = value.partition("-")
+    return range(int(first), int(last or first) + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create yearly partitions of the weather tables ahead of ingestion."
+    )
+    parser.add_argument("years", type=_year_range, help="Year or range, e.g. 2016-2030")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if db.engine.dialect.name != "postgresql":
+        logging.info("Partitioning is only used on Postgres; nothing to do.")
+        return
+    created = PartitionManager().ensure(args.years)
+    logging.info("Partitions created: %s", len(created))
+
+
+if __name__ == "__main__":
+    main()
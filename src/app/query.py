@@ -0,0 +1,199 @@
+"""Column-oriented reads of curated data for batch jobs.
+
+Rows are streamed with `yield_per` (a server-side cursor on Postgres) and converted to
+compact columns one chunk at a time, so no more than one chunk of row tuples exists at
+once and no ORM objects are built:
+
+    from app import query
+
+    columns = query.weather_columns(station_ids=["USC00110072"], start_date=date(1990, 1, 1))
+    frame = query.stats_columns(year_start=1990, kind="pandas")
+
+By default columns are plain Python lists. `kind="numpy"` returns a dict of arrays
+(dates as `datetime64[D]`, missing values as NaN) and `kind="pandas"` a DataFrame.
+Values use the same units as the API.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from datetime import date
+
+from sqlalchemy import func, select
+
+from app import db
+from app.models import CropYield, WeatherRecord, WeatherStats
+from app.utils import check_column_kind, optional_import
+
+CHUNK_SIZE = 50000
+CHUNK_KINDS = ("lists", "numpy")
+
+# (output name, column, NumPy dtype, divisor applied to the stored value)
+WEATHER_SPEC = (
+    ("station_id", WeatherRecord.station_id, object, None),
+    ("date", WeatherRecord.date, "datetime64[D]", None),
+    ("max_temp_c", WeatherRecord.max_temp_tenths_c, float, 10.0),
+    ("min_temp_c", WeatherRecord.min_temp_tenths_c, float, 10.0),
+    ("precip_cm", WeatherRecord.precip_tenths_mm, float, 100.0),
+)
+# The stored tenths, under their column names.
+RAW_WEATHER_SPEC = tuple((column.key, column, dtype, None) for _, column, dtype, _ in WEATHER_SPEC)
+STATS_SPEC = (
+    ("station_id", WeatherStats.station_id, object, None),
+    ("year", WeatherStats.year, "int64", None),
+    ("avg_max_temp_c", WeatherStats.avg_max_temp_c, float, None),
+    ("avg_min_temp_c", WeatherStats.avg_min_temp_c, float, None),
+    ("total_precip_cm", WeatherStats.total_precip_cm, float, None),
+)
+YIELD_SPEC = (
+    ("year", CropYield.year, "int64", None),
+    ("yield_value", CropYield.yield_value, "int64", None),
+)
+
+
+def _convert(spec, rows, np) -> dict:
+    values = list(zip(*rows, strict=True)) if rows else [()] * len(spec)
+    chunk = {}
+    for (name, _, dtype, divisor), column in zip(spec, values, strict=True):
+        if np is None:
+            if divisor:
+                column = [None if value is None else value / divisor for value in column]
+            chunk[name] = list(column)
+            continue
+        # float arrays turn None into NaN.
+        array = np.array(column, dtype=dtype)
+        if divisor:
+            array /= divisor
+        chunk[name] = array
+    return chunk
+
+
+def _iter_chunks(stmt, spec, kind: str, chunk_size: int) -> Iterator[dict]:
+    np = None if kind == "lists" else optional_import("numpy")
+    with db.read_engine.connect() as conn:
+        result = conn.execution_options(yield_per=chunk_size).execute(stmt)
+        for rows in result.partitions():
+            yield _convert(spec, rows, np)
+
+
+def _collect(stmt, spec, kind: str, chunk_size: int):
+    check_column_kind(kind)
+    if kind == "lists":
+        columns = {name: [] for name, *_ in spec}
+        for chunk in _iter_chunks(stmt, spec, kind, chunk_size):
+            for name, values in chunk.items():
+                columns[name].extend(values)
+        return columns
+
+    np = optional_import("numpy")
+    # Arrays are sized up front and filled as chunks arrive, so besides the result no
+    # more than one chunk is held at a time.
+    with db.read_engine.connect() as conn:
+        total = conn.execute(
+            select(func.count()).select_from(stmt.order_by(None).subquery())
+        ).scalar_one()
+    columns = {name: np.empty(total, dtype=dtype) for name, _, dtype, _ in spec}
+    filled = 0
+    for chunk in _iter_chunks(stmt, spec, kind, chunk_size):
+        size = len(chunk[spec[0][0]])
+        if filled + size > len(columns[spec[0][0]]):
+            # Rows were added after the count.
+            columns = {
+                name: np.concatenate(
+                    [values[:filled], np.empty(max(size, filled), dtype=values.dtype)]
+                )
+                for name, values in columns.items()
+            }
+        for name, values in chunk.items():
+            columns[name][filled : filled + size] = values
+        filled += size
+    columns = {name: values[:filled] for name, values in columns.items()}
+    if kind == "numpy":
+        return columns
+    return optional_import("pandas").DataFrame(columns, copy=False)
+
+
+def _weather_statement(
+    station_ids: Iterable[str] | None, start_date: date | None, end_date: date | None
+):
+    stmt = select(*(column for _, column, _, _ in WEATHER_SPEC)).order_by(
+        WeatherRecord.station_id, WeatherRecord.date
+    )
+    if station_ids is not None:
+        stmt = stmt.where(WeatherRecord.station_id.in_(list(station_ids)))
+    if start_date:
+        stmt = stmt.where(WeatherRecord.date >= start_date)
+    if end_date:
+        stmt = stmt.where(WeatherRecord.date <= end_date)
+    return stmt
+
+
+def iter_weather_chunks(
+    station_ids: Iterable[str] | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    kind: str = "lists",
+    chunk_size: int = CHUNK_SIZE,
+    raw: bool = False,
+) -> Iterator[dict]:
+    """Yield curated weather `chunk_size` rows at a time, each chunk a dict of columns.
+
+    Use this instead of `weather_columns` when even the finished columns would not fit
+    in memory. Chunks are lists or NumPy arrays; there is no DataFrame per chunk.
+    `raw=True` keeps the stored tenths under their column names.
+    """
+    check_column_kind(kind, CHUNK_KINDS)
+    return _iter_chunks(
+        _weather_statement(station_ids, start_date, end_date),
+        RAW_WEATHER_SPEC if raw else WEATHER_SPEC,
+        kind,
+        chunk_size,
+    )
+
+
+def weather_columns(
+    station_ids: Iterable[str] | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    kind: str = "lists",
+    chunk_size: int = CHUNK_SIZE,
+):
+    """Curated weather ordered by station and date, as columns."""
+    return _collect(
+        _weather_statement(station_ids, start_date, end_date), WEATHER_SPEC, kind, chunk_size
+    )
+
+
+def stats_columns(
+    station_ids: Iterable[str] | None = None,
+    year_start: int | None = None,
+    year_end: int | None = None,
+    kind: str = "lists",
+    chunk_size: int = CHUNK_SIZE,
+):
+    """Yearly weather stats ordered by station and year, as columns."""
+    stmt = select(*(column for _, column, _, _ in STATS_SPEC)).order_by(
+        WeatherStats.station_id, WeatherStats.year
+    )
+    if station_ids is not None:
+        stmt = stmt.where(WeatherStats.station_id.in_(list(station_ids)))
+    if year_start is not None:
+        stmt = stmt.where(WeatherStats.year >= year_start)
+    if year_end is not None:
+        stmt = stmt.where(WeatherStats.year <= year_end)
+    return _collect(stmt, STATS_SPEC, kind, chunk_size)
+
+
+def yield_columns(
+    year_start: int | None = None,
+    year_end: int | None = None,
+    kind: str = "lists",
+    chunk_size: int = CHUNK_SIZE,
+):
+    """Crop yield ordered by year, as columns."""
+    stmt = select(*(column for _, column, _, _ in YIELD_SPEC)).order_by(CropYield.year)
+    if year_start is not None:
+        stmt = stmt.where(CropYield.year >= year_start)
+    if year_end is not None:
+        stmt = stmt.where(CropYield.year <= year_end)
+    return _collect(stmt, YIELD_SPEC, kind, chunk_size)
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+
+from app import metrics
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded with orjson, skipping Pydantic validation.
+
+    Endpoints that return this directly keep their `response_model` for the
+    OpenAPI schema; the payload must already match that model.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        body = orjson.dumps(content)
+        metrics.record_serialization(time.perf_counter() - start)
+        return body
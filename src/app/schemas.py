@@ -2,7 +2,9 @@ from __future__ import annotations
 
 from datetime import date
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.config import settings
 
 
 class WeatherRecordOut(BaseModel):
@@ -21,6 +23,15 @@ class WeatherStatsOut(BaseModel):
     total_precip_cm: float | None
 
 
+class WeatherAggregateOut(BaseModel):
+    station_id: str
+    bucket_start: date
+    days: int
+    avg_max_temp_c: float | None
+    avg_min_temp_c: float | None
+    total_precip_cm: float | None
+
+
 class CropYieldOut(BaseModel):
     year: int
     yield_value: int
@@ -33,6 +44,25 @@ class PaginatedWeatherResponse(BaseModel):
     total: int
 
 
+class WeatherBatchRequest(BaseModel):
+    station_ids: list[str] = Field(min_length=1)
+    start_date: date | None = None
+    end_date: date | None = None
+    page_size: int = Field(default=settings.page_size_default, ge=1)
+    cursors: dict[str, date] = Field(default_factory=dict)
+
+
+class WeatherStationPage(BaseModel):
+    station_id: str
+    data: list[WeatherRecordOut]
+    next_cursor: date | None
+
+
+class WeatherBatchResponse(BaseModel):
+    data: list[WeatherStationPage]
+    page_size: int
+
+
 class PaginatedStatsResponse(BaseModel):
     data: list[WeatherStatsOut]
     page: int
@@ -40,6 +70,14 @@ class PaginatedStatsResponse(BaseModel):
     total: int
 
 
+class PaginatedAggregateResponse(BaseModel):
+    data: list[WeatherAggregateOut]
+    bucket: str
+    page: int
+    page_size: int
+    total: int
+
+
 class PaginatedYieldResponse(BaseModel):
     data: list[CropYieldOut]
     page: int
@@ -48,6 +86,7 @@ class PaginatedYieldResponse(BaseModel):
 
 
 class IngestionEventOut(BaseModel):
+    id: int
     ingestion_run_id: int
     level: str
     message: str
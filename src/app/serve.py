@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+
+# Restart a worker at most this often, so a crash loop doesn't spin the CPU.
+RESTART_BACKOFF_SECONDS = 1.0
+
+
+def _bind(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, log_level: str) -> None:
+    import uvicorn
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    config = uvicorn.Config(app, log_level=log_level, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _spawn(app, sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _run_worker(app, sock, log_level)
+        except BaseException:
+            logging.exception("Worker %s crashed", os.getpid())
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the API with pre-forked workers sharing a memory-mapped stats snapshot."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "3767")))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument(
+        "--snapshot",
+        default=os.getenv("STATS_SNAPSHOT_PATH"),
+        required=not os.getenv("STATS_SNAPSHOT_PATH"),
+        help="Stats snapshot file shared by all workers (defaults to STATS_SNAPSHOT_PATH)",
+    )
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.snapshot != os.getenv("STATS_SNAPSHOT_PATH"):
+        logging.warning(
+            "--snapshot differs from STATS_SNAPSHOT_PATH; stats and ingestion runs will not "
+            "refresh %s, so workers serve stats from the database once it is out of date",
+            args.snapshot,
+        )
+    # Settings are read at import time, so point them at the snapshot before preloading.
+    os.environ["STATS_SNAPSHOT_PATH"] = args.snapshot
+
+    from app import db
+    from app.main import app
+    from app.snapshot_file import export_snapshot, map_snapshot
+    from app.versions import WEATHER_STATS, current_version
+
+    snapshot_path = Path(args.snapshot)
+    with db.SessionLocal() as session:
+        version = current_version(session, WEATHER_STATS)
+    if not snapshot_path.exists() or map_snapshot(snapshot_path).version != version:
+        snapshot = export_snapshot(snapshot_path)
+        logging.info("Exported stats snapshot version %s to %s", snapshot.version, snapshot_path)
+
+    # Connections opened while preloading must not be shared across fork.
+    db.engine.dispose()
+    db.read_engine.dispose()
+
+    sock = _bind(args.host, args.port, args.backlog)
+    logging.info("Listening on %s:%s with %s workers", args.host, args.port, args.workers)
+
+    workers: dict[int, float] = {}
+    stopping = False
+
+    def _stop(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    for _ in range(args.workers):
+        workers[_spawn(app, sock, args.log_level)] = time.monotonic()
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started_at = workers.pop(pid, None)
+        if started_at is None or stopping:
+            continue
+        logging.warning("Worker %s exited with status %s; restarting", pid, status)
+        time.sleep(max(0.0, RESTART_BACKOFF_SECONDS - (time.monotonic() - started_at)))
+        workers[_spawn(app, sock, args.log_level)] = time.monotonic()
+
+    sock.close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.config import settings
+
+MAX_PARAMETERS_LENGTH = 2000
+_write_lock = threading.Lock()
+
+
+def _format_parameters(parameters) -> str:
+    text = repr(parameters)
+    if len(text) > MAX_PARAMETERS_LENGTH:
+        return text[:MAX_PARAMETERS_LENGTH] + "..."
+    return text
+
+
+def _explain(dbapi_connection, dialect_name: str, statement: str, parameters) -> str:
+    if dialect_name == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect_name == "postgresql":
+        # ANALYZE re-runs the statement, so only do it for reads.
+        is_select = statement.lstrip().upper().startswith(("SELECT", "WITH"))
+        if settings.slow_query_explain_analyze and is_select:
+            prefix = "EXPLAIN (ANALYZE, BUFFERS) "
+        else:
+            prefix = "EXPLAIN "
+    else:
+        return ""
+
+    cursor = dbapi_connection.cursor()
+    try:
+        if dialect_name == "postgresql":
+            # A failed EXPLAIN must not abort the caller's transaction.
+            cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        except Exception as exc:
+            if dialect_name == "postgresql":
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            return f"EXPLAIN failed: {exc}"
+        if dialect_name == "postgresql":
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+    finally:
+        cursor.close()
+
+    if dialect_name == "sqlite":
+        return "\n".join(str(row[-1]) for row in rows)
+    return "\n".join(str(row[0]) for row in rows)
+
+
+def maybe_record(
+    dbapi_connection,
+    dialect_name: str,
+    statement: str,
+    parameters,
+    executemany: bool,
+    seconds: float,
+    rowcount: int | None,
+) -> None:
+    """Log a statement and its plan if it ran longer than `settings.slow_query_ms`."""
+    duration_ms = seconds * 1000
+    if settings.slow_query_ms <= 0 or duration_ms < settings.slow_query_ms:
+        return
+
+    plan = ""
+    if not executemany:
+        try:
+            plan = _explain(dbapi_connection, dialect_name, statement, parameters)
+        except Exception as exc:
+            plan = f"EXPLAIN failed: {exc}"
+
+    entry = {
+        "logged_at": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(duration_ms, 3),
+        "rowcount": rowcount,
+        "statement": statement,
+        "parameters": _format_parameters(parameters),
+        "plan": plan,
+    }
+    logging.warning(
+        "Slow query (%.1f ms, rowcount=%s): %s %s",
+        duration_ms,
+        rowcount,
+        statement,
+        entry["parameters"],
+    )
+    with _write_lock, open(settings.slow_query_log, "a", encoding="utf-8") as handle:
+        handle.write(json.dumps(entry) + "\n")
+
+
+def _fingerprint(statement: str) -> str:
+    return re.sub(r"\s+", " ", statement).strip()
+
+
+def worst_offenders(log_path: Path, limit: int = 10) -> list[dict]:
+    """Slow statements grouped by text, ordered by total time spent."""
+    grouped: dict[str, dict] = {}
+    with log_path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            key = _fingerprint(entry["statement"])
+            summary = grouped.setdefault(
+                key,
+                {"statement": key, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "plan": ""},
+            )
+            summary["count"] += 1
+            summary["total_ms"] += entry["duration_ms"]
+            if entry["duration_ms"] >= summary["max_ms"]:
+                summary["max_ms"] = entry["duration_ms"]
+                summary["plan"] = entry["plan"]
+
+    ranked = sorted(grouped.values(), key=lambda item: item["total_ms"], reverse=True)
+    for summary in ranked:
+        summary["mean_ms"] = summary["total_ms"] / summary["count"]
+    return ranked[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List the slowest logged SQL statements.")
+    parser.add_argument("--log", default=settings.slow_query_log, help="Slow query log file")
+    parser.add_argument("--top", type=int, default=10, help="Number of statements to show")
+    parser.add_argument("--plans", action="store_true", help="Print the worst plan for each")
+    args = parser.parse_args()
+
+    for summary in worst_offenders(Path(args.log), args.top):
+        print(
+            f"{summary['total_ms']:10.1f} ms total  {summary['count']:5d} calls  "
+            f"{summary['mean_ms']:8.1f} ms mean  {summary['max_ms']:8.1f} ms max  "
+            f"{summary['statement'][:200]}"
+        )
+        if args.plans and summary["plan"]:
+            for plan_line in summary["plan"].splitlines():
+                print(f"    {plan_line}")
+
+
+if __name__ == "__main__":
+    main()
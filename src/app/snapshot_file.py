@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from pathlib import Path
+
+from sqlalchemy import select
+
+from app import db
+from app.config import settings
+from app.models import WeatherStation
+from app.stats_snapshot import VALUE_COLUMNS, StatsSnapshot, StatsSnapshotStore, load_snapshot
+from app.versions import WEATHER_STATS, current_version
+
+MAGIC = b"WXSNAP01"
+# magic, stats version (-1 for none), station count, row count, station name bytes
+HEADER = struct.Struct("<8sqqqq")
+NO_VERSION = -1
+
+
+def _aligned(length: int) -> int:
+    return (length + 7) // 8 * 8
+
+
+def _padded(data: bytes) -> bytes:
+    return data + b"\0" * (_aligned(len(data)) - len(data))
+
+
+def build_snapshot(session) -> StatsSnapshot:
+    """Stats snapshot that also lists stations without stats (as empty row ranges)."""
+    stats = load_snapshot(session)
+    station_ids = session.execute(select(WeatherStation.station_id)).scalars()
+
+    ordered = sorted(set(station_ids) | set(stats.station_ids))
+    offsets = array("q")
+    years = array("i")
+    columns = {name: array("d") for name in VALUE_COLUMNS}
+    for station in ordered:
+        offsets.append(len(years))
+        index = stats.station_index.get(station)
+        if index is None:
+            continue
+        lo, hi = stats.station_offsets[index], stats.station_offsets[index + 1]
+        years.extend(stats.years[lo:hi])
+        for name in VALUE_COLUMNS:
+            columns[name].extend(getattr(stats, name)[lo:hi])
+    offsets.append(len(years))
+
+    return StatsSnapshot(
+        stats.version,
+        {station: index for index, station in enumerate(ordered)},
+        tuple(ordered),
+        offsets,
+        years,
+        **columns,
+    )
+
+
+def write_snapshot(snapshot: StatsSnapshot, path: Path) -> None:
+    """Write the snapshot atomically (temp file + rename) so readers never see a partial file."""
+    names = [station.encode("utf-8") for station in snapshot.station_ids]
+    name_offsets = array("q", [0])
+    for name in names:
+        name_offsets.append(name_offsets[-1] + len(name))
+    name_blob = b"".join(names)
+
+    version = NO_VERSION if snapshot.version is None else snapshot.version
+    sections = [
+        HEADER.pack(MAGIC, version, len(snapshot.station_ids), len(snapshot), len(name_blob)),
+        array("q", snapshot.station_offsets).tobytes(),
+        _padded(array("i", snapshot.years).tobytes()),
+        *(array("d", getattr(snapshot, name)).tobytes() for name in VALUE_COLUMNS),
+        name_offsets.tobytes(),
+        _padded(name_blob),
+    ]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            for section in sections:
+                handle.write(section)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def map_snapshot(path: Path) -> StatsSnapshot:
+    """Map a snapshot file read-only; the arrays are views onto the shared page cache."""
+    with path.open("rb") as handle:
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+
+    magic, version, station_count, row_count, name_bytes = HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError(f"Not a stats snapshot file: {path}")
+
+    position = HEADER.size
+
+    def take(fmt: str, count: int, size: int) -> memoryview:
+        nonlocal position
+        section = view[position : position + count * size].cast(fmt)
+        position += _aligned(count * size)
+        return section
+
+    station_offsets = take("q", station_count + 1, 8)
+    years = take("i", row_count, 4)
+    columns = [take("d", row_count, 8) for _name in VALUE_COLUMNS]
+    name_offsets = take("q", station_count + 1, 8)
+    names = bytes(view[position : position + name_bytes])
+    station_ids = tuple(
+        names[name_offsets[index] : name_offsets[index + 1]].decode("utf-8")
+        for index in range(station_count)
+    )
+
+    return StatsSnapshot(
+        None if version == NO_VERSION else version,
+        {station: index for index, station in enumerate(station_ids)},
+        station_ids,
+        station_offsets,
+        years,
+        *columns,
+    )
+
+
+class MappedSnapshotStore:
+    """Serves stats from a memory-mapped snapshot file, remapping it when the file is replaced.
+
+    Every worker maps the same file, so the arrays live once in the OS page cache
+    rather than once per process. While the file is missing, or its stats version
+    differs from the one published in `dataset_versions` (a stats run without
+    `STATS_SNAPSHOT_PATH` set), stats come from the database instead.
+    """
+
+    def __init__(self, path: Path, refresh_seconds: float | None = None):
+        self.path = path
+        self.refresh_seconds = (
+            refresh_seconds
+            if refresh_seconds is not None
+            else settings.stats_snapshot_refresh_seconds
+        )
+        self._fallback = StatsSnapshotStore(self.refresh_seconds)
+        self._snapshot: StatsSnapshot | None = None
+        self._mapped: StatsSnapshot | None = None
+        self._file_id: tuple[int, int, int] | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> StatsSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.refresh_seconds:
+            return snapshot
+
+        with self._lock:
+            if (
+                self._snapshot is not None
+                and time.monotonic() - self._checked_at < self.refresh_seconds
+            ):
+                return self._snapshot
+            self._snapshot = self._load()
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def _load(self) -> StatsSnapshot:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            self._mapped = None
+            self._file_id = None
+            return self._fallback.get()
+
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if self._mapped is None or file_id != self._file_id:
+            self._mapped = map_snapshot(self.path)
+            self._file_id = file_id
+        with db.ReadSessionLocal() as session:
+            version = current_version(session, WEATHER_STATS)
+        if self._mapped.version != version:
+            logging.warning(
+                "Stats snapshot %s has version %s but version %s is published; "
+                "serving stats from the database until it is exported again",
+                self.path,
+                self._mapped.version,
+                version,
+            )
+            return self._fallback.get()
+        return self._mapped
+
+
+def export_snapshot(path: Path) -> StatsSnapshot:
+    with db.SessionLocal() as session:
+        snapshot = build_snapshot(session)
+    write_snapshot(snapshot, path)
+    return snapshot
+
+
+def refresh_snapshot_file() -> StatsSnapshot | None:
+    """Re-export the file at `STATS_SNAPSHOT_PATH`, if set, after stats or stations change."""
+    if not settings.stats_snapshot_path:
+        return None
+    snapshot = export_snapshot(Path(settings.stats_snapshot_path))
+    logging.info(
+        "Stats snapshot version %s written to %s", snapshot.version, settings.stats_snapshot_path
+    )
+    return snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the memory-mapped stats snapshot file.")
+    parser.add_argument(
+        "--output",
+        default=settings.stats_snapshot_path,
+        required=not settings.stats_snapshot_path,
+        help="Snapshot file path (defaults to STATS_SNAPSHOT_PATH)",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    snapshot = export_snapshot(Path(args.output))
+    logging.info(
+        "Stats snapshot version %s written to %s (%s rows)",
+        snapshot.version,
+        args.output,
+        len(snapshot),
+    )
+
+
+if __name__ == "__main__":
+    main()
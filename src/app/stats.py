@@ -2,14 +2,23 @@ from __future__ import annotations
 
 import argparse
 import logging
+from collections.abc import Iterable
 from datetime import datetime, timezone
+from pathlib import Path
 
-from sqlalchemy import Integer, cast, func, select
+from sqlalchemy import Date, Integer, cast, func, select
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
-from app import db
-from app.models import WeatherRecord, WeatherStats
+from app import db, stats_duckdb
+from app.models import WeatherRecord, WeatherStation, WeatherStats, WeatherYearBlock
+from app.packed import PackedYear
+from app.snapshot_file import refresh_snapshot_file
+from app.versions import WEATHER_STATS, publish_version
+
+BUCKETS = ("week", "month", "year")
+STATS_SOURCES = ("records", "packed", "duckdb")
+STATS_UPSERT_BATCH_SIZE = db.sqlite_batch_rows(5)
 
 
 def _year_expression():
@@ -18,6 +27,20 @@ def _year_expression():
     return cast(func.extract("year", WeatherRecord.date), Integer)
 
 
+def bucket_start_expression(bucket: str):
+    """First day of the week (Monday), month or year containing each record."""
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unsupported bucket: {bucket}")
+    if db.engine.dialect.name == "sqlite":
+        modifiers = {
+            "week": ("weekday 0", "-6 days"),
+            "month": ("start of month",),
+            "year": ("start of year",),
+        }[bucket]
+        return func.date(WeatherRecord.date, *modifiers, type_=Date)
+    return cast(func.date_trunc(bucket, WeatherRecord.date), Date)
+
+
 def _upsert_stats_from_select(session, aggregate_select):
     columns = ["station_id", "year", "avg_max_temp_c", "avg_min_temp_c", "total_precip_cm"]
     if db.engine.dialect.name == "sqlite":
@@ -45,34 +68,122 @@ def _upsert_stats_from_select(session, aggregate_select):
     session.execute(stmt)
 
 
-def compute_weather_stats() -> dict[str, int]:
+def _upsert_stats_rows(session, rows: list[dict]) -> None:
+    if not rows:
+        return
+    insert = pg_insert if db.engine.dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(WeatherStats.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["station_id", "year"],
+        set_={
+            "avg_max_temp_c": stmt.excluded.avg_max_temp_c,
+            "avg_min_temp_c": stmt.excluded.avg_min_temp_c,
+            "total_precip_cm": stmt.excluded.total_precip_cm,
+        },
+    )
+    session.execute(stmt)
+
+
+def _packed_stations():
+    return select(WeatherStation.station_id).where(WeatherStation.packed_at.is_not(None))
+
+
+def _packed_stats_rows(session, station_ids: list[str] | None = None):
+    """Yearly stats computed from the packed blocks (see `app.packed`) without row scans.
+
+    Only fully packed stations are covered.
+    """
+    stmt = select(WeatherYearBlock).where(WeatherYearBlock.station_id.in_(_packed_stations()))
+    if station_ids is not None:
+        stmt = stmt.where(WeatherYearBlock.station_id.in_(station_ids))
+    for row in session.execute(stmt).scalars():
+        year = PackedYear.from_row(row)
+        (max_sum, max_count), (min_sum, min_count), (precip_sum, precip_count) = (
+            year.totals(field) for field in range(3)
+        )
+        yield {
+            "station_id": year.station_id,
+            "year": year.year,
+            "avg_max_temp_c": max_sum / max_count / 10.0 if max_count else None,
+            "avg_min_temp_c": min_sum / min_count / 10.0 if min_count else None,
+            "total_precip_cm": precip_sum / 100.0 if precip_count else None,
+        }
+
+
+def _upsert_stats_batches(session, rows) -> int:
+    total_rows = 0
+    pending: list[dict] = []
+    for row in rows:
+        pending.append(row)
+        if len(pending) >= STATS_UPSERT_BATCH_SIZE:
+            _upsert_stats_rows(session, pending)
+            total_rows += len(pending)
+            pending = []
+    _upsert_stats_rows(session, pending)
+    return total_rows + len(pending)
+
+
+def compute_weather_stats(
+    source: str = "records",
+    parquet: Path | None = None,
+    station_ids: Iterable[str] | None = None,
+) -> dict[str, int]:
+    """Recompute `weather_stats` from curated rows, from packed blocks (`source="packed"`),
+    or in embedded DuckDB (`source="duckdb"`, see `app.stats_duckdb`), optionally over a
+    Parquet export instead of the attached database. `station_ids` limits the recompute
+    to those stations' rows."""
+    if source not in STATS_SOURCES:
+        raise ValueError(f"Unsupported stats source: {source}")
+    if station_ids is not None:
+        station_ids = sorted(set(station_ids))
     session = db.SessionLocal()
     try:
         start = datetime.now(timezone.utc)
         logging.info("Weather stats computation started at %s", start.isoformat())
 
-        year_expr = _year_expression().label("year")
-        aggregate_stmt = (
-            select(
-                WeatherRecord.station_id.label("station_id"),
-                year_expr,
-                (func.avg(WeatherRecord.max_temp_tenths_c) / 10.0).label("avg_max_temp_c"),
-                (func.avg(WeatherRecord.min_temp_tenths_c) / 10.0).label("avg_min_temp_c"),
-                (func.sum(WeatherRecord.precip_tenths_mm) / 100.0).label("total_precip_cm"),
+        if source == "duckdb":
+            total_rows = _upsert_stats_batches(
+                session, stats_duckdb.yearly_stats_rows(parquet, station_ids)
             )
-            .group_by(WeatherRecord.station_id, year_expr)
-            .order_by(WeatherRecord.station_id, year_expr)
-        )
-
-        count_stmt = select(func.count()).select_from(aggregate_stmt.subquery())
-        total_rows = session.execute(count_stmt).scalar_one()
-
-        _upsert_stats_from_select(session, aggregate_stmt)
+        else:
+            total_rows = 0
+            if source == "packed":
+                total_rows = _upsert_stats_batches(
+                    session, _packed_stats_rows(session, station_ids)
+                )
+            year_expr = _year_expression().label("year")
+            aggregate_stmt = (
+                select(
+                    WeatherRecord.station_id.label("station_id"),
+                    year_expr,
+                    (func.avg(WeatherRecord.max_temp_tenths_c) / 10.0).label("avg_max_temp_c"),
+                    (func.avg(WeatherRecord.min_temp_tenths_c) / 10.0).label("avg_min_temp_c"),
+                    (func.sum(WeatherRecord.precip_tenths_mm) / 100.0).label("total_precip_cm"),
+                )
+                .group_by(WeatherRecord.station_id, year_expr)
+                .order_by(WeatherRecord.station_id, year_expr)
+            )
+            if station_ids is not None:
+                aggregate_stmt = aggregate_stmt.where(WeatherRecord.station_id.in_(station_ids))
+            if source == "packed":
+                # Stations without a complete set of blocks are aggregated from rows.
+                aggregate_stmt = aggregate_stmt.where(
+                    WeatherRecord.station_id.not_in(_packed_stations())
+                )
+
+            count_stmt = select(func.count()).select_from(aggregate_stmt.subquery())
+            total_rows += session.execute(count_stmt).scalar_one()
+
+            _upsert_stats_from_select(session, aggregate_stmt)
+        version = publish_version(session, WEATHER_STATS)
         session.commit()
 
         end = datetime.now(timezone.utc)
         logging.info("Weather stats computation finished at %s", end.isoformat())
         logging.info("Weather stats rows upserted: %s", total_rows)
+        logging.info("Weather stats version published: %s", version)
+
+        refresh_snapshot_file()
 
         return {"upserted": total_rows}
     finally:
@@ -81,10 +192,22 @@ def compute_weather_stats() -> dict[str, int]:
 
 def main():
     parser = argparse.ArgumentParser(description="Compute and store weather statistics.")
-    _ = parser.parse_args()
+    parser.add_argument(
+        "--source",
+        choices=STATS_SOURCES,
+        default="records",
+        help="Aggregate curated rows, the packed per-station-year blocks, or rows in DuckDB",
+    )
+    parser.add_argument(
+        "--parquet",
+        type=Path,
+        help="With --source duckdb, read this Parquet export instead of the database",
+    )
+    parser.add_argument("--stations", nargs="+", help="Only recompute these stations")
+    args = parser.parse_args()
 
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
-    compute_weather_stats()
+    compute_weather_stats(source=args.source, parquet=args.parquet, station_ids=args.stations)
 
 
 if __name__ == "__main__":
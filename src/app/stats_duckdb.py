@@ -0,0 +1,201 @@
+"""Weather stats aggregated in embedded DuckDB (optional: `pip install duckdb`).
+
+DuckDB either attaches the application database read-only through its `sqlite` or
+`postgres` extension, or reads a Parquet export of the curated rows
+(`python -m app.stats_duckdb export`). Either way it scans `weather_records` column-wise
+in-process, so no server or extra service is involved. The extensions are downloaded
+from DuckDB's extension repository on first use; when that is not possible, rows are
+streamed into DuckDB instead.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+
+from app import db, query
+from app.utils import optional_import
+
+FETCH_SIZE = 10000
+
+RECORDS_COLUMNS = "station_id, date, max_temp_tenths_c, min_temp_tenths_c, precip_tenths_mm"
+CSV_COLUMNS = (
+    "{'station_id': 'VARCHAR', 'date': 'DATE', 'max_temp_tenths_c': 'INTEGER', "
+    "'min_temp_tenths_c': 'INTEGER', 'precip_tenths_mm': 'INTEGER'}"
+)
+
+DAILY_SQL = """
+    SELECT
+      station_id,
+      CAST(year(CAST(date AS DATE)) AS INTEGER) AS year,
+      max_temp_tenths_c,
+      min_temp_tenths_c,
+      precip_tenths_mm
+    FROM weather_records
+"""
+
+# Same aggregates as the SQL path in `app.stats.compute_weather_stats`.
+YEARLY_SQL = f"""
+    SELECT
+      station_id,
+      year,
+      avg(max_temp_tenths_c) / 10 AS avg_max_temp_c,
+      avg(min_temp_tenths_c) / 10 AS avg_min_temp_c,
+      CAST(sum(precip_tenths_mm) AS DOUBLE) / 100 AS total_precip_cm
+    FROM ({DAILY_SQL}) AS daily
+    GROUP BY station_id, year
+    ORDER BY station_id, year
+"""
+
+STATION_YEARLY_SQL = f"""
+    SELECT * FROM ({YEARLY_SQL}) AS yearly
+    WHERE list_contains(?, station_id)
+    ORDER BY station_id, year
+"""
+
+# Station totals over all years and the overall total, next to each station-year.
+ROLLUP_SQL = f"""
+    SELECT
+      station_id,
+      year,
+      count(*) AS days,
+      avg(max_temp_tenths_c) / 10 AS avg_max_temp_c,
+      avg(min_temp_tenths_c) / 10 AS avg_min_temp_c,
+      CAST(sum(precip_tenths_mm) AS DOUBLE) / 100 AS total_precip_cm
+    FROM ({DAILY_SQL}) AS daily
+    GROUP BY ROLLUP (station_id, year)
+    ORDER BY station_id NULLS LAST, year NULLS LAST
+"""
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _attach(con) -> str:
+    url = db.engine.url
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        if not url.database or url.database == ":memory:":
+            raise ValueError("DuckDB can only attach a file-backed SQLite database.")
+        con.execute(f"ATTACH {_quote(url.database)} AS src (TYPE sqlite, READ_ONLY)")
+        return "src.weather_records"
+    if backend == "postgresql":
+        dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        con.execute(f"ATTACH {_quote(dsn)} AS src (TYPE postgres, READ_ONLY)")
+        return "src.public.weather_records"
+    raise ValueError(f"DuckDB cannot attach a {backend} database.")
+
+
+def _stage_csv(con) -> str:
+    """Copy the curated rows into DuckDB through a temporary CSV file."""
+    fd, name = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(RECORDS_COLUMNS.split(", "))
+            for chunk in query.iter_weather_chunks(kind="lists", raw=True):
+                writer.writerows(zip(*chunk.values(), strict=True))
+        con.execute(
+            f"CREATE TABLE staged_records AS SELECT * FROM read_csv({_quote(name)}, "
+            f"header = true, columns = {CSV_COLUMNS})"
+        )
+    finally:
+        os.unlink(name)
+    return "staged_records"
+
+
+def connect(parquet: Path | None = None):
+    """In-memory DuckDB with a `weather_records` view over `parquet` or the app database.
+
+    Without the sqlite/postgres extension (e.g. offline), rows are streamed out of the
+    database into DuckDB instead, which is slower but needs nothing beyond DuckDB itself.
+    """
+    duckdb = optional_import("duckdb")
+    con = duckdb.connect()
+    if parquet is not None:
+        source = f"read_parquet({_quote(str(parquet))})"
+    else:
+        try:
+            source = _attach(con)
+        except duckdb.IOException as exc:
+            logging.warning("DuckDB cannot attach the database (%s); staging rows instead.", exc)
+            source = _stage_csv(con)
+    con.execute(f"CREATE VIEW weather_records AS SELECT {RECORDS_COLUMNS} FROM {source}")
+    return con
+
+
+def _rows(cursor) -> Iterator[dict]:
+    names = [column[0] for column in cursor.description]
+    while True:
+        batch = cursor.fetchmany(FETCH_SIZE)
+        if not batch:
+            return
+        for values in batch:
+            yield dict(zip(names, values, strict=True))
+
+
+def yearly_stats_rows(
+    parquet: Path | None = None, station_ids: list[str] | None = None
+) -> Iterator[dict]:
+    """`weather_stats` rows (station, year, averages, total precipitation) from DuckDB."""
+    con = connect(parquet)
+    try:
+        if station_ids is None:
+            yield from _rows(con.execute(YEARLY_SQL))
+        else:
+            yield from _rows(con.execute(STATION_YEARLY_SQL, [station_ids]))
+    finally:
+        con.close()
+
+
+def rollups(parquet: Path | None = None) -> list[dict]:
+    """Per station-year, per station (`year` None) and overall (both None) aggregates."""
+    con = connect(parquet)
+    try:
+        return list(_rows(con.execute(ROLLUP_SQL)))
+    finally:
+        con.close()
+
+
+def export_parquet(output: Path) -> Path:
+    """Write the curated rows to a Parquet file, ordered by station and date."""
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(f".{output.name}.tmp")
+    con = connect()
+    try:
+        con.execute(
+            f"COPY (SELECT * FROM weather_records ORDER BY station_id, date) "
+            f"TO {_quote(str(tmp))} (FORMAT parquet)"
+        )
+    finally:
+        con.close()
+    tmp.replace(output)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DuckDB exports and rollups of weather data.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Write weather_records to Parquet")
+    export_parser.add_argument("--output", type=Path, default=Path("data/weather_records.parquet"))
+    rollup_parser = commands.add_parser("rollups", help="Print station and overall rollups")
+    rollup_parser.add_argument("--parquet", type=Path, help="Read this export instead")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.command == "export":
+        logging.info("Weather records exported to %s", export_parquet(args.output))
+    else:
+        for row in rollups(args.parquet):
+            print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+
+from sqlalchemy import select
+
+from app import db
+from app.config import settings
+from app.models import WeatherStats
+from app.versions import WEATHER_STATS, current_version
+
+VALUE_COLUMNS = ("avg_max_temp_c", "avg_min_temp_c", "total_precip_cm")
+
+
+def _nullable(value: float) -> float | None:
+    return None if math.isnan(value) else value
+
+
+@dataclass(frozen=True)
+class StatsSnapshot:
+    """Immutable column-oriented copy of `weather_stats`, ordered by (station_id, year).
+
+    Rows for `station_ids[i]` live at `[station_offsets[i], station_offsets[i + 1])`;
+    missing values are stored as NaN.
+    """
+
+    version: int | None
+    station_index: Mapping[str, int]
+    station_ids: Sequence[str]
+    station_offsets: Sequence[int]
+    years: Sequence[int]
+    avg_max_temp_c: Sequence[float]
+    avg_min_temp_c: Sequence[float]
+    total_precip_cm: Sequence[float]
+
+    @classmethod
+    def from_rows(cls, version: int | None, rows) -> StatsSnapshot:
+        station_ids: list[str] = []
+        station_offsets = array("q")
+        years = array("i")
+        columns = {name: array("d") for name in VALUE_COLUMNS}
+        for index, row in enumerate(rows):
+            if not station_ids or station_ids[-1] != row.station_id:
+                station_ids.append(row.station_id)
+                station_offsets.append(index)
+            years.append(row.year)
+            for name in VALUE_COLUMNS:
+                value = getattr(row, name)
+                columns[name].append(math.nan if value is None else value)
+        station_offsets.append(len(years))
+        return cls(
+            version,
+            {station: index for index, station in enumerate(station_ids)},
+            tuple(station_ids),
+            station_offsets,
+            years,
+            **columns,
+        )
+
+    def __len__(self) -> int:
+        return len(self.years)
+
+    def _ranges(self, station_id: str | None, year_start: int | None, year_end: int | None):
+        if station_id is None:
+            stations = range(len(self.station_ids))
+        else:
+            index = self.station_index.get(station_id)
+            stations = [] if index is None else [index]
+
+        for index in stations:
+            lo = self.station_offsets[index]
+            hi = self.station_offsets[index + 1]
+            if year_start is not None:
+                lo = bisect_left(self.years, year_start, lo, hi)
+            if year_end is not None:
+                hi = bisect_right(self.years, year_end, lo, hi)
+            if lo < hi:
+                yield index, lo, hi
+
+    def query(
+        self,
+        station_id: str | None = None,
+        year_start: int | None = None,
+        year_end: int | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> tuple[int, list[dict]]:
+        """Return `(total, rows)` for the filtered, paginated slice."""
+        ranges = list(self._ranges(station_id, year_start, year_end))
+        total = sum(hi - lo for _index, lo, hi in ranges)
+
+        data = []
+        remaining = total if limit is None else limit
+        for index, lo, hi in ranges:
+            if remaining <= 0:
+                break
+            if offset >= hi - lo:
+                offset -= hi - lo
+                continue
+            start = lo + offset
+            stop = min(hi, start + remaining)
+            offset = 0
+            remaining -= stop - start
+            station = self.station_ids[index]
+            for row in range(start, stop):
+                data.append(
+                    {
+                        "station_id": station,
+                        "year": self.years[row],
+                        "avg_max_temp_c": _nullable(self.avg_max_temp_c[row]),
+                        "avg_min_temp_c": _nullable(self.avg_min_temp_c[row]),
+                        "total_precip_cm": _nullable(self.total_precip_cm[row]),
+                    }
+                )
+        return total, data
+
+
+def load_snapshot(session) -> StatsSnapshot:
+    version = current_version(session, WEATHER_STATS)
+    rows = session.execute(
+        select(
+            WeatherStats.station_id,
+            WeatherStats.year,
+            WeatherStats.avg_max_temp_c,
+            WeatherStats.avg_min_temp_c,
+            WeatherStats.total_precip_cm,
+        ).order_by(WeatherStats.station_id, WeatherStats.year)
+    )
+    return StatsSnapshot.from_rows(version, rows)
+
+
+class StatsSnapshotStore:
+    """Holds the current snapshot and swaps in a new one when the stats version changes.
+
+    The database is consulted at most once per `refresh_seconds` (a primary-key
+    lookup of the published version); requests in between never touch it.
+    """
+
+    def __init__(self, refresh_seconds: float | None = None):
+        self.refresh_seconds = (
+            refresh_seconds
+            if refresh_seconds is not None
+            else settings.stats_snapshot_refresh_seconds
+        )
+        self._snapshot: StatsSnapshot | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> StatsSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.refresh_seconds:
+            return snapshot
+
+        with self._lock:
+            if (
+                self._snapshot is not None
+                and time.monotonic() - self._checked_at < self.refresh_seconds
+            ):
+                return self._snapshot
+            with db.ReadSessionLocal() as session:
+                version = current_version(session, WEATHER_STATS)
+                if self._snapshot is None or self._snapshot.version != version:
+                    self._snapshot = load_snapshot(session)
+            self._checked_at = time.monotonic()
+            return self._snapshot
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+import importlib
 from datetime import date
 
+# What column readers can return: a dict of lists, a dict of NumPy arrays or a DataFrame.
+COLUMN_KINDS = ("lists", "numpy", "pandas")
+
 
 def clamp_page_size(page_size: int, max_size: int) -> int:
     if page_size <= 0:
@@ -24,3 +28,16 @@ def to_cm_from_tenths_mm(value_tenths_mm: int | None) -> float | None:
 def ensure_date_range(date_value: date | None, start: date | None, end: date | None):
     if date_value and (start or end):
         raise ValueError("Use either date or start_date/end_date, not both.")
+
+
+def optional_import(module: str):
+    """Import an optional dependency, with an install hint if it is missing."""
+    try:
+        return importlib.import_module(module)
+    except ImportError as exc:
+        raise ImportError(f"{module} is not installed; pip install {module}") from exc
+
+
+def check_column_kind(kind: str, kinds: tuple[str, ...] = COLUMN_KINDS) -> None:
+    if kind not in kinds:
+        raise ValueError(f"kind must be one of {', '.join(kinds)}")
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app import db
+from app.models import DatasetVersion
+
+WEATHER_STATS = "weather_stats"
+WEATHER_RECORDS = "weather_records"
+
+
+def current_version(session, name: str) -> int | None:
+    return session.execute(
+        select(DatasetVersion.version).where(DatasetVersion.name == name)
+    ).scalar_one_or_none()
+
+
+def publish_version(session, name: str) -> int:
+    """Bump a dataset's version in the caller's transaction and return the new value.
+
+    A single upsert, so concurrent first publishers of a dataset cannot collide.
+    """
+    insert = pg_insert if db.engine.dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(DatasetVersion.__table__).values(
+        name=name, version=1, updated_at=datetime.now(timezone.utc)
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["name"],
+        set_={"version": DatasetVersion.version + 1, "updated_at": stmt.excluded.updated_at},
+    )
+    return session.execute(stmt.returning(DatasetVersion.version)).scalar_one()
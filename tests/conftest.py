@@ -1,16 +1,27 @@
 from __future__ import annotations
 
+import dataclasses
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app import db
+from app import db, main, snapshot_file
 from app.db import Base
 from app.main import create_app
 
 
+@pytest.fixture(autouse=True)
+def no_snapshot_file(monkeypatch):
+    """Never read or rewrite a snapshot file named in the developer's environment."""
+    for module in (main, snapshot_file):
+        monkeypatch.setattr(
+            module, "settings", dataclasses.replace(module.settings, stats_snapshot_path=None)
+        )
+
+
 @pytest.fixture()
 def test_engine():
     engine = create_engine(
@@ -20,8 +31,11 @@ def test_engine():
         future=True,
     )
     db.engine = engine
+    db.read_engine = engine
     db.SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    db.ReadSessionLocal = db.SessionLocal
     db.enable_sqlite_foreign_keys(engine)
+    db.instrument_engine(engine)
     Base.metadata.create_all(bind=engine)
     yield engine
     Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.admission import RouteLimiter, estimate_weather_cost
+from app.config import settings
+
+
+def test_estimate_weather_cost_scales_with_filters():
+    narrow = estimate_weather_cost(
+        {"station_id": "STATION1", "start_date": "2001-01-01", "end_date": "2001-12-31"}
+    )
+    assert narrow == 365
+    unfiltered = estimate_weather_cost({})
+    assert unfiltered >= settings.admission_heavy_cost
+    deep = estimate_weather_cost({"station_id": "STATION1", "page": "11", "page_size": "100"})
+    assert deep == estimate_weather_cost({"station_id": "STATION1"}) + 1000
+
+
+def test_route_limiter_queues_then_sheds():
+    async def scenario():
+        limiter = RouteLimiter(max_concurrent=1, max_queue=1, queue_timeout=0.05)
+        assert await limiter.acquire()
+
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        # Queue is full, so the next request is rejected immediately.
+        assert not await limiter.acquire()
+
+        limiter.release()
+        assert await queued
+        assert limiter.active == 1
+
+        # Nobody releases this time, so the queued request times out.
+        assert not await limiter.acquire()
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_heavy_weather_query_is_shed_when_saturated(client, test_engine):
+    limiter = client.app.state.admission.limiters["/api/weather"]
+    limiter.max_queue = 0
+    limiter.active = limiter.max_concurrent
+
+    response = client.get("/api/weather")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(settings.admission_retry_after)
+
+    # Station-scoped queries are cheap and bypass the limiter.
+    response = client.get("/api/weather", params={"station_id": "STATION1"})
+    assert response.status_code == 200
+
+    limiter.active = 0
+    assert client.get("/api/weather").status_code == 200
+    assert limiter.active == 0
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from datetime import date
+
+from app import db
+from app.models import WeatherRecord, WeatherStation
+from app.versions import WEATHER_RECORDS, publish_version
+
+
+def _seed_records():
+    with db.SessionLocal() as session:
+        session.add(WeatherStation(station_id="STATION1"))
+        session.add_all(
+            [
+                # 2001-01-01 is a Monday; 2001-01-07 a Sunday.
+                WeatherRecord(
+                    station_id="STATION1",
+                    date=date(2001, 1, 1),
+                    max_temp_tenths_c=100,
+                    min_temp_tenths_c=0,
+                    precip_tenths_mm=100,
+                ),
+                WeatherRecord(
+                    station_id="STATION1",
+                    date=date(2001, 1, 7),
+                    max_temp_tenths_c=200,
+                    min_temp_tenths_c=None,
+                    precip_tenths_mm=50,
+                ),
+                WeatherRecord(
+                    station_id="STATION1",
+                    date=date(2001, 2, 1),
+                    max_temp_tenths_c=300,
+                    min_temp_tenths_c=10,
+                    precip_tenths_mm=None,
+                ),
+            ]
+        )
+        session.commit()
+
+
+def test_aggregate_endpoint_buckets(client, test_engine):
+    _seed_records()
+
+    response = client.get("/api/weather/aggregate", params={"bucket": "week"})
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["total"] == 2
+    assert payload["data"][0] == {
+        "station_id": "STATION1",
+        "bucket_start": "2001-01-01",
+        "days": 2,
+        "avg_max_temp_c": 15.0,
+        "avg_min_temp_c": 0.0,
+        "total_precip_cm": 1.5,
+    }
+    assert payload["data"][1]["bucket_start"] == "2001-01-29"
+
+    response = client.get(
+        "/api/weather/aggregate",
+        params={"bucket": "month", "station_id": "STATION1", "end_date": "2001-01-31"},
+    )
+    payload = response.json()
+    assert payload["total"] == 1
+    assert payload["data"][0]["bucket_start"] == "2001-01-01"
+
+    response = client.get("/api/weather/aggregate", params={"bucket": "year"})
+    assert response.json()["data"][0]["days"] == 3
+
+
+def test_aggregate_endpoint_cache_tracks_records_version(client, test_engine):
+    _seed_records()
+    params = {"bucket": "year"}
+    assert client.get("/api/weather/aggregate", params=params).json()["data"][0]["days"] == 3
+
+    with db.SessionLocal() as session:
+        session.add(
+            WeatherRecord(station_id="STATION1", date=date(2001, 3, 1), max_temp_tenths_c=1)
+        )
+        session.commit()
+
+    # Same data version, so the cached result is served.
+    assert client.get("/api/weather/aggregate", params=params).json()["data"][0]["days"] == 3
+
+    with db.SessionLocal() as session:
+        publish_version(session, WEATHER_RECORDS)
+        session.commit()
+
+    assert client.get("/api/weather/aggregate", params=params).json()["data"][0]["days"] == 4
+
+
+def test_aggregate_endpoint_rejects_unknown_bucket(client, test_engine):
+    response = client.get("/api/weather/aggregate", params={"bucket": "day"})
+    assert response.status_code == 422
@@ -104,3 +104,88 @@ def test_stats_endpoint_invalid_year_range(client, test_engine):
         params={"year": 2000, "year_start": 1999},
     )
     assert response.status_code == 400
+
+
+def test_weather_endpoint_payload_matches_schema(client, test_engine):
+    with db.SessionLocal() as session:
+        session.add(WeatherStation(station_id="STATION1"))
+        session.add(
+            WeatherRecord(
+                station_id="STATION1",
+                date=date(2001, 1, 1),
+                max_temp_tenths_c=-15,
+                min_temp_tenths_c=None,
+                precip_tenths_mm=7,
+            )
+        )
+        session.commit()
+
+    response = client.get("/api/weather", params={"station_id": "STATION1"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {
+        "data": [
+            {
+                "station_id": "STATION1",
+                "date": "2001-01-01",
+                "max_temp_c": -1.5,
+                "min_temp_c": None,
+                "precip_cm": 0.07,
+            }
+        ],
+        "page": 1,
+        "page_size": 100,
+        "total": 1,
+    }
+
+    schema = client.get("/openapi.json").json()
+    response_schema = schema["paths"]["/api/weather"]["get"]["responses"]["200"]
+    assert response_schema["content"]["application/json"]["schema"] == {
+        "$ref": "#/components/schemas/PaginatedWeatherResponse"
+    }
+
+
+def test_weather_batch_endpoint_groups_and_cursors(client, test_engine):
+    with db.SessionLocal() as session:
+        session.add_all(
+            [WeatherStation(station_id="STATION1"), WeatherStation(station_id="STATION2")]
+        )
+        session.add_all(
+            [
+                WeatherRecord(
+                    station_id=station_id,
+                    date=date(2001, 1, day),
+                    max_temp_tenths_c=day * 10,
+                    min_temp_tenths_c=0,
+                    precip_tenths_mm=None,
+                )
+                for station_id in ("STATION1", "STATION2")
+                for day in (1, 2, 3)
+            ]
+        )
+        session.commit()
+
+    body = {
+        "station_ids": ["STATION1", "STATION2", "MISSING"],
+        "start_date": "2001-01-02",
+        "page_size": 1,
+    }
+    response = client.post("/api/weather/batch", json=body)
+    assert response.status_code == 200
+    pages = {page["station_id"]: page for page in response.json()["data"]}
+    assert [row["date"] for row in pages["STATION1"]["data"]] == ["2001-01-02"]
+    assert pages["STATION1"]["next_cursor"] == "2001-01-02"
+    assert pages["STATION2"]["data"][0]["max_temp_c"] == 2.0
+    assert pages["MISSING"] == {"station_id": "MISSING", "data": [], "next_cursor": None}
+
+    body["cursors"] = {"STATION1": pages["STATION1"]["next_cursor"]}
+    response = client.post("/api/weather/batch", json=body)
+    pages = {page["station_id"]: page for page in response.json()["data"]}
+    assert [row["date"] for row in pages["STATION1"]["data"]] == ["2001-01-03"]
+    assert pages["STATION1"]["next_cursor"] is None
+    assert [row["date"] for row in pages["STATION2"]["data"]] == ["2001-01-02"]
+
+
+def test_weather_batch_endpoint_rejects_empty_station_list(client, test_engine):
+    response = client.post("/api/weather/batch", json={"station_ids": []})
+    assert response.status_code == 422
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import os
+from datetime import date, datetime, timezone
+
+from sqlalchemy import func, select, update
+
+from app import db
+from app.archive import archive_raw, restore_raw
+from app.ingest.weather import ingest_weather
+from app.models import (
+    IngestionRun,
+    WeatherRecord,
+    WeatherRecordRaw,
+    WeatherStation,
+)
+
+
+def _raw_ids():
+    with db.SessionLocal() as session:
+        return set(session.execute(select(WeatherRecordRaw.id)).scalars())
+
+
+def test_archive_moves_superseded_raw_rows_and_restores_them(test_engine, tmp_path):
+    data_dir = tmp_path / "wx"
+    data_dir.mkdir()
+    station_file = data_dir / "STATION1.txt"
+    station_file.write_text("19850101\t10\t-20\t30\n19860101\t1\t2\t3\n", encoding="utf-8")
+    ingest_weather(data_dir)
+    station_file.write_text("19850101\t11\t-21\t31\n", encoding="utf-8")
+    ingest_weather(data_dir)
+
+    before = _raw_ids()
+    with db.SessionLocal() as session:
+        curated = session.get(WeatherRecord, {"station_id": "STATION1", "date": date(1985, 1, 1)})
+        superseded = before - {curated.max_temp_raw_id}
+        assert curated.max_temp_tenths_c == 11
+    assert len(before) == 3
+
+    archive_dir = tmp_path / "archive"
+    assert archive_raw(keep_runs=1, archive_dir=archive_dir) == {1985: 1}
+    # The 1986 row is still the curated source, so it stays.
+    after = _raw_ids()
+    assert len(after) == 2
+    assert before - after <= superseded
+    assert [path.name.split("_")[3] for path in archive_dir.iterdir()] == ["1985"]
+
+    assert archive_raw(keep_runs=1, archive_dir=archive_dir) == {}
+
+    assert restore_raw(archive_dir, year=1985) == 1
+    assert _raw_ids() == before
+    assert restore_raw(archive_dir) == 0
+    with db.SessionLocal() as session:
+        total = session.execute(select(func.count()).select_from(WeatherRecordRaw)).scalar_one()
+    assert total == 3
+
+
+def test_archive_deletes_only_rows_it_wrote(test_engine, tmp_path, monkeypatch):
+    now = datetime.now(timezone.utc)
+    with db.SessionLocal() as session:
+        session.add(WeatherStation(station_id="STATION1"))
+        session.add_all(
+            IngestionRun(id=run_id, dataset="weather", started_at=now) for run_id in (1, 2)
+        )
+        session.flush()
+        for raw_id, run_id, day in ((1, 1, 1), (2, 1, 2), (3, 2, 2), (4, 2, 1)):
+            session.add(
+                WeatherRecordRaw(
+                    id=raw_id,
+                    station_id="STATION1",
+                    date=date(1990, 1, day),
+                    max_temp_tenths_c=raw_id,
+                    source_file="STATION1.txt",
+                    source_line=raw_id,
+                    ingested_at=now,
+                    ingestion_run_id=run_id,
+                    row_hash=str(raw_id),
+                )
+            )
+        # Raw row 1 is still the curated source of Jan 1; row 2 has been superseded.
+        session.add(WeatherRecord(station_id="STATION1", date=date(1990, 1, 1), max_temp_raw_id=1))
+        session.add(WeatherRecord(station_id="STATION1", date=date(1990, 1, 2), max_temp_raw_id=3))
+        session.commit()
+
+    real_replace = os.replace
+
+    def replace_then_merge(src, dst):
+        real_replace(src, dst)
+        # A merge between the archive write and the delete supersedes row 1.
+        with db.SessionLocal() as session:
+            session.execute(
+                update(WeatherRecord)
+                .where(WeatherRecord.date == date(1990, 1, 1))
+                .values(max_temp_raw_id=4)
+            )
+            session.commit()
+
+    monkeypatch.setattr("app.archive.os.replace", replace_then_merge)
+    archive_dir = tmp_path / "archive"
+    assert archive_raw(keep_runs=1, archive_dir=archive_dir) == {1990: 1}
+
+    (path,) = archive_dir.iterdir()
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as stream:
+        assert [row["id"] for row in csv.DictReader(stream)] == ["2"]
+    # Row 1 was never written, so it must still be in the table.
+    assert _raw_ids() == {1, 3, 4}
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine, select, text
+
+from migration_helpers import Backfill, checkpoints, python_chunk, sql_chunk
+
+UPDATE_SQL = "UPDATE items SET doubled = value * 2 WHERE id > :lo AND id <= :hi AND doubled IS NULL"
+
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'backfill.db'}", future=True)
+    with engine.begin() as conn:
+        conn.execute(
+            text("CREATE TABLE items (id INTEGER PRIMARY KEY, value INTEGER, doubled INTEGER)")
+        )
+        conn.execute(
+            text("INSERT INTO items (id, value) VALUES (:id, :value)"),
+            [{"id": i, "value": i} for i in range(1, 26)],
+        )
+        # Created by migration 0006 in a real database.
+        checkpoints.create(conn)
+    yield engine
+    engine.dispose()
+
+
+def _doubled(engine):
+    with engine.connect() as conn:
+        return [row.doubled for row in conn.execute(text("SELECT doubled FROM items ORDER BY id"))]
+
+
+def test_backfill_resumes_from_checkpoint(engine):
+    step = sql_chunk(UPDATE_SQL)
+
+    def failing_step(conn, lo, hi):
+        if lo == 10:
+            raise RuntimeError("boom")
+        return step(conn, lo, hi)
+
+    with engine.connect() as conn:
+        with pytest.raises(RuntimeError):
+            Backfill(conn, "double", "items", chunk_size=10).run(failing_step)
+        conn.rollback()
+        state = conn.execute(select(checkpoints)).one()
+        assert (state.last_id, state.max_id, state.rows, state.finished_at) == (10, 25, 10, None)
+
+        assert _doubled(engine)[10:] == [None] * 15
+
+        assert Backfill(conn, "double", "items", chunk_size=10).run(step) == 15
+        state = conn.execute(select(checkpoints)).one()
+        assert (state.last_id, state.rows) == (25, 25)
+        assert state.finished_at is not None
+    assert _doubled(engine) == [i * 2 for i in range(1, 26)]
+
+
+def test_backfill_completes_and_is_idempotent(engine):
+    compute = python_chunk(
+        "SELECT id, value FROM items WHERE id > :lo AND id <= :hi AND doubled IS NULL",
+        lambda row: {"id": row.id, "doubled": row.value * 2},
+        "UPDATE items SET doubled = :doubled WHERE id = :id",
+    )
+    with engine.connect() as conn:
+        assert Backfill(conn, "double", "items", chunk_size=7).run(compute) == 25
+        assert Backfill(conn, "double", "items", chunk_size=7).run(compute) == 0
+        state = conn.execute(select(checkpoints)).one()
+        assert state.last_id == 25
+        assert state.finished_at is not None
+    assert _doubled(engine) == [i * 2 for i in range(1, 26)]
+
+
+def test_backfill_parallel_workers(engine):
+    with engine.connect() as conn:
+        rows = Backfill(conn, "double", "items", chunk_size=4, workers=3).run(sql_chunk(UPDATE_SQL))
+    assert rows == 25
+    assert _doubled(engine) == [i * 2 for i in range(1, 26)]
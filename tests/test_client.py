@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pytest
+
+from app import db
+from app.client import WeatherClient, to_columns
+from app.models import CropYield, WeatherRecord, WeatherStation
+
+
+@pytest.fixture()
+def weather_rows(test_engine):
+    start = date(2001, 1, 1)
+    with db.SessionLocal() as session:
+        for station in ("STATION1", "STATION2", "STATION3"):
+            session.add(WeatherStation(station_id=station))
+            session.add_all(
+                WeatherRecord(
+                    station_id=station,
+                    date=start + timedelta(days=offset),
+                    max_temp_tenths_c=offset,
+                    min_temp_tenths_c=None if offset % 4 == 0 else -offset,
+                    precip_tenths_mm=10,
+                )
+                for offset in range(25)
+            )
+        session.add_all(CropYield(year=year, yield_value=year) for year in range(1990, 2001))
+        session.commit()
+
+
+def test_iter_weather_pages_in_parallel(client, weather_rows):
+    with WeatherClient(http=client, page_size=7, max_workers=3) as api:
+        rows = list(api.iter_weather(start_date=date(2001, 1, 1)))
+        station_rows = list(api.iter_weather(station_id="STATION2", end_date=date(2001, 1, 10)))
+        yields = list(api.iter_yield(year_start=1995))
+
+    assert len(rows) == 75
+    assert [(row["station_id"], row["date"]) for row in rows] == sorted(
+        (row["station_id"], row["date"]) for row in rows
+    )
+    assert len(station_rows) == 10
+    assert {row["station_id"] for row in station_rows} == {"STATION2"}
+    assert [row["year"] for row in yields] == list(range(1995, 2001))
+
+
+def test_weather_by_station_follows_cursors(client, weather_rows):
+    with WeatherClient(http=client, page_size=10, max_workers=2) as api:
+        by_station = api.weather_by_station(["STATION3", "STATION1", "MISSING"])
+
+    assert list(by_station) == ["STATION3", "STATION1", "MISSING"]
+    assert len(by_station["STATION1"]) == 25
+    assert by_station["STATION3"][-1]["date"] == "2001-01-25"
+    assert by_station["MISSING"] == []
+
+
+def test_columns(client, weather_rows):
+    with WeatherClient(http=client, page_size=50) as api:
+        columns = api.weather_columns(station_id="STATION1")
+    assert columns["max_temp_c"][:3] == [0.0, 0.1, 0.2]
+    assert columns["min_temp_c"][0] is None
+    assert to_columns([]) == {}
+    with pytest.raises(ValueError):
+        to_columns([], kind="arrow")
+
+
+def test_numpy_columns(client, weather_rows):
+    np = pytest.importorskip("numpy")
+    with WeatherClient(http=client, page_size=50) as api:
+        columns = api.weather_columns(kind="numpy", station_id="STATION1")
+    assert columns["date"].dtype == np.dtype("datetime64[D]")
+    assert columns["min_temp_c"].dtype == np.float64
+    assert np.isnan(columns["min_temp_c"][0])
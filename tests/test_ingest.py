@@ -1,12 +1,26 @@
 from __future__ import annotations
 
-from datetime import date
+import threading
+import time
+from datetime import date, datetime, timezone
 
-from sqlalchemy import func, select
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
 
 from app import db
+from app.db import Base
+from app.ingest.events import EventSink
+from app.ingest.locks import StationLocks
 from app.ingest.weather import ingest_weather
-from app.models import IngestionEvent, WeatherConflict, WeatherRecord, WeatherRecordRaw
+from app.models import (
+    IngestionEvent,
+    IngestionRun,
+    WeatherConflict,
+    WeatherRecord,
+    WeatherRecordRaw,
+)
+from app.versions import WEATHER_RECORDS, current_version
 
 
 def test_weather_ingest_idempotent(test_engine, tmp_path):
@@ -40,6 +54,7 @@ def test_weather_ingest_idempotent(test_engine, tmp_path):
         assert conflicts == 1
         events = session.execute(select(func.count()).select_from(IngestionEvent)).scalar_one()
         assert events >= 1
+        assert current_version(session, WEATHER_RECORDS) == 1
 
     ingest_weather(tmp_path, batch_size=1)
 
@@ -52,3 +67,174 @@ def test_weather_ingest_idempotent(test_engine, tmp_path):
         assert curated_count == 2
         conflicts = session.execute(select(func.count()).select_from(WeatherConflict)).scalar_one()
         assert conflicts == 1
+
+
+def test_event_sink_flushes_in_batches(test_engine):
+    with db.SessionLocal() as session:
+        run = IngestionRun(dataset="weather", started_at=datetime.now(timezone.utc))
+        session.add(run)
+        session.commit()
+        run_id = run.id
+
+    def stored_events() -> int:
+        with db.SessionLocal() as session:
+            return session.execute(select(func.count()).select_from(IngestionEvent)).scalar_one()
+
+    sink = EventSink(run_id, max_events=3, max_interval=3600)
+    sink.log("INFO", "first")
+    sink.log("INFO", "second")
+    assert stored_events() == 0
+    assert len(sink) == 2
+
+    sink.log("INFO", "third")
+    assert stored_events() == 3
+    assert len(sink) == 0
+
+    sink.log("INFO", "fourth")
+    assert stored_events() == 3
+    sink.close()
+    assert stored_events() == 4
+
+
+def _new_run() -> int:
+    with db.SessionLocal() as session:
+        run = IngestionRun(dataset="weather", started_at=datetime.now(timezone.utc))
+        session.add(run)
+        session.commit()
+        return run.id
+
+
+def _stored_messages() -> list[str]:
+    with db.SessionLocal() as session:
+        return session.execute(select(IngestionEvent.message).order_by(IngestionEvent.id)).all()
+
+
+def test_event_sink_flushes_from_background_thread(test_engine):
+    sink = EventSink(_new_run(), max_events=100, max_interval=0.05)
+    sink.log("INFO", "quiet phase")
+    deadline = time.monotonic() + 5
+    while len(sink) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(sink) == 0
+    assert [row.message for row in _stored_messages()] == ["quiet phase"]
+    sink.close()
+
+
+def test_event_sink_keeps_events_when_flush_fails(test_engine, monkeypatch):
+    sink = EventSink(_new_run(), max_events=100, max_interval=0)
+    sink.log("INFO", "first")
+    sink.log("INFO", "second")
+
+    class BrokenEngine:
+        def begin(self):
+            raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(sink, "_engine", BrokenEngine())
+    with pytest.raises(RuntimeError, match="database unavailable"):
+        sink.flush()
+    assert len(sink) == 2
+
+    monkeypatch.setattr(sink, "_engine", test_engine)
+    sink.close()
+    assert [row.message for row in _stored_messages()] == ["first", "second"]
+
+
+def test_conflicts_logged_per_field_in_one_pass(test_engine, tmp_path):
+    (tmp_path / "STATION1.txt").write_text(
+        "19850101\t10\t-20\t30\n19850101\t15\t-25\t-9999\n19850102\t1\t2\t3\n",
+        encoding="utf-8",
+    )
+
+    result = ingest_weather(tmp_path)
+
+    with db.SessionLocal() as session:
+        conflicts = session.execute(
+            select(
+                WeatherConflict.field,
+                WeatherConflict.existing_value,
+                WeatherConflict.incoming_value,
+                WeatherConflict.existing_raw_id,
+                WeatherConflict.incoming_raw_id,
+                WeatherConflict.source_line,
+            ).order_by(WeatherConflict.id)
+        ).all()
+    # Line 2 wins the merge for both temperatures; precipitation keeps line 1's value.
+    assert conflicts == [
+        ("max_temp_tenths_c", 15, 10, 2, 1, 1),
+        ("min_temp_tenths_c", -25, -20, 2, 1, 1),
+    ]
+    assert result["conflicts"] == 2
+
+
+def test_station_locks_block_only_the_same_station(test_engine, tmp_path):
+    acquired = []
+
+    def take(station_id):
+        with StationLocks(lock_dir=tmp_path) as locks, locks.hold(station_id):
+            acquired.append(station_id)
+
+    with StationLocks(lock_dir=tmp_path) as locks, locks.hold("STATION1"):
+        same = threading.Thread(target=take, args=("STATION1",))
+        other = threading.Thread(target=take, args=("STATION2",))
+        same.start()
+        other.start()
+        other.join(timeout=5)
+        time.sleep(0.1)
+        assert acquired == ["STATION2"]
+    same.join(timeout=5)
+    assert acquired == ["STATION2", "STATION1"]
+
+
+def test_concurrent_runs_over_disjoint_stations(tmp_path, monkeypatch):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'ingest.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    monkeypatch.setattr(db, "engine", engine)
+    monkeypatch.setattr(db, "read_engine", engine)
+    monkeypatch.setattr(db, "SessionLocal", sessionmaker(bind=engine, autoflush=False))
+    Base.metadata.create_all(bind=engine)
+
+    data_dir = tmp_path / "wx"
+    data_dir.mkdir()
+    for number in range(1, 5):
+        (data_dir / f"STATION{number}.txt").write_text(
+            "".join(f"198501{day:02d}\t{day}\t-{day}\t{number}\n" for day in range(1, 11)),
+            encoding="utf-8",
+        )
+
+    results = {}
+
+    def run(name, stations):
+        results[name] = ingest_weather(data_dir, batch_size=3, stations=stations)
+
+    threads = [
+        threading.Thread(target=run, args=("first", ["STATION1", "STATION2"])),
+        threading.Thread(target=run, args=("second", ["STATION3", "STATION4"])),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert (
+        results["first"]
+        == results["second"]
+        == {
+            "processed": 20,
+            "inserted": 20,
+            "conflicts": 0,
+            "curated_upserted": 20,
+        }
+    )
+    with db.SessionLocal() as session:
+        runs = session.execute(
+            select(IngestionRun.inserted_raw_count, IngestionRun.upserted_curated_count)
+        ).all()
+        curated = session.execute(select(func.count()).select_from(WeatherRecord)).scalar_one()
+    assert runs == [(20, 20), (20, 20)]
+    assert curated == 40
+
+    # A later run only counts the rows it added; unknown stations are skipped.
+    assert ingest_weather(data_dir, stations=["STATION2", "STATION5"])["inserted"] == 0
+    engine.dispose()
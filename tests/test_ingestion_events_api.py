@@ -1,10 +1,17 @@
 from __future__ import annotations
 
+import dataclasses
+import importlib
+import json
 from datetime import datetime, timezone
 
-from sqlalchemy import text
+import pytest
+from sqlalchemy import select, text
 
 from app import db
+from app.api import ingestion
+from app.ingest import weather
+from app.ingest.weather import ingest_weather
 from app.models import IngestionEvent, IngestionRun
 
 
@@ -52,3 +59,156 @@ def test_ingestion_events_conflict_query(test_engine):
             text("SELECT COUNT(*) FROM ingestion_events WHERE message LIKE '%conflicts logged%'")
         ).scalar_one()
         assert count == 1
+
+
+def test_ingestion_events_since_id_cursor(client, test_engine):
+    with db.SessionLocal() as session:
+        run = IngestionRun(dataset="weather", started_at=datetime.now(timezone.utc))
+        session.add(run)
+        session.commit()
+        session.add_all(
+            [
+                IngestionEvent(
+                    ingestion_run_id=run.id,
+                    level="INFO",
+                    message=f"event {index}",
+                    created_at=datetime.now(timezone.utc),
+                )
+                for index in range(3)
+            ]
+        )
+        session.commit()
+        run_id = run.id
+
+    response = client.get(
+        "/api/ingestion/events",
+        params={"ingestion_run_id": run_id, "since_id": 0, "page_size": 2},
+    )
+    payload = response.json()
+    assert [event["message"] for event in payload["data"]] == ["event 0", "event 1"]
+
+    last_id = payload["data"][-1]["id"]
+    response = client.get(
+        "/api/ingestion/events",
+        params={"ingestion_run_id": run_id, "since_id": last_id},
+    )
+    assert [event["message"] for event in response.json()["data"]] == ["event 2"]
+
+
+def test_ingestion_run_stream_reports_progress(client, test_engine, tmp_path):
+    (tmp_path / "STATION1.txt").write_text("19850101\t10\t-20\t30\n", encoding="utf-8")
+    (tmp_path / "STATION2.txt").write_text("19850101\t11\t-21\t31\n", encoding="utf-8")
+    ingest_weather(tmp_path)
+
+    with db.SessionLocal() as session:
+        run_id = session.execute(select(IngestionRun.id)).scalar_one()
+
+    response = client.get(f"/api/ingestion/runs/{run_id}/stream")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    messages = []
+    for block in response.text.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        messages.append((fields["event"], json.loads(fields["data"])))
+
+    progress = [data["progress"] for name, data in messages if name == "progress"]
+    assert progress[0]["phase"] == "raw"
+    assert progress[0]["files_done"] == 1
+    assert progress[0]["files_total"] == 2
+    assert progress[-1]["phase"] == "done"
+    assert progress[-1]["rows"] == 2
+    assert messages[-1][0] == "end"
+
+    # Reconnecting with Last-Event-ID only replays what came after it.
+    last_log_id = messages[-2][1]["id"]
+    response = client.get(
+        f"/api/ingestion/runs/{run_id}/stream",
+        headers={"Last-Event-ID": str(last_log_id)},
+    )
+    assert response.text.startswith("event: end")
+
+
+def _stream_messages(text: str) -> list[tuple[str, dict]]:
+    messages = []
+    for block in text.strip().split("\n\n"):
+        if block.startswith(":"):
+            messages.append(("comment", {}))
+            continue
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        messages.append((fields["event"], json.loads(fields["data"])))
+    return messages
+
+
+def test_ingestion_run_stream_ends_on_failed_run(client, test_engine, tmp_path, monkeypatch):
+    (tmp_path / "STATION1.txt").write_text("19850101\t10\t-20\t30\n", encoding="utf-8")
+
+    def broken_merge(*_args):
+        raise RuntimeError("merge broke")
+
+    monkeypatch.setattr(weather, "merge_station", broken_merge)
+    with pytest.raises(RuntimeError, match="merge broke"):
+        ingest_weather(tmp_path)
+
+    with db.SessionLocal() as session:
+        run = session.execute(select(IngestionRun)).scalar_one()
+        assert run.finished_at is None
+        assert run.failed_at is not None
+
+    messages = _stream_messages(client.get(f"/api/ingestion/runs/{run.id}/stream").text)
+    name, data = messages[-2]
+    assert (name, data["level"]) == ("log", "ERROR")
+    assert "merge broke" in data["message"]
+    assert messages[-1] == (
+        "end",
+        {"ingestion_run_id": run.id, "last_event_id": data["id"], "status": "failed"},
+    )
+
+
+def test_ingestion_run_stream_ends_on_failed_yield_run(client, test_engine, tmp_path):
+    ingest_yield = importlib.import_module("app.ingest.yield").ingest_yield
+    yield_file = tmp_path / "yield.txt"
+    yield_file.write_text("2000\t10\n2001\tunknown\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        ingest_yield(yield_file)
+
+    with db.SessionLocal() as session:
+        run = session.execute(select(IngestionRun)).scalar_one()
+        assert (run.dataset, run.finished_at) == ("yield", None)
+        assert run.failed_at is not None
+
+    messages = _stream_messages(client.get(f"/api/ingestion/runs/{run.id}/stream").text)
+    name, data = messages[-2]
+    assert (name, data["level"]) == ("log", "ERROR")
+    assert "yield ingestion failed" in data["message"]
+    assert messages[-1][1]["status"] == "failed"
+
+
+def test_ingestion_run_stream_keeps_alive_then_times_out(client, test_engine, monkeypatch):
+    monkeypatch.setattr(
+        ingestion,
+        "settings",
+        dataclasses.replace(
+            ingestion.settings,
+            ingestion_stream_poll_seconds=0.01,
+            ingestion_stream_keepalive_seconds=0,
+            ingestion_stream_idle_seconds=0.05,
+        ),
+    )
+    with db.SessionLocal() as session:
+        run = IngestionRun(dataset="weather", started_at=datetime.now(timezone.utc))
+        session.add(run)
+        session.commit()
+        run_id = run.id
+
+    messages = _stream_messages(client.get(f"/api/ingestion/runs/{run_id}/stream").text)
+    assert messages[0] == ("comment", {})
+    assert messages[-1] == (
+        "end",
+        {"ingestion_run_id": run_id, "last_event_id": 0, "status": "idle"},
+    )
+
+
+def test_ingestion_run_stream_unknown_run(client, test_engine):
+    response = client.get("/api/ingestion/runs/999/stream")
+    assert response.status_code == 404
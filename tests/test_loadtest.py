@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import date, timedelta
+
+import httpx
+import pytest
+
+from app import db, loadtest
+from app.loadtest import discover, parse_mix, percentile, run_load
+from app.main import create_app
+from app.models import CropYield, WeatherRecord, WeatherStation, WeatherStats
+
+
+def test_percentile_and_mix_parsing():
+    values = [float(n) for n in range(1, 101)]
+    assert [percentile(values, pct) for pct in (50, 95, 99)] == [50.0, 95.0, 99.0]
+    assert percentile([], 50) == 0.0
+    assert parse_mix("weather=3, events") == {"weather": 3, "events": 1}
+    with pytest.raises(ValueError):
+        parse_mix("unknown=1")
+
+
+def test_discover_pages_through_stats(test_engine, monkeypatch):
+    with db.SessionLocal() as session:
+        for number in range(5):
+            session.add(WeatherStation(station_id=f"STATION{number}"))
+            session.add(WeatherStats(station_id=f"STATION{number}", year=2001))
+        session.commit()
+    monkeypatch.setattr(loadtest, "DISCOVERY_PAGE_SIZE", 2)
+
+    async def sample():
+        transport = httpx.ASGITransport(app=create_app())
+        async with httpx.AsyncClient(base_url="http://loadtest", transport=transport) as client:
+            return await discover(client)
+
+    assert len(asyncio.run(sample()).station_years) == 5
+
+
+def test_run_load_reports_per_route_percentiles(test_engine):
+    with db.SessionLocal() as session:
+        session.add(WeatherStation(station_id="STATION1"))
+        session.add_all(
+            WeatherRecord(
+                station_id="STATION1",
+                date=date(2001, 1, 1) + timedelta(days=offset),
+                max_temp_tenths_c=offset,
+            )
+            for offset in range(40)
+        )
+        session.add(WeatherStats(station_id="STATION1", year=2001, avg_max_temp_c=2.0))
+        session.add(CropYield(year=2001, yield_value=11))
+        session.commit()
+
+    report = asyncio.run(
+        run_load(
+            "http://loadtest",
+            concurrency=4,
+            duration=None,
+            requests=120,
+            transport=httpx.ASGITransport(app=create_app()),
+        )
+    )
+
+    assert report["requests"] == 120
+    assert report["errors"] == 0
+    assert set(report["routes"]) == {
+        "/api/weather",
+        "/api/weather/stats",
+        "/api/yield",
+        "/api/ingestion/events",
+        "/api/weather (all stations)",
+        "/api/weather/aggregate",
+    }
+    weather = report["routes"]["/api/weather"]
+    assert weather["status"] == {"200": weather["requests"]}
+    assert 0 < weather["p50_ms"] <= weather["p95_ms"] <= weather["p99_ms"] <= weather["max_ms"]
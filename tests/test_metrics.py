@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from datetime import date
+
+from app import db
+from app.models import CropYield, WeatherRecord, WeatherStation
+
+
+def test_server_timing_header_and_prometheus_metrics(client, test_engine):
+    with db.SessionLocal() as session:
+        session.add(WeatherStation(station_id="STATION1"))
+        session.add(WeatherRecord(station_id="STATION1", date=date(2001, 1, 1)))
+        session.commit()
+
+    # A short window stays on the row query (count + page).
+    response = client.get(
+        "/api/weather",
+        params={"station_id": "STATION1", "start_date": "2001-01-01", "end_date": "2001-01-31"},
+    )
+    assert response.status_code == 200
+    server_timing = response.headers["server-timing"]
+    assert "sql;dur=" in server_timing
+    assert 'desc="2 queries"' in server_timing
+    assert "serialize;dur=" in server_timing
+    assert "total;dur=" in server_timing
+
+    client.get("/api/weather/stats")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    labels = 'method="GET",route="/api/weather"'
+    assert f'http_requests_total{{{labels},status="200"}} 1' in body
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in body
+    assert f"http_request_duration_seconds_count{{{labels}}} 1" in body
+    assert f"db_queries_total{{{labels}}} 2" in body
+    assert 'route="/api/weather/stats"' in body
+
+
+def _timings(header: str) -> dict[str, str]:
+    entries = {}
+    for entry in header.split(", "):
+        name, *params = entry.split(";")
+        entries[name] = ";".join(params)
+    return entries
+
+
+def test_server_timing_counts_sqlite_rows_and_response_model_serialization(client, test_engine):
+    with db.SessionLocal() as session:
+        session.add_all(CropYield(year=year, yield_value=year) for year in range(1990, 2000))
+        session.commit()
+
+    response = client.get("/api/yield", params={"page_size": 4})
+    assert response.status_code == 200
+    timings = _timings(response.headers["server-timing"])
+    # The count query returns one row and the page four.
+    assert timings["rows"] == 'desc="5"'
+    assert float(timings["serialize"].removeprefix("dur=")) > 0
+
+    body = client.get("/metrics").text
+    assert 'db_rows_total{method="GET",route="/api/yield"} 5' in body
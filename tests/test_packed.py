@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import dataclasses
+from datetime import date
+
+from sqlalchemy import delete, select, update
+
+from app import db, packed
+from app.api import weather as weather_api
+from app.config import settings
+from app.ingest.weather import ingest_weather
+from app.models import WeatherStation, WeatherStats, WeatherYearBlock
+from app.stats import compute_weather_stats
+
+
+def _write_station(tmp_path, station_id: str) -> None:
+    lines = [
+        "19991231\t5\t-5\t0",
+        "20000101\t10\t-20\t30",
+        "20000102\t-9999\t-9999\t-9999",
+        "20000229\t25\t-9999\t12",
+        "20001231\t-9999\t3\t7",
+        "20010101\t100\t50\t-9999",
+    ]
+    (tmp_path / f"{station_id}.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_packed_blocks_roundtrip():
+    rows = [(date(2000, 1, 1), 10, -20, 30), (date(2000, 12, 31), None, 3, None)]
+    block = packed.encode_block("S", 2000, rows)
+    year = packed.PackedYear.from_row(WeatherYearBlock(**block))
+
+    assert year.count() == 2
+    assert list(year.days()) == [0, 365]
+    assert [year.value(field, 0) for field in range(3)] == [10, -20, 30]
+    assert [year.value(field, 365) for field in range(3)] == [None, 3, None]
+    assert year.totals(0) == (10, 1)
+    assert year.totals(2) == (30, 1)
+
+    total, data = packed.read_weather([year], start_date=date(2000, 6, 1))
+    assert total == 1
+    assert data == [
+        {
+            "station_id": "S",
+            "date": date(2000, 12, 31),
+            "max_temp_c": None,
+            "min_temp_c": 0.3,
+            "precip_cm": None,
+        }
+    ]
+
+
+def test_weather_api_reads_packed_blocks(client, test_engine, tmp_path, monkeypatch):
+    _write_station(tmp_path, "STATION1")
+    ingest_weather(tmp_path)
+
+    with db.SessionLocal() as session:
+        years = session.execute(
+            select(WeatherYearBlock.year, WeatherYearBlock.day_count).order_by(
+                WeatherYearBlock.year
+            )
+        ).all()
+    assert years == [(1999, 1), (2000, 4), (2001, 1)]
+
+    queries = [
+        {"station_id": "STATION1", "page_size": 100},
+        {"station_id": "STATION1", "page": 2, "page_size": 2},
+        {"station_id": "STATION1", "start_date": "2000-01-02", "end_date": "2001-06-30"},
+    ]
+    packed_responses = [client.get("/api/weather", params=query).json() for query in queries]
+
+    row_settings = dataclasses.replace(settings, packed_read_min_days=0)
+    monkeypatch.setattr(weather_api, "settings", row_settings)
+    row_responses = [client.get("/api/weather", params=query).json() for query in queries]
+
+    assert packed_responses == row_responses
+    assert packed_responses[0]["total"] == 6
+    assert [row["date"] for row in packed_responses[1]["data"]] == ["2000-01-02", "2000-02-29"]
+
+
+def test_stats_from_packed_blocks_match_records(test_engine, tmp_path):
+    _write_station(tmp_path, "STATION1")
+    _write_station(tmp_path, "STATION2")
+    ingest_weather(tmp_path)
+
+    def stats_rows():
+        with db.SessionLocal() as session:
+            return session.execute(
+                select(
+                    WeatherStats.station_id,
+                    WeatherStats.year,
+                    WeatherStats.avg_max_temp_c,
+                    WeatherStats.avg_min_temp_c,
+                    WeatherStats.total_precip_cm,
+                ).order_by(WeatherStats.station_id, WeatherStats.year)
+            ).all()
+
+    compute_weather_stats()
+    from_records = stats_rows()
+    with db.SessionLocal() as session:
+        session.query(WeatherStats).delete()
+        # STATION2 is aggregated from rows until it is fully packed.
+        session.execute(
+            update(WeatherStation)
+            .where(WeatherStation.station_id == "STATION2")
+            .values(packed_at=None)
+        )
+        session.execute(
+            delete(WeatherYearBlock).where(
+                WeatherYearBlock.station_id == "STATION2", WeatherYearBlock.year == 1999
+            )
+        )
+        session.commit()
+
+    assert compute_weather_stats(source="packed") == {"upserted": 6}
+    assert stats_rows() == from_records
+    assert from_records[1] == ("STATION1", 2000, 1.75, -0.85, 0.49)
+
+
+def test_first_refresh_packs_the_whole_station(client, test_engine, tmp_path):
+    (tmp_path / "STATION1.txt").write_text(
+        "20000101\t10\t-20\t30\n20010101\t11\t-21\t31\n", encoding="utf-8"
+    )
+    ingest_weather(tmp_path)
+    # As after upgrading a database ingested before blocks existed.
+    with db.SessionLocal() as session:
+        session.execute(delete(WeatherYearBlock))
+        session.execute(update(WeatherStation).values(packed_at=None))
+        session.commit()
+    assert client.get("/api/weather", params={"station_id": "STATION1"}).json()["total"] == 2
+
+    with (tmp_path / "STATION1.txt").open("a", encoding="utf-8") as handle:
+        handle.write("20020101\t12\t-22\t32\n")
+    ingest_weather(tmp_path)
+
+    with db.SessionLocal() as session:
+        years = session.execute(select(WeatherYearBlock.year).order_by("year")).scalars().all()
+        assert years == [2000, 2001, 2002]
+        assert session.get(WeatherStation, "STATION1").packed_at is not None
+    assert client.get("/api/weather", params={"station_id": "STATION1"}).json()["total"] == 3
+
+
+def test_values_out_of_int16_range_are_read_from_rows(client, test_engine, tmp_path):
+    (tmp_path / "STATION1.txt").write_text(
+        "20000101\t10\t-20\t30\n20010101\t11\t-21\t40000\n", encoding="utf-8"
+    )
+    ingest_weather(tmp_path)
+
+    with db.SessionLocal() as session:
+        years = session.execute(select(WeatherYearBlock.year)).scalars().all()
+        assert years == [2000]
+        assert session.get(WeatherStation, "STATION1").packed_at is None
+    data = client.get("/api/weather", params={"station_id": "STATION1"}).json()["data"]
+    assert [row["precip_cm"] for row in data] == [0.3, 400.0]
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.partitions import PartitionManager, ensure_year_partitions, existing_years
+
+
+def test_partition_manager_is_a_noop_on_sqlite(test_engine):
+    manager = PartitionManager(test_engine)
+    assert manager.ensure({2016, 2017}) == []
+    with test_engine.begin() as conn:
+        assert ensure_year_partitions(conn, {2018}) == []
+
+
+@pytest.mark.postgres
+def test_postgres_year_partitions_created_on_demand():
+    url = os.getenv("POSTGRES_TEST_URL") or os.getenv("DATABASE_URL")
+    if not url or not url.startswith("postgresql"):
+        pytest.skip("POSTGRES_TEST_URL or DATABASE_URL not set to a Postgres URL")
+
+    engine = create_engine(url, future=True)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS partition_probe"))
+        conn.execute(text("""
+                CREATE TABLE partition_probe (station_id TEXT NOT NULL, date DATE NOT NULL)
+                PARTITION BY RANGE (date)
+                """))
+    try:
+        manager = PartitionManager(engine, tables=["partition_probe"])
+        assert manager.ensure({2016, 2017}) == ["partition_probe_2016", "partition_probe_2017"]
+        assert manager.ensure({2017}) == []
+
+        with engine.begin() as conn:
+            assert existing_years(conn, "partition_probe") == {2016, 2017}
+            assert ensure_year_partitions(conn, {2016}, tables=["partition_probe"]) == []
+            conn.execute(
+                text("INSERT INTO partition_probe VALUES ('STATION1', :date)"),
+                {"date": date(2017, 6, 1)},
+            )
+            sub_partitions = conn.execute(
+                text("SELECT count(*) FROM pg_inherits WHERE inhparent = to_regclass(:name)"),
+                {"name": "partition_probe_2017"},
+            ).scalar_one()
+            assert sub_partitions == 4
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS partition_probe"))
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import pytest
+
+from app import db, query
+from app.models import CropYield, WeatherRecord, WeatherStation, WeatherStats
+
+
+@pytest.fixture()
+def curated(test_engine):
+    with db.SessionLocal() as session:
+        for station in ("STATION1", "STATION2"):
+            session.add(WeatherStation(station_id=station))
+            session.add_all(
+                WeatherRecord(
+                    station_id=station,
+                    date=date(2001, 1, 1) + timedelta(days=offset),
+                    max_temp_tenths_c=offset * 10,
+                    min_temp_tenths_c=None if offset == 0 else -offset,
+                    precip_tenths_mm=50,
+                )
+                for offset in range(5)
+            )
+            session.add(
+                WeatherStats(
+                    station_id=station,
+                    year=2001,
+                    avg_max_temp_c=2.0,
+                    avg_min_temp_c=None,
+                    total_precip_cm=2.5,
+                )
+            )
+        session.add_all(
+            [CropYield(year=2000, yield_value=10), CropYield(year=2001, yield_value=11)]
+        )
+        session.commit()
+
+
+def test_weather_columns_as_lists(curated):
+    columns = query.weather_columns(
+        station_ids=["STATION2"], start_date=date(2001, 1, 2), kind="lists", chunk_size=2
+    )
+    assert columns["station_id"] == ["STATION2"] * 4
+    assert columns["date"][0] == date(2001, 1, 2)
+    assert columns["max_temp_c"] == [1.0, 2.0, 3.0, 4.0]
+    assert columns["min_temp_c"][0] == -0.1
+    assert columns["precip_cm"][0] == 0.5
+
+
+def test_weather_chunks_are_bounded(curated):
+    chunks = list(query.iter_weather_chunks(chunk_size=3))
+    assert [len(chunk["date"]) for chunk in chunks] == [3, 3, 3, 1]
+    assert query.weather_columns(station_ids=["MISSING"])["date"] == []
+    with pytest.raises(ValueError, match="lists, numpy"):
+        query.iter_weather_chunks(kind="pandas")
+
+
+def test_stats_and_yield_columns(curated):
+    stats = query.stats_columns(year_start=2001, kind="lists")
+    assert stats["station_id"] == ["STATION1", "STATION2"]
+    assert stats["avg_min_temp_c"] == [None, None]
+    assert query.yield_columns(year_end=2000, kind="lists") == {"year": [2000], "yield_value": [10]}
+    with pytest.raises(ValueError):
+        query.yield_columns(kind="arrow")
+
+
+def test_weather_columns_as_numpy(curated):
+    np = pytest.importorskip("numpy")
+    columns = query.weather_columns(station_ids=["STATION1"], kind="numpy", chunk_size=2)
+    assert columns["date"].dtype == np.dtype("datetime64[D]")
+    assert np.isnan(columns["min_temp_c"][0])
+    assert columns["max_temp_c"].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+def test_stats_columns_as_pandas(curated):
+    pytest.importorskip("pandas")
+    frame = query.stats_columns(kind="pandas", chunk_size=1)
+    assert list(frame["station_id"]) == ["STATION1", "STATION2"]
+    assert frame["year"].dtype == "int64"
+    assert query.yield_columns(year_start=3000, kind="pandas").empty
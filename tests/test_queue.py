@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import dataclasses
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app import db
+from app.ingest import queue
+from app.ingest.locks import StationLocks
+from app.models import (
+    IngestionRun,
+    IngestionTask,
+    WeatherRecord,
+    WeatherRecordRaw,
+    WeatherStats,
+)
+from app.partitions import PartitionManager
+
+
+@pytest.fixture()
+def data_dir(tmp_path):
+    for number in range(1, 4):
+        (tmp_path / f"STATION{number}.txt").write_text(
+            f"19850101\t{number}\t-20\t30\n19850102\t{number}\t-21\t31\n", encoding="utf-8"
+        )
+    return tmp_path
+
+
+def test_workers_share_a_run_and_finalize_merges_it(test_engine, data_dir):
+    run_id = queue.enqueue_weather(data_dir)
+
+    with db.SessionLocal() as first, db.SessionLocal() as second:
+        claimed = [queue.claim_task(first, "a"), queue.claim_task(second, "b")]
+        assert len({task.id for task in claimed}) == 2
+        assert [task.status for task in claimed] == ["running", "running"]
+    # Both claims are now abandoned in favour of fresh workers.
+    with db.SessionLocal() as session:
+        session.execute(update(IngestionTask).values(status="pending", attempts=0))
+        session.commit()
+
+    with pytest.raises(RuntimeError, match="3 unfinished tasks"):
+        queue.finalize_run(run_id)
+
+    assert queue.run_worker("a", batch_size=1, exit_when_idle=True) == 3
+    assert queue.run_worker("b", exit_when_idle=True) == 0
+
+    result = queue.finalize_run(run_id)
+    assert result == {"processed": 6, "inserted": 6, "conflicts": 0, "curated_upserted": 6}
+
+    with db.SessionLocal() as session:
+        run = session.get(IngestionRun, run_id)
+        assert run.finished_at is not None
+        assert run.inserted_raw_count == 6
+        statuses = session.execute(select(IngestionTask.status).distinct()).scalars().all()
+        assert statuses == ["merged"]
+        assert session.execute(select(func.count()).select_from(WeatherRecord)).scalar_one() == 6
+        assert session.execute(select(func.count()).select_from(WeatherStats)).scalar_one() == 3
+
+    with pytest.raises(RuntimeError, match="already finalized"):
+        queue.finalize_run(run_id)
+
+
+def test_abandoned_tasks_are_reclaimed_then_failed(test_engine, data_dir, monkeypatch):
+    monkeypatch.setattr(
+        queue, "settings", dataclasses.replace(queue.settings, ingest_task_max_attempts=2)
+    )
+    queue.enqueue_weather(data_dir, stations=["STATION1"])
+
+    def stop_heartbeats():
+        with db.SessionLocal() as session:
+            session.execute(
+                update(IngestionTask).values(
+                    heartbeat_at=datetime.now(timezone.utc) - timedelta(hours=1)
+                )
+            )
+            session.commit()
+
+    with db.SessionLocal() as session:
+        first = queue.claim_task(session, "a")
+        stop_heartbeats()
+        retried = queue.claim_task(session, "b")
+        assert (retried.id, retried.worker, retried.attempts) == (first.id, "b", 2)
+
+        stop_heartbeats()
+        assert queue.claim_task(session, "c") is None
+        task = session.get(IngestionTask, first.id)
+        session.refresh(task)
+        assert task.status == "failed"
+
+
+def test_failed_task_is_retried_and_requeued(test_engine, data_dir, monkeypatch):
+    monkeypatch.setattr(
+        queue, "settings", dataclasses.replace(queue.settings, ingest_task_retry_seconds=0)
+    )
+    run_id = queue.enqueue_weather(data_dir, stations=["STATION1"])
+    (data_dir / "STATION1.txt").unlink()
+
+    assert queue.run_worker("a", exit_when_idle=True) == 3
+    with db.SessionLocal() as session:
+        task = session.execute(select(IngestionTask)).scalar_one()
+        assert (task.status, task.attempts) == ("failed", 3)
+        assert "STATION1.txt" in task.error
+    with pytest.raises(RuntimeError, match="1 failed tasks"):
+        queue.finalize_run(run_id)
+
+    (data_dir / "STATION1.txt").write_text("19850101\t1\t2\t3\n", encoding="utf-8")
+    assert queue.requeue_failed(run_id) == 1
+    assert queue.run_worker("a", exit_when_idle=True) == 1
+    assert queue.finalize_run(run_id, stats=False)["inserted"] == 1
+
+
+def test_failed_task_waits_before_it_is_claimed_again(test_engine, data_dir, monkeypatch):
+    queue.enqueue_weather(data_dir, stations=["STATION1"])
+    (data_dir / "STATION1.txt").unlink()
+
+    with db.SessionLocal() as session, StationLocks() as locks:
+        task = queue.claim_task(session, "a")
+        assert queue._run_task(session, task, locks, PartitionManager(), 1000) == "pending"
+        assert queue.claim_task(session, "a") is None
+
+        monkeypatch.setattr(
+            queue, "settings", dataclasses.replace(queue.settings, ingest_task_retry_seconds=0)
+        )
+        assert queue.claim_task(session, "b").id == task.id
+
+
+def test_worker_stops_when_its_task_is_claimed_by_another(test_engine, data_dir):
+    queue.enqueue_weather(data_dir, stations=["STATION1"])
+
+    with db.SessionLocal() as session, StationLocks() as locks:
+        task = queue.claim_task(session, "a")
+        # "a" went quiet and "b" took the task over.
+        with db.SessionLocal() as other:
+            other.execute(update(IngestionTask).values(worker="b", attempts=2))
+            other.commit()
+
+        assert queue._run_task(session, task, locks, PartitionManager(), 1000) is None
+
+    with db.SessionLocal() as session:
+        task = session.execute(select(IngestionTask)).scalar_one()
+        assert (task.status, task.worker, task.error) == ("running", "b", None)
+        assert session.execute(select(func.count()).select_from(WeatherRecordRaw)).scalar_one() == 0
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from migration_helpers import OnlineRewrite
+
+
+def _setup(engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS items_new"))
+        conn.execute(text("DROP TABLE IF EXISTS items"))
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, value INTEGER)"))
+        conn.execute(
+            text("INSERT INTO items (id, value) VALUES (:id, :value)"),
+            [{"id": i, "value": i} for i in range(1, 21)],
+        )
+        conn.execute(
+            text("CREATE TABLE items_new (id INTEGER PRIMARY KEY, value INTEGER, note TEXT)")
+        )
+
+
+def _rewrite_with_concurrent_writes(engine, monkeypatch) -> None:
+    _setup(engine)
+    pauses = []
+
+    def write_between_batches(seconds):
+        pauses.append(seconds)
+        if len(pauses) == 1:
+            # Another connection writes once the first batch is copied.
+            with engine.begin() as other:
+                other.execute(text("UPDATE items SET value = 200 WHERE id = 2"))
+                other.execute(text("DELETE FROM items WHERE id = 3"))
+                other.execute(text("INSERT INTO items (id, value) VALUES (99, 99)"))
+
+    monkeypatch.setattr("migration_helpers.time.sleep", write_between_batches)
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        rewrite = OnlineRewrite(conn, "items", "items_new", ["id", "value"], batch_size=6, pause=1)
+        assert rewrite.run() >= 20
+
+    with engine.connect() as conn:
+        rows = dict(conn.execute(text("SELECT id, value FROM items ORDER BY id")).all())
+        tables = inspect(conn).get_table_names()
+        columns = [column["name"] for column in inspect(conn).get_columns("items")]
+    expected = {i: i for i in range(1, 21) if i != 3} | {2: 200, 99: 99}
+    assert rows == expected
+    assert "note" in columns
+    assert "items_new" not in tables
+    assert "items_rewrite_log" not in tables
+
+
+def test_online_rewrite_captures_concurrent_writes(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rewrite.db'}", future=True)
+    try:
+        _rewrite_with_concurrent_writes(engine, monkeypatch)
+    finally:
+        engine.dispose()
+
+
+def test_online_rewrite_requires_autocommit(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rewrite.db'}", future=True)
+    _setup(engine)
+    with engine.connect() as conn:
+        with pytest.raises(RuntimeError):
+            OnlineRewrite(conn, "items", "items_new", ["id", "value"]).run()
+    engine.dispose()
+
+
+@pytest.mark.postgres
+def test_online_rewrite_on_postgres(monkeypatch):
+    url = os.getenv("POSTGRES_TEST_URL") or os.getenv("DATABASE_URL")
+    if not url or not url.startswith("postgresql"):
+        pytest.skip("POSTGRES_TEST_URL or DATABASE_URL not set to a Postgres URL")
+
+    engine = create_engine(url, future=True)
+    try:
+        _rewrite_with_concurrent_writes(engine, monkeypatch)
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS items_new"))
+            conn.execute(text("DROP TABLE IF EXISTS items"))
+        engine.dispose()
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import json
+from dataclasses import replace
+from datetime import date
+
+from sqlalchemy import select
+
+from app import db, slow_queries
+from app.config import settings
+from app.models import WeatherRecord
+
+
+def test_slow_queries_are_logged_with_plan(test_engine, tmp_path, monkeypatch):
+    log_path = tmp_path / "slow.jsonl"
+    monkeypatch.setattr(
+        slow_queries,
+        "settings",
+        replace(settings, slow_query_ms=1e-6, slow_query_log=str(log_path)),
+    )
+
+    stmt = select(WeatherRecord).where(WeatherRecord.date >= date(2000, 1, 1))
+    with db.SessionLocal() as session:
+        session.execute(stmt).all()
+        session.execute(stmt).all()
+
+    entries = [json.loads(line) for line in log_path.read_text().splitlines()]
+    weather_entries = [entry for entry in entries if "FROM weather_records" in entry["statement"]]
+    assert len(weather_entries) == 2
+    assert weather_entries[0]["duration_ms"] > 0
+    assert "2000-01-01" in weather_entries[0]["parameters"]
+    assert "weather_records" in weather_entries[0]["plan"]
+
+    offenders = slow_queries.worst_offenders(log_path)
+    summary = next(item for item in offenders if "FROM weather_records" in item["statement"])
+    assert summary["count"] == 2
+    assert summary["total_ms"] >= summary["max_ms"]
+
+
+def test_fast_queries_are_not_logged(test_engine, tmp_path, monkeypatch):
+    log_path = tmp_path / "slow.jsonl"
+    monkeypatch.setattr(
+        slow_queries,
+        "settings",
+        replace(settings, slow_query_ms=60_000, slow_query_log=str(log_path)),
+    )
+    with db.SessionLocal() as session:
+        session.execute(select(WeatherRecord)).all()
+    assert not log_path.exists()
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import dataclasses
+from datetime import date
+
+from app import db, snapshot_file
+from app.models import WeatherRecord, WeatherStation
+from app.snapshot_file import MappedSnapshotStore, build_snapshot, export_snapshot, map_snapshot
+from app.stats import compute_weather_stats
+
+
+def _seed(*station_ids: str) -> None:
+    with db.SessionLocal() as session:
+        for station_id in station_ids:
+            session.add(WeatherStation(station_id=station_id))
+            session.add(
+                WeatherRecord(
+                    station_id=station_id,
+                    date=date(2000, 1, 1),
+                    max_temp_tenths_c=100,
+                    min_temp_tenths_c=None,
+                    precip_tenths_mm=50,
+                )
+            )
+        session.commit()
+
+
+def test_snapshot_file_roundtrip(test_engine, tmp_path):
+    _seed("STATION1", "STATION2")
+    compute_weather_stats()
+    with db.SessionLocal() as session:
+        session.add(WeatherStation(station_id="NOSTATS"))
+        session.commit()
+
+    path = tmp_path / "stats.snapshot"
+    exported = export_snapshot(path)
+    mapped = map_snapshot(path)
+
+    assert mapped.version == exported.version == 1
+    assert mapped.station_ids == ("NOSTATS", "STATION1", "STATION2")
+    assert mapped.query() == exported.query()
+    assert mapped.query(station_id="NOSTATS") == (0, [])
+    total, rows = mapped.query(station_id="STATION2")
+    assert total == 1
+    assert rows[0]["avg_max_temp_c"] == 10.0
+    assert rows[0]["avg_min_temp_c"] is None
+    assert rows[0]["total_precip_cm"] == 0.5
+
+
+def test_mapped_store_falls_back_then_remaps(test_engine, tmp_path):
+    _seed("STATION1")
+    compute_weather_stats()
+
+    path = tmp_path / "stats.snapshot"
+    store = MappedSnapshotStore(path, refresh_seconds=0)
+    # No file yet: served straight from the database.
+    assert store.get().query(station_id="STATION1")[0] == 1
+
+    export_snapshot(path)
+    first = store.get()
+    assert first.station_ids == ("STATION1",)
+    assert store.get() is first
+
+    _seed("STATION2")
+    compute_weather_stats()
+    with db.SessionLocal() as session:
+        assert build_snapshot(session).station_ids == ("STATION1", "STATION2")
+    # The file is behind the published version, so stats come from the database.
+    stale = store.get()
+    assert stale is not first
+    assert stale.version == 2
+    assert stale.query(station_id="STATION2")[0] == 1
+    export_snapshot(path)
+
+    second = store.get()
+    assert second is not first
+    assert second.version == 2
+    assert second.station_ids == ("STATION1", "STATION2")
+
+
+def test_stats_run_rewrites_configured_snapshot(test_engine, tmp_path, monkeypatch):
+    path = tmp_path / "stats.snapshot"
+    monkeypatch.setattr(
+        snapshot_file,
+        "settings",
+        dataclasses.replace(snapshot_file.settings, stats_snapshot_path=str(path)),
+    )
+    _seed("STATION1")
+    compute_weather_stats()
+    store = MappedSnapshotStore(path, refresh_seconds=0)
+    first = store.get()
+    assert first.version == map_snapshot(path).version == 1
+
+    _seed("STATION2")
+    compute_weather_stats()
+    second = store.get()
+    assert second.version == 2
+    assert second.station_ids == ("STATION1", "STATION2")
@@ -2,9 +2,16 @@ from __future__ import annotations
 
 from datetime import date
 
-from app import db
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import db, stats_duckdb
+from app.db import Base
 from app.models import WeatherRecord, WeatherStation, WeatherStats
 from app.stats import compute_weather_stats
+from app.stats_snapshot import StatsSnapshot, StatsSnapshotStore
+from app.versions import WEATHER_STATS, current_version, publish_version
 
 
 def test_compute_weather_stats(test_engine):
@@ -38,3 +45,99 @@ def test_compute_weather_stats(test_engine):
         assert stats.avg_max_temp_c == 10.0
         assert stats.avg_min_temp_c == 1.0
         assert stats.total_precip_cm == 1.0
+
+
+def test_stats_snapshot_filters_and_paginates():
+    rows = [
+        WeatherStats(
+            station_id=station, year=year, avg_max_temp_c=float(year), total_precip_cm=None
+        )
+        for station in ("A", "B", "C")
+        for year in (2000, 2001, 2002)
+    ]
+    snapshot = StatsSnapshot.from_rows(1, rows)
+
+    total, data = snapshot.query(year_start=2001, offset=1, limit=3)
+    assert total == 6
+    assert [(row["station_id"], row["year"]) for row in data] == [
+        ("A", 2002),
+        ("B", 2001),
+        ("B", 2002),
+    ]
+    assert data[0]["avg_max_temp_c"] == 2002.0
+    assert data[0]["avg_min_temp_c"] is None
+
+    total, data = snapshot.query(station_id="C", year_end=2000)
+    assert total == 1
+    assert data[0]["year"] == 2000
+    assert snapshot.query(station_id="MISSING") == (0, [])
+
+
+def test_stats_snapshot_store_swaps_on_new_version(test_engine):
+    with db.SessionLocal() as session:
+        session.add(WeatherStation(station_id="STATION1"))
+        session.add(
+            WeatherRecord(station_id="STATION1", date=date(2000, 1, 1), max_temp_tenths_c=100)
+        )
+        session.commit()
+
+    store = StatsSnapshotStore(refresh_seconds=0)
+    empty = store.get()
+    assert len(empty) == 0
+    assert store.get() is empty
+
+    compute_weather_stats()
+
+    snapshot = store.get()
+    assert snapshot is not empty
+    assert snapshot.version == 1
+    assert snapshot.query(station_id="STATION1")[1][0]["avg_max_temp_c"] == 10.0
+    assert store.get() is snapshot
+
+
+def test_publish_version_upserts(test_engine):
+    with db.SessionLocal() as session:
+        assert current_version(session, WEATHER_STATS) is None
+        assert [publish_version(session, WEATHER_STATS) for _ in range(2)] == [1, 2]
+        session.commit()
+        assert current_version(session, WEATHER_STATS) == 2
+
+
+def test_compute_weather_stats_with_duckdb(tmp_path, monkeypatch):
+    pytest.importorskip("duckdb")
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}", future=True)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(db, "engine", engine)
+    monkeypatch.setattr(db, "read_engine", engine)
+    monkeypatch.setattr(db, "SessionLocal", sessionmaker(bind=engine, future=True))
+    with db.SessionLocal() as session:
+        session.add(WeatherStation(station_id="STATION1"))
+        session.add_all(
+            WeatherRecord(
+                station_id="STATION1",
+                date=date(year, 1, day),
+                max_temp_tenths_c=100 * day,
+                min_temp_tenths_c=None,
+                precip_tenths_mm=50,
+            )
+            for year in (2000, 2001)
+            for day in (1, 2)
+        )
+        session.commit()
+
+    assert compute_weather_stats(source="duckdb") == {"upserted": 2}
+    with db.SessionLocal() as session:
+        stats = session.get(WeatherStats, {"station_id": "STATION1", "year": 2001})
+        assert stats.avg_max_temp_c == 15.0
+        assert stats.avg_min_temp_c is None
+        assert stats.total_precip_cm == 1.0
+
+    parquet = stats_duckdb.export_parquet(tmp_path / "records.parquet")
+    rollups = stats_duckdb.rollups(parquet)
+    assert [(row["station_id"], row["year"], row["days"]) for row in rollups] == [
+        ("STATION1", 2000, 2),
+        ("STATION1", 2001, 2),
+        ("STATION1", None, 4),
+        (None, None, 4),
+    ]
+    engine.dispose()
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import threading
+from datetime import date
+
+from sqlalchemy import select
+
+from app import db
+from app.ingest.watch import apply_changes, poll_changes
+from app.ingest.weather import ingest_weather
+from app.models import CropYield, WeatherRecord, WeatherStats
+
+
+def test_apply_changes_ingests_only_changed_stations(test_engine, tmp_path):
+    data_dir = tmp_path / "wx"
+    data_dir.mkdir()
+    for station in ("STATION1", "STATION2"):
+        (data_dir / f"{station}.txt").write_text("19850101\t10\t-20\t30\n", encoding="utf-8")
+    yield_file = tmp_path / "yield.txt"
+    ingest_weather(data_dir)
+
+    station_file = data_dir / "STATION1.txt"
+    station_file.write_text("19850101\t10\t-20\t30\n19850102\t20\t-10\t40\n", encoding="utf-8")
+    yield_file.write_text("1985\t100\n", encoding="utf-8")
+    summary = apply_changes({station_file, yield_file}, data_dir, yield_file)
+
+    assert summary == {"stations": 1, "yield": 1, "raw_inserted": 1, "stats_upserted": 1}
+    with db.SessionLocal() as session:
+        stats = session.execute(select(WeatherStats.station_id, WeatherStats.avg_max_temp_c)).all()
+        assert stats == [("STATION1", 1.5)]
+        assert session.get(WeatherRecord, {"station_id": "STATION1", "date": date(1985, 1, 2)})
+        assert session.get(CropYield, 1985).yield_value == 100
+
+    # Touching a file without new rows ingests it but leaves stats alone.
+    assert apply_changes({station_file}, data_dir, yield_file) == {
+        "stations": 1,
+        "yield": 0,
+        "raw_inserted": 0,
+    }
+
+
+def test_poll_changes_debounces_writes(tmp_path):
+    station_file = tmp_path / "STATION1.txt"
+    station_file.write_text("19850101\t10\t-20\t30\n", encoding="utf-8")
+    stop = threading.Event()
+    batches = []
+
+    def collect():
+        for batch in poll_changes(
+            tmp_path, tmp_path / "yield.txt", debounce=0.2, max_wait=5, interval=0.02, stop=stop
+        ):
+            batches.append(batch)
+            stop.set()
+
+    thread = threading.Thread(target=collect)
+    thread.start()
+    try:
+        threading.Event().wait(0.1)
+        station_file.write_text("19850101\t11\t-20\t30\n", encoding="utf-8")
+        (tmp_path / "STATION2.txt").write_text("19850101\t1\t2\t3\n", encoding="utf-8")
+        (tmp_path / "notes.md").write_text("ignored", encoding="utf-8")
+        thread.join(timeout=5)
+    finally:
+        stop.set()
+        thread.join()
+    assert batches == [{station_file, tmp_path / "STATION2.txt"}]